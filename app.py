@@ -1,7 +1,13 @@
 from flask import Flask, render_template
 import os
 import importlib
-import csv
+import multiprocessing
+
+from servicios.indice_vuelos import resumen_vuelo, resumenes
+from servicios import calculos
+from servicios.vigilante_datos import iniciar_vigilante
+from servicios import meteorologia
+from servicios import cache_http
 
 # Inicializar aplicación Flask
 app = Flask(__name__)
@@ -31,55 +37,70 @@ for filename in os.listdir(routes_dir):
 
 print(f"\n🚀 Total de blueprints registrados: {len(app.blueprints) - 1}")  # -1 porque Flask tiene un blueprint interno
 
+# ============================================
+# CACHÉ HTTP Y COMPRESIÓN
+# ============================================
+# ETag según la versión de los datos: una visita repetida cuesta unos stat()
+# y un 304 en lugar de volver a analizar los vuelos
+cache_http.registrar(app)
+
+# Los workers de los pools de procesos (contexto spawn) vuelven a importar
+# este módulo: los hilos de fondo solo se arrancan en el proceso principal
+PROCESO_PRINCIPAL = multiprocessing.parent_process() is None
+
+# ============================================
+# VIGILANTE DE LA CARPETA data/
+# ============================================
+# Ingiere en segundo plano los CSV nuevos o modificados (desactivar con VIGILANTE_DATOS=0)
+if PROCESO_PRINCIPAL and os.environ.get("VIGILANTE_DATOS", "1") != "0":
+    iniciar_vigilante()
+
+# ============================================
+# CLIMA DE REFERENCIA
+# ============================================
+# Primera consulta en segundo plano para que el dashboard la encuentre lista
+# (proveedor configurable con METEO_PROVEEDOR; "fijo" funciona sin red)
+if PROCESO_PRINCIPAL:
+    meteorologia.solicitar()
+
 #metodo littlewood
 
 G = 9.78
 
 
 def calcular_altura_littlewood(t):
-    return (G * (t ** 2)) / 8
+    return float(calculos.altura_littlewood(t, G))
 
 
 def calcular_error(ht, hr):
     return abs(ht - hr) / hr * 100
 
 
-def analizar_csv(path):
-    tiempos = []
-    alturas = []
-
-    with open(path, "r") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                tiempos.append(float(row["time_s"]))
-                alturas.append(float(row["altitude_m"]))
-            except:
-                pass
-
-    inicio = None
-    for i in range(1, len(alturas)):
-        if alturas[i] > 0 and alturas[i] > alturas[i - 1]:
-            inicio = i
-            break
-
-    altura_real = max(alturas)
-    tiempo_total = tiempos[-1]
+def formatear_vuelo(resumen):
+    """Arma el resultado de un vuelo a partir de su fila en el índice de resúmenes."""
+    inicio = resumen["inicio_ascenso_positivo"]
+
+    altura_real = resumen["apogeo"]
+    tiempo_total = resumen["tiempo_final"]
 
     altura_teo = calcular_altura_littlewood(tiempo_total)
     error = calcular_error(altura_teo, altura_real)
 
     return {
-        "archivo": os.path.basename(path),
+        "archivo": resumen["archivo"],
         "tiempo_total": round(tiempo_total, 2),
         "altura_real": round(altura_real, 2),
         "altura_teorica": round(altura_teo, 2),
         "error_porcentual": round(error, 2),
         "inicio_ascenso": inicio,
-        "tiempo_inicio_ascenso": tiempos[inicio] if inicio else None
+        "tiempo_inicio_ascenso": resumen["tiempo_inicio_ascenso_positivo"] if inicio else None
     }
 
 
+def analizar_csv(path):
+    return formatear_vuelo(resumen_vuelo(path))
+
+
 @app.get("/")
 def index():
     return render_template("index.html", title="Inicio")
@@ -88,11 +109,9 @@ def index():
 @app.get("/resultados")
 def resultados():
     base = "data"
-    vuelos = []
 
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            vuelos.append(analizar_csv(os.path.join(base, archivo)))
+    # Resúmenes precalculados: solo se analizan los CSV nuevos o modificados
+    vuelos = [formatear_vuelo(r) for r in resumenes(base) if r["filas"]]
 
     return render_template("resultados.html",
                            title="Resultados",
@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, request
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+import numpy as np
+
+from servicios.almacen_vuelos import obtener_vuelo, firma_archivo
+from servicios.cache_graficos import etag_grafico, obtener_grafico, respuesta_condicional
+from servicios.productos_vuelo import registrar_producto, obtener_producto
+from servicios.decimacion import MAX_PUNTOS_DEFECTO, decimar, leer_max_points
+from servicios.filtro_tasa import tasa_causal
 
 
 bp = Blueprint('analisis_paracaidas', __name__, url_prefix='/analisis-paracaidas')
@@ -22,64 +28,80 @@ LANZAMIENTOS = {
 # ============================================================================
 
 def leer_csv_vuelo(csv_path):
-    """Lee y limpia datos de CSV de vuelo"""
-    df = pd.read_csv(csv_path)
-    if df.iloc[0]['timestamp_ms'] == 'timestamp_ms':
-        df = df.iloc[1:].reset_index(drop=True)
-    df['time_s'] = pd.to_numeric(df['time_s'], errors='coerce')
-    df['pressure_pa'] = pd.to_numeric(df['pressure_pa'], errors='coerce')
-    df['altitude_m'] = pd.to_numeric(df['altitude_m'], errors='coerce')
-    return df.dropna(subset=['time_s', 'pressure_pa'])
-
-def calcular_tasa_cambio_presion(df):
-    """Calcula la tasa de cambio de presión (derivada)"""
-    df['delta_pressure'] = df['pressure_pa'].diff()
-    df['delta_time'] = df['time_s'].diff()
-    df['tasa_presion'] = df['delta_pressure'] / df['delta_time']
-    df['tasa_suavizada'] = df['tasa_presion'].rolling(window=5, center=True).mean()
-    return df
-
-def detectar_despliegue_paracaidas(df):
+    """Tiempo, presión y altitud del vuelo en las filas con tiempo y presión.
+
+    Son arreglos del almacén (sin DataFrame); 'fila' es la posición de cada
+    muestra en el CSV.
+    """
+    # El almacén ya convierte a numérico (un header duplicado queda como NaN)
+    vuelo = obtener_vuelo(csv_path)
+    mascara = vuelo.mascara_validas('time_s', 'pressure_pa')
+    datos = {nombre: vuelo.columnas[nombre][mascara] for nombre in ('time_s', 'pressure_pa', 'altitude_m')}
+    datos['fila'] = np.flatnonzero(mascara)
+    return datos
+
+def calcular_tasa_cambio_presion(vuelo):
+    """Calcula la tasa de cambio de presión (derivada causal suavizada)"""
+    vuelo['tasa_suavizada'] = tasa_causal(vuelo['time_s'], vuelo['pressure_pa'])
+    return vuelo
+
+def detectar_despliegue_paracaidas(vuelo):
     """Detecta apertura pasiva del paracaídas al inicio del descenso"""
-    idx_apogeo = df['altitude_m'].idxmax()
-    tiempo_apogeo = df.loc[idx_apogeo, 'time_s']
+    tiempos = vuelo['time_s']
+    pos_apogeo = int(np.nanargmax(vuelo['altitude_m']))
+    tiempo_apogeo = tiempos[pos_apogeo]
     
     # Paracaídas se abre pasivamente poco después del apogeo
     ventana_inicio = tiempo_apogeo + 0.3
     ventana_fin = tiempo_apogeo + 2.0
     
-    descenso = df[(df['time_s'] >= ventana_inicio) & (df['time_s'] <= ventana_fin)].copy()
-    
-    if len(descenso) < 5:
-        idx_estimado = df[df['time_s'] > tiempo_apogeo].head(5).index[-1] if len(df[df['time_s'] > tiempo_apogeo]) >= 5 else idx_apogeo + 3
-        if idx_estimado >= len(df):
-            idx_estimado = idx_apogeo + 1
-        
-        return {
-            'idx_despliegue': idx_estimado,
-            'tiempo_despliegue': df.loc[idx_estimado, 'time_s'],
-            'altitud_despliegue': df.loc[idx_estimado, 'altitude_m'],
-            'presion_despliegue': df.loc[idx_estimado, 'pressure_pa']
-        }
-    
-    # Buscar donde la tasa se estabiliza (paracaídas totalmente abierto)
-    tasa_suavizada = descenso['tasa_suavizada'].fillna(0)
-    variacion = tasa_suavizada.rolling(window=3).std()
+    posiciones = np.flatnonzero((tiempos >= ventana_inicio) & (tiempos <= ventana_fin))
     
-    if len(variacion.dropna()) > 0:
-        idx_despliegue = variacion.idxmin()
+    if len(posiciones) < 5:
+        despues = np.flatnonzero(tiempos > tiempo_apogeo)
+        pos = despues[4] if len(despues) >= 5 else pos_apogeo + 3
+        if pos >= len(tiempos):
+            pos = pos_apogeo + 1
     else:
-        idx_despliegue = descenso.index[len(descenso)//2]
+        # Buscar donde la tasa se estabiliza (paracaídas totalmente abierto)
+        # Desviación móvil de 3 muestras (cada ventana termina en la posición elegida)
+        tasa = np.nan_to_num(vuelo['tasa_suavizada'][posiciones])
+        variacion = np.lib.stride_tricks.sliding_window_view(tasa, 3).std(axis=1, ddof=1)
+        pos = posiciones[int(np.argmin(variacion)) + 2]
     
     return {
-        'idx_despliegue': idx_despliegue,
-        'tiempo_despliegue': df.loc[idx_despliegue, 'time_s'],
-        'altitud_despliegue': df.loc[idx_despliegue, 'altitude_m'],
-        'presion_despliegue': df.loc[idx_despliegue, 'pressure_pa']
+        'idx_despliegue': int(vuelo['fila'][pos]),
+        'tiempo_despliegue': float(tiempos[pos]),
+        'altitud_despliegue': float(vuelo['altitude_m'][pos]),
+        'presion_despliegue': float(vuelo['pressure_pa'][pos]),
+        'tiempo_apogeo': float(tiempo_apogeo),
+        'altitud_apogeo': float(vuelo['altitude_m'][pos_apogeo])
     }
 
-def crear_grafico_paracaidas(df, despliegue, titulo="🪂 Análisis del Paracaídas"):
+registrar_producto(
+    'despliegue_paracaidas',
+    lambda ruta: detectar_despliegue_paracaidas(calcular_tasa_cambio_presion(leer_csv_vuelo(ruta)))
+)
+
+def decimar_vuelo(vuelo, despliegue, max_puntos):
+    """Reduce las series a max_puntos muestras conservando apogeo y despliegue"""
+    filas = vuelo['fila']
+    conservar = [int(np.nanargmax(vuelo['altitude_m']))] if len(filas) else []
+    if despliegue:
+        pos = int(np.searchsorted(filas, despliegue['idx_despliegue']))
+        if pos < len(filas) and filas[pos] == despliegue['idx_despliegue']:
+            conservar.append(pos)
+    idx = decimar(
+        vuelo['time_s'],
+        [vuelo['pressure_pa'], np.nan_to_num(vuelo['tasa_suavizada'])],
+        max_puntos,
+        conservar=conservar
+    )
+    return {nombre: serie[idx] for nombre, serie in vuelo.items()}
+
+def crear_grafico_paracaidas(vuelo, despliegue, titulo="🪂 Análisis del Paracaídas", max_puntos=MAX_PUNTOS_DEFECTO):
     """Genera gráfico de presión y tasa de cambio con Plotly"""
+    vuelo = decimar_vuelo(vuelo, despliegue, max_puntos)
     fig = make_subplots(
         rows=2, cols=1,
         subplot_titles=('Presión Atmosférica', 'Tasa de Cambio de Presión'),
@@ -89,7 +111,7 @@ def crear_grafico_paracaidas(df, despliegue, titulo="🪂 Análisis del Paracaí
     # Gráfica 1: Presión vs Tiempo
     fig.add_trace(
         go.Scatter(
-            x=df['time_s'], y=df['pressure_pa'],
+            x=vuelo['time_s'], y=vuelo['pressure_pa'],
             mode='lines', name='Presión',
             line=dict(color='#2196F3', width=2),
             hovertemplate='Tiempo: %{x:.2f}s<br>Presión: %{y:.0f} Pa<extra></extra>'
@@ -100,7 +122,7 @@ def crear_grafico_paracaidas(df, despliegue, titulo="🪂 Análisis del Paracaí
     # Gráfica 2: Tasa de cambio
     fig.add_trace(
         go.Scatter(
-            x=df['time_s'], y=df['tasa_suavizada'],
+            x=vuelo['time_s'], y=vuelo['tasa_suavizada'],
             mode='lines', name='Tasa de Cambio',
             line=dict(color='#FF9800', width=2),
             hovertemplate='Tiempo: %{x:.2f}s<br>Tasa: %{y:.1f} Pa/s<extra></extra>'
@@ -140,25 +162,15 @@ def crear_grafico_paracaidas(df, despliegue, titulo="🪂 Análisis del Paracaí
     
     return fig.to_html(full_html=False, include_plotlyjs='cdn')
 
-def calcular_estadisticas(df, despliegue):
-    """Calcula estadísticas del análisis"""
-    idx_apogeo = df['altitude_m'].idxmax()
-    
-    stats = {
-        'apogeo_altitud': f"{df.loc[idx_apogeo, 'altitude_m']:.2f}",
-        'apogeo_tiempo': f"{df.loc[idx_apogeo, 'time_s']:.2f}"
+def calcular_estadisticas(despliegue):
+    """Calcula estadísticas del análisis (del producto de despliegue, sin leer el CSV)"""
+    return {
+        'apogeo_altitud': f"{despliegue['altitud_apogeo']:.2f}",
+        'apogeo_tiempo': f"{despliegue['tiempo_apogeo']:.2f}",
+        'despliegue_tiempo': f"{despliegue['tiempo_despliegue']:.2f}",
+        'despliegue_altitud': f"{despliegue['altitud_despliegue']:.2f}",
+        'despliegue_confirmado': "Sí"
     }
-    
-    if despliegue:
-        stats['despliegue_tiempo'] = f"{despliegue['tiempo_despliegue']:.2f}"
-        stats['despliegue_altitud'] = f"{despliegue['altitud_despliegue']:.2f}"
-        stats['despliegue_confirmado'] = "Sí"
-    else:
-        stats['despliegue_tiempo'] = "No detectado"
-        stats['despliegue_altitud'] = "N/A"
-        stats['despliegue_confirmado'] = "No"
-    
-    return stats
 
 # ============================================================================
 # RUTAS
@@ -173,18 +185,29 @@ def index():
         csv_file = LANZAMIENTOS.get(lanzamiento_id, LANZAMIENTOS['1'])
         csv_path = os.path.join('data', csv_file)
         
-        df = leer_csv_vuelo(csv_path)
-        df = calcular_tasa_cambio_presion(df)
-        despliegue = detectar_despliegue_paracaidas(df)
-        grafico = crear_grafico_paracaidas(df, despliegue, f"🪂 Lanzamiento {lanzamiento_id} - Análisis de Paracaídas")
-        estadisticas = calcular_estadisticas(df, despliegue)
-        
-        return render_template('analisis_paracaidas.html',
-                             grafico=grafico,
-                             estadisticas=estadisticas,
-                             lanzamientos=LANZAMIENTOS,
-                             lanzamiento_actual=lanzamiento_id,
-                             error=None)
+        # La versión del CSV decide el ETag: si el navegador ya la tiene, 304
+        firma = firma_archivo(csv_path)
+        max_puntos = leer_max_points(request.args)
+        etag = etag_grafico(csv_path, 'paracaidas', firma, lanzamiento_id, max_puntos)
+
+        def renderizar():
+            despliegue = obtener_producto(csv_path, 'despliegue_paracaidas')
+            # El CSV solo se lee si el gráfico no está en la caché
+            grafico = obtener_grafico(
+                csv_path, 'paracaidas',
+                lambda: crear_grafico_paracaidas(calcular_tasa_cambio_presion(leer_csv_vuelo(csv_path)), despliegue,
+                                                 f"🪂 Lanzamiento {lanzamiento_id} - Análisis de Paracaídas",
+                                                 max_puntos),
+                lanzamiento_id, max_puntos, firma=firma
+            )
+            return render_template('analisis_paracaidas.html',
+                                 grafico=grafico,
+                                 estadisticas=calcular_estadisticas(despliegue),
+                                 lanzamientos=LANZAMIENTOS,
+                                 lanzamiento_actual=lanzamiento_id,
+                                 error=None)
+
+        return respuesta_condicional(request.environ, etag, firma, renderizar)
     except Exception as e:
         return render_template('analisis_paracaidas.html',
                              grafico=None,
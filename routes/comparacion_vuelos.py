@@ -0,0 +1,61 @@
+from flask import Blueprint, render_template, jsonify, request
+import os
+import numpy as np
+
+from servicios.almacen_vuelos import listar_csv
+from servicios import comparacion_vuelos
+from servicios.decimacion import leer_max_points
+
+bp = Blueprint('comparacion_vuelos', __name__, url_prefix='/comparar-vuelos')
+
+DATA_DIR = os.path.join(os.getcwd(), "data")
+
+
+def leer_vuelos(args):
+    """Archivos pedidos con ?vuelos=a.csv&vuelos=b.csv o ?vuelos=a.csv,b.csv"""
+    nombres = [n.strip() for valor in args.getlist('vuelos') for n in valor.split(',') if n.strip()]
+    disponibles = set(listar_csv(DATA_DIR))
+    desconocidos = [n for n in nombres if n not in disponibles]
+    if desconocidos:
+        raise ValueError(f"Vuelos no encontrados: {', '.join(desconocidos)}")
+    return nombres or sorted(disponibles)
+
+
+def a_lista(arreglo, decimales=4):
+    """Lista JSON (NaN → null) de un arreglo de 1 o 2 dimensiones."""
+    return np.where(np.isnan(arreglo), None, np.round(arreglo, decimales)).tolist()
+
+
+@bp.route('/')
+def index():
+    """Página de comparación de vuelos superpuestos"""
+    return render_template('comparacion_vuelos.html', archivos=listar_csv(DATA_DIR),
+                           alineaciones=comparacion_vuelos.ALINEACIONES,
+                           columnas=comparacion_vuelos.COLUMNAS_COMPARABLES)
+
+
+@bp.route('/api/datos')
+def api_datos():
+    """Series de varios vuelos alineadas en el despegue o el apogeo.
+
+    Parámetros: vuelos (por defecto todos), alinear=despegue|apogeo,
+    columna=altitude_m|pressure_pa|temp_c, desde/hasta (s relativos al
+    evento) y max_points (puntos de la grilla común).
+    """
+    try:
+        nombres = leer_vuelos(request.args)
+        puntos = leer_max_points(request.args) or comparacion_vuelos.MAX_PUNTOS_GRILLA
+        desde, hasta = (request.args.get(k, type=float) for k in ('desde', 'hasta'))
+        resultado = comparacion_vuelos.comparar(
+            [os.path.join(DATA_DIR, n) for n in nombres],
+            alineacion=request.args.get('alinear', 'despegue'),
+            columna=request.args.get('columna', 'altitude_m'),
+            puntos=puntos, desde=desde, hasta=hasta
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    resultado['tiempo_referencia'] = a_lista(np.asarray(resultado['tiempo_referencia'], dtype=float))
+    for clave in ('tiempo', 'series', 'media'):
+        resultado[clave] = a_lista(resultado[clave])
+    return jsonify(resultado)
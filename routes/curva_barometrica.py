@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, jsonify
-import csv
+from flask import Blueprint, render_template, jsonify, request
 import os
-from math import exp
+import numpy as np
+
+from servicios.almacen_vuelos import obtener_vuelo, listar_csv
+from servicios import calculos
+from servicios.productos_vuelo import registrar_producto, obtener_producto
+from servicios.decimacion import decimar, leer_max_points
+from servicios.asincrono import en_hilo, vista_asincrona
+from servicios.formato_respuesta import responder_columnas
 
 bp = Blueprint("curva_barometrica", __name__, url_prefix="/curva-barometrica")
 
@@ -12,49 +18,62 @@ DATA_DIR = os.path.join(os.getcwd(), "data")
 @bp.route("/")
 def index():
     """Carga la vista principal con la lista de archivos CSV."""
-    archivos = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
+    archivos = listar_csv(DATA_DIR)
     return render_template("curva_barometrica.html", archivos=archivos)
 
 
 def leer_csv(filepath):
-    """Lee el CSV del vuelo y devuelve altitud y presión real."""
-    altitudes = []
-    presiones = []
-
-    with open(filepath, "r", encoding="utf-8-sig") as f:
-        rd = csv.DictReader(f)
-        for row in rd:
-            try:
-                altitudes.append(float(row["altitude_m"]))
-                presiones.append(float(row["pressure_pa"]))
-            except:
-                pass
-
-    return altitudes, presiones
+    """Altitud y presión real del vuelo (arreglos del almacén, sin copiar a listas)."""
+    return obtener_vuelo(filepath).columnas_validas("altitude_m", "pressure_pa")
 
 
 def presion_barometrica(h, p0=101325, T=288.15, L=0.0065):
     """Ecuación barométrica para presión teórica."""
-    R = 287.05
-    g = 9.80665
-    return p0 * (1 - (L * h / T)) ** (g / (R * L))
+    return float(calculos.presion_barometrica(h, p0, T, L))
+
+
+def calcular_curva(filepath):
+    """Presión real y teórica (ecuación barométrica) para cada altitud del vuelo."""
+    altitudes, presiones_reales = leer_csv(filepath)
+    return {
+        "altitudes": altitudes,
+        "presiones_reales": presiones_reales,
+        "presiones_teoricas": calculos.presion_barometrica(altitudes)
+    }
+
+
+registrar_producto("curva_barometrica", calcular_curva)
+
+
+def decimar_curva(curva, max_puntos):
+    """Decima las tres series de la curva conservando el apogeo."""
+    altitudes = curva["altitudes"]
+    apogeo = [int(np.argmax(altitudes))] if len(altitudes) else []
+    idx = decimar(
+        np.arange(len(altitudes)),
+        [altitudes, curva["presiones_reales"]],
+        max_puntos,
+        conservar=apogeo
+    )
+    return {nombre: serie[idx] for nombre, serie in curva.items()}
 
 
 @bp.route("/api/datos/<archivo>")
-def api_datos(archivo):
-    """Devuelve JSON con presión real y presión teórica."""
-    
+@vista_asincrona
+async def api_datos(archivo):
+    """Devuelve JSON con presión real y presión teórica.
+
+    Acepta ?max_points=N para decimar las series (0 = todas las muestras);
+    el apogeo siempre se conserva. Con ?formato=f32|f64|arrow (o Accept)
+    responde en binario; ver servicios.formato_respuesta.
+    """
     filepath = os.path.join(DATA_DIR, archivo)
-    print(">> Cargando archivo curva barométrica:", filepath)
 
-    if not os.path.exists(filepath):
+    if not await en_hilo(os.path.exists, filepath):
         return jsonify({"error": "Archivo no encontrado"}), 404
 
-    altitudes, presiones_reales = leer_csv(filepath)
-    presiones_teoricas = [presion_barometrica(h) for h in altitudes]
-
-    return jsonify({
-        "altitudes": altitudes,
-        "presiones_reales": presiones_reales,
-        "presiones_teoricas": presiones_teoricas
-    })
+    # La curva queda en la caché de productos del proceso: lectura y decimado
+    # van al pool de hilos (pasar los arreglos a otro proceso costaría más)
+    curva = await en_hilo(obtener_producto, filepath, "curva_barometrica")
+    columnas = await en_hilo(decimar_curva, curva, leer_max_points(request.args))
+    return responder_columnas(request, columnas)
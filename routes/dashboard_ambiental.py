@@ -1,72 +1,61 @@
-from flask import Blueprint, render_template, jsonify
-import csv
+from flask import Blueprint, render_template, jsonify, request
+import asyncio
 import os
-import requests
-from statistics import mean
+import numpy as np
+
+from servicios.almacen_vuelos import obtener_vuelo, listar_csv
+from servicios.lectura_streaming import resumen_ambiental
+from servicios.decimacion import decimar, leer_max_points
+from servicios import meteorologia
+from servicios.asincrono import en_hilo, en_proceso, vista_asincrona
+from servicios.formato_respuesta import responder_columnas
 
 bp = Blueprint('dashboard_ambiental', __name__, url_prefix='/dashboard-ambiental')
 
 DATA_DIR = os.path.join(os.getcwd(), "data")
 
-WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
-
 
 @bp.route('/')
 def index():
-    archivos = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
+    archivos = listar_csv(DATA_DIR)
     return render_template('dashboard_ambiental.html', archivos=archivos)
 
 
-def obtener_datos_meteorologicos(lat=2.4448, lon=-76.6147):
+def analizar_csv(filepath, max_puntos=None):
     try:
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "current": "temperature_2m,surface_pressure",
-            "timezone": "America/Bogota"
+        vuelo = obtener_vuelo(filepath)
+        tiempos, temperaturas, presiones, altitudes = vuelo.columnas_validas(
+            'time_s', 'temp_c', 'pressure_pa', 'altitude_m'
+        )
+
+        # Decimación para el gráfico (conservando el apogeo)
+        apogeo = [int(np.argmax(altitudes))] if len(altitudes) else []
+        idx = decimar(tiempos, [temperaturas, presiones, altitudes], max_puntos, conservar=apogeo)
+        tiempos, temperaturas, presiones, altitudes = (
+            tiempos[idx], temperaturas[idx], presiones[idx], altitudes[idx]
+        )
+
+        datos = {
+            'tiempos': tiempos,
+            'temperaturas': temperaturas,
+            'presiones': presiones,
+            'altitudes': altitudes
         }
 
-        r = requests.get(WEATHER_API_URL, params=params, timeout=5)
-        data = r.json().get("current", {})
-
-        return {
-            "temperatura": data.get("temperature_2m"),
-            "presion": data.get("surface_pressure", 0) * 100,
-            "timestamp": data.get("time"),
-            "exito": True
-        }
-
-    except:
-        return {"temperatura": None, "presion": None, "timestamp": None, "exito": False}
-
-
-def analizar_csv(filepath):
-    datos = {
-        'tiempos': [],
-        'temperaturas': [],
-        'presiones': [],
-        'altitudes': []
-    }
-
-    try:
-        with open(filepath, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                datos['tiempos'].append(float(row.get('time_s', 0)))
-                datos['temperaturas'].append(float(row.get('temp_c', 0)))
-                datos['presiones'].append(float(row.get('pressure_pa', 0)))
-                datos['altitudes'].append(float(row.get('altitude_m', 0)))
+        # Estadísticas con acumuladores online (sin recorrer las listas)
+        resumen = resumen_ambiental(filepath)
+        if resumen['time_s'].n == 0:
+            raise ValueError("CSV sin filas válidas")
 
         est = {
-            'temp_promedio': round(mean(datos['temperaturas']), 2),
-            'temp_min': min(datos['temperaturas']),
-            'temp_max': max(datos['temperaturas']),
-            'presion_promedio': round(mean(datos['presiones']), 2),
-            'presion_min': min(datos['presiones']),
-            'presion_max': max(datos['presiones']),
-            'altitud_max': max(datos['altitudes']),
-            'duracion': max(datos['tiempos'])
+            'temp_promedio': round(resumen['temp_c'].media, 2),
+            'temp_min': resumen['temp_c'].minimo,
+            'temp_max': resumen['temp_c'].maximo,
+            'presion_promedio': round(resumen['pressure_pa'].media, 2),
+            'presion_min': resumen['pressure_pa'].minimo,
+            'presion_max': resumen['pressure_pa'].maximo,
+            'altitud_max': resumen['altitude_m'].maximo,
+            'duracion': resumen['time_s'].maximo
         }
 
         return datos, est
@@ -78,21 +67,28 @@ def analizar_csv(filepath):
 
 # @bp.route('/api/datos/<archivo>')
 @bp.route('/api/datos/<path:archivo>')
-def api_datos(archivo):
+@vista_asincrona
+async def api_datos(archivo):
+    """Series del vuelo, estadísticas y comparación con el clima.
 
+    Con ?formato=f32|f64|arrow (o Accept) las series van en binario y el
+    resto como metadatos; ver servicios.formato_respuesta.
+    """
     filepath = os.path.join(DATA_DIR, archivo)
     print("Cargando archivo:", filepath)
     
-    if not os.path.exists(filepath):
+    if not await en_hilo(os.path.exists, filepath):
         return jsonify({"error": "Archivo no encontrado"}), 404
 
-    datos_csv, est = analizar_csv(filepath)
+    # El análisis del CSV (pool de procesos) y el clima (pool de hilos) corren a la vez
+    (datos_csv, est), meteo = await asyncio.gather(
+        en_proceso(analizar_csv, filepath, leer_max_points(request.args)),
+        en_hilo(meteorologia.obtener_datos_meteorologicos)
+    )
 
     if datos_csv is None:
         return jsonify({"error": "Error procesando CSV"}), 500
 
-    meteo = obtener_datos_meteorologicos()
-
     comparacion = {
         "diff_temperatura": None,
         "diff_temperatura_porcentaje": None,
@@ -111,11 +107,15 @@ def api_datos(archivo):
             comparacion["diff_presion"] = round(diff, 2)
             comparacion["diff_presion_porcentaje"] = round((diff / meteo["presion"]) * 100, 2)
 
-    return jsonify({
-        "csv": {
-            **datos_csv,
-            "estadisticas": est
-        },
-        "meteorologico": meteo,
-        "comparacion": comparacion
-    })
+    return responder_columnas(
+        request, datos_csv,
+        metadatos={"estadisticas": est, "meteorologico": meteo, "comparacion": comparacion},
+        armar_json=lambda listas: {
+            "csv": {
+                **listas,
+                "estadisticas": est
+            },
+            "meteorologico": meteo,
+            "comparacion": comparacion
+        }
+    )
@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template
 import os
-import csv
+import math
+
+from servicios.indice_vuelos import resumen_vuelo, resumenes
+from servicios import calculos
 
 bp = Blueprint("densidad_aire", __name__, url_prefix="/densidad-aire")
 
@@ -9,38 +12,18 @@ R = 287.05
 
 
 def calcular_densidad_air(pressure_pa, temp_c):
-    temp_k = temp_c + 273.15
-    if temp_k <= 0:
-        return None
-    return pressure_pa / (R * temp_k)
+    rho = float(calculos.densidad_aire(pressure_pa, temp_c, R))
+    return None if math.isnan(rho) else rho
 
 
-def analizar_csv_densidad(path_csv):
-    densidades = []
-    tiempos = []
-
-    with open(path_csv, "r") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                p = float(row["pressure_pa"])
-                t = float(row["temp_c"])
-
-                time = float(row["time_s"])
-            except:
-                continue
-
-            rho = calcular_densidad_air(p, t)
-            if rho is not None:
-                densidades.append(rho)
-                tiempos.append(time)
-
-    if not densidades:
+def formatear_densidad(resumen):
+    # Estadísticas de densidad precalculadas en el índice de resúmenes
+    if resumen["dens_n"] == 0:
         return None
 
-    dens_prom = sum(densidades) / len(densidades)
-    dens_min = min(densidades)
-    dens_max = max(densidades)
+    dens_prom = resumen["dens_promedio"]
+    dens_min = resumen["dens_min"]
+    dens_max = resumen["dens_max"]
 
     # Explicación automática basada en densidad promedio
     explicacion = ""
@@ -61,7 +44,7 @@ def analizar_csv_densidad(path_csv):
         )
 
     return {
-        "archivo": os.path.basename(path_csv),
+        "archivo": resumen["archivo"],
         "dens_promedio": round(dens_prom, 4),
         "dens_min": round(dens_min, 4),
         "dens_max": round(dens_max, 4),
@@ -69,22 +52,23 @@ def analizar_csv_densidad(path_csv):
     }
 
 
+def analizar_csv_densidad(path_csv):
+    return formatear_densidad(resumen_vuelo(path_csv))
+
+
 def procesar_densidades():
     # Ruta correcta EXACTA (misma usada en los otros módulos)
     base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data")
     base = os.path.abspath(base)
 
     print("📂 Leyendo CSV desde:", base)  # DEBUG
-    print("Archivos encontrados:", os.listdir(base))  # DEBUG
 
     resultados = []
 
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            ruta = os.path.join(base, archivo)
-            analisis = analizar_csv_densidad(ruta)
-            if analisis:
-                resultados.append(analisis)
+    for resumen in resumenes(base):
+        analisis = formatear_densidad(resumen)
+        if analisis:
+            resultados.append(analisis)
 
     return resultados
 
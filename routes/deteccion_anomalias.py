@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template
 import os
-import pandas as pd
 import statistics
 import random
 
+from servicios.indice_vuelos import estadistica_columna
+
 bp = Blueprint("deteccion_anomalias", __name__, url_prefix="/deteccion-anomalias")
 
 # Datos reales del día
@@ -23,35 +24,27 @@ def index():
     base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
     base = os.path.abspath(base)
 
-    presiones = []
-    temperaturas = []
-
-    # ---- LEER CSV DE DATA (si existen) ----
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            path = os.path.join(base, archivo)
-            df = pd.read_csv(path)
-
-            # presión en hPa
-            if "pressure_Pa" in df.columns:
-                presiones.extend((df["pressure_Pa"] / 100).tolist())
-
-            if "temperature_C" in df.columns:
-                temperaturas.extend(df["temperature_C"].tolist())
+    # ---- ESTADÍSTICAS DE DATA (desde el índice de resúmenes) ----
+    est_presion = estadistica_columna("pressure_Pa", base)
+    est_temperatura = estadistica_columna("temperature_C", base)
 
     # ---- SI NO HAY DATOS, LOS GENERO ARTIFICIALMENTE (realistas) ----
-    if len(presiones) == 0:
+    if est_presion.n == 0:
         presiones = [
             random.uniform(825, 840) for _ in range(4)
         ]  # valores cercanos a presión real del vuelo
-    if len(temperaturas) == 0:
+        prom_presion = statistics.mean(presiones)
+    else:
+        prom_presion = est_presion.media / 100  # presión en hPa
+    if est_temperatura.n == 0:
         temperaturas = [
             random.uniform(27, 29.5) for _ in range(4)
         ]  # valores similares a temp medida
+        prom_temperatura = statistics.mean(temperaturas)
+    else:
+        prom_temperatura = est_temperatura.media
 
     # ---- PROMEDIOS ----
-    prom_presion = statistics.mean(presiones)
-    prom_temperatura = statistics.mean(temperaturas)
     prom_altura = statistics.mean(ALTURAS_MANUALES)
 
     # ------------------------
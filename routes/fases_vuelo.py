@@ -1,8 +1,12 @@
 from flask import Blueprint, render_template, request
-import pandas as pd
 import plotly.graph_objects as go
 import os
 
+from servicios.almacen_vuelos import obtener_vuelo, firma_archivo
+from servicios.cache_graficos import etag_grafico, obtener_grafico, respuesta_condicional
+from servicios.productos_vuelo import registrar_producto, obtener_producto
+from servicios.decimacion import MAX_PUNTOS_DEFECTO, decimar, leer_max_points
+
 bp = Blueprint('fases_vuelo', __name__, url_prefix='/fases-vuelo')
 
 # ============================================================================
@@ -21,13 +25,8 @@ LANZAMIENTOS = {
 
 def leer_csv_vuelo(csv_path):
     """Lee y limpia datos de CSV de vuelo"""
-    df = pd.read_csv(csv_path)
-    # Limpiar header duplicado si existe
-    if df.iloc[0]['timestamp_ms'] == 'timestamp_ms':
-        df = df.iloc[1:].reset_index(drop=True)
-    # Convertir a numérico
-    df['time_s'] = pd.to_numeric(df['time_s'], errors='coerce')
-    df['altitude_m'] = pd.to_numeric(df['altitude_m'], errors='coerce')
+    # El almacén ya convierte a numérico (un header duplicado queda como NaN)
+    df = obtener_vuelo(csv_path).dataframe()
     return df.dropna(subset=['time_s', 'altitude_m'])
 
 def identificar_fases(df):
@@ -48,12 +47,20 @@ def identificar_fases(df):
         'tiempo_aterrizaje': df.loc[idx_aterrizaje, 'time_s']
     }
 
-def crear_grafico_fases(df, fases, titulo="🚀 Análisis de Fases del Vuelo"):
+registrar_producto('fases', lambda ruta: identificar_fases(leer_csv_vuelo(ruta)))
+
+def decimar_tramo(tramo, max_puntos):
+    """Reduce un tramo del vuelo a max_puntos (conserva sus extremos)"""
+    idx = decimar(tramo['time_s'].to_numpy(), [tramo['altitude_m'].to_numpy()], max_puntos)
+    return tramo.iloc[idx]
+
+def crear_grafico_fases(df, fases, titulo="🚀 Análisis de Fases del Vuelo", max_puntos=MAX_PUNTOS_DEFECTO):
     """Genera gráfico interactivo de fases del vuelo con Plotly"""
     fig = go.Figure()
+    por_tramo = max_puntos // 2 if max_puntos else None
     
-    # Fase Ascenso
-    ascenso = df.iloc[fases['idx_despegue']:fases['idx_apogeo']+1]
+    # Fase Ascenso (los extremos del tramo son despegue y apogeo)
+    ascenso = decimar_tramo(df.iloc[fases['idx_despegue']:fases['idx_apogeo']+1], por_tramo)
     fig.add_trace(go.Scatter(
         x=ascenso['time_s'], y=ascenso['altitude_m'],
         mode='lines', name='Ascenso',
@@ -62,7 +69,7 @@ def crear_grafico_fases(df, fases, titulo="🚀 Análisis de Fases del Vuelo"):
     ))
     
     # Fase Descenso
-    descenso = df.iloc[fases['idx_apogeo']:fases['idx_aterrizaje']+1]
+    descenso = decimar_tramo(df.iloc[fases['idx_apogeo']:fases['idx_aterrizaje']+1], por_tramo)
     fig.add_trace(go.Scatter(
         x=descenso['time_s'], y=descenso['altitude_m'],
         mode='lines', name='Descenso',
@@ -127,18 +134,27 @@ def index():
         csv_file = LANZAMIENTOS.get(lanzamiento_id, LANZAMIENTOS['1'])
         csv_path = os.path.join('data', csv_file)
         
-        # Procesar datos
-        df = leer_csv_vuelo(csv_path)
-        fases = identificar_fases(df)
-        grafico = crear_grafico_fases(df, fases, f"🚀 Lanzamiento {lanzamiento_id} - Fases del Vuelo")
-        estadisticas = calcular_estadisticas(fases)
-        
-        return render_template('fases_vuelo.html', 
-                             grafico=grafico,
-                             estadisticas=estadisticas,
-                             lanzamientos=LANZAMIENTOS,
-                             lanzamiento_actual=lanzamiento_id,
-                             error=None)
+        # La versión del CSV decide el ETag: si el navegador ya la tiene, 304
+        firma = firma_archivo(csv_path)
+        max_puntos = leer_max_points(request.args)
+        etag = etag_grafico(csv_path, 'fases', firma, lanzamiento_id, max_puntos)
+
+        def renderizar():
+            fases = obtener_producto(csv_path, 'fases')
+            grafico = obtener_grafico(
+                csv_path, 'fases',
+                lambda: crear_grafico_fases(leer_csv_vuelo(csv_path), fases,
+                                            f"🚀 Lanzamiento {lanzamiento_id} - Fases del Vuelo", max_puntos),
+                lanzamiento_id, max_puntos, firma=firma
+            )
+            return render_template('fases_vuelo.html', 
+                                 grafico=grafico,
+                                 estadisticas=calcular_estadisticas(fases),
+                                 lanzamientos=LANZAMIENTOS,
+                                 lanzamiento_actual=lanzamiento_id,
+                                 error=None)
+
+        return respuesta_condicional(request.environ, etag, firma, renderizar)
     except Exception as e:
         return render_template('fases_vuelo.html', 
                              grafico=None, 
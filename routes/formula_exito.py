@@ -1,38 +1,49 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
 import os
-import csv
+
+import numpy as np
+
+from servicios.indice_vuelos import resumen_vuelo, resumenes
+from servicios import metadatos_vuelos
+from servicios import optimizador
+from routes.simulador import MAX_VOLUMEN_L, PSI_MAX
 
 bp = Blueprint("formula_exito", __name__, url_prefix="/formula-exito")
 
-# Parámetros constantes del laboratorio
-PRESION_USADA = 60        # PSI
-AGUA_USADA = 1.0          # Litros
-CAPACIDAD_BOTELLA = 3.0   # Litros
+# Parámetros constantes del laboratorio (por vuelo se pueden ajustar en data/vuelos.json)
+PRESION_USADA = metadatos_vuelos.PRESION_PSI       # PSI
+AGUA_USADA = metadatos_vuelos.AGUA_L               # Litros
+CAPACIDAD_BOTELLA = metadatos_vuelos.CAPACIDAD_L   # Litros
 
+# Grilla por defecto del optimizador (~10^5 combinaciones): eje -> (mín, máx, pasos)
+RANGOS_OPTIMIZACION = {
+    "psi": (20.0, 80.0, 121),
+    "agua": (0.1, 2.1, 41),
+    "capacidad": (0.5, 3.5, 31),
+}
+MAX_PUNTOS_OPTIMIZACION = 500000
 
-def analizar_lanzamiento(path_csv):
-    tiempos = []
-    alturas = []
+# Máximo de cada eje: la presión hasta el límite del simulador (fuera de eso
+# la calibración no dice nada) y volúmenes de botellas reales
+MAXIMOS_OPTIMIZACION = {
+    "psi": PSI_MAX,
+    "agua": MAX_VOLUMEN_L,
+    "capacidad": MAX_VOLUMEN_L,
+}
 
-    with open(path_csv, "r") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                t = float(row["time_s"])
-                h = float(row["altitude_m"])
-            except:
-                continue
 
-            tiempos.append(t)
-            alturas.append(h)
+def formatear_lanzamiento(resumen):
+    """Resultado de un lanzamiento a partir de su fila en el índice de resúmenes."""
+    if resumen["filas"] == 0:
+        return None
 
-    apogeo = max(alturas)
-    tiempo_apogeo = tiempos[alturas.index(apogeo)]
+    apogeo = resumen["apogeo"]
+    tiempo_apogeo = resumen["tiempo_apogeo"]
 
     eficiencia = apogeo / AGUA_USADA  # m por litro
 
     return {
-        "archivo": os.path.basename(path_csv),
+        "archivo": resumen["archivo"],
         "apogeo": round(apogeo, 2),
         "tiempo_apogeo": round(tiempo_apogeo, 2),
         "presion": PRESION_USADA,
@@ -41,16 +52,20 @@ def analizar_lanzamiento(path_csv):
     }
 
 
+def analizar_lanzamiento(path_csv):
+    return formatear_lanzamiento(resumen_vuelo(path_csv))
+
+
 def procesar_formula_exito():
     base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
     base = os.path.abspath(base)
 
     resultados = []
 
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            ruta = os.path.join(base, archivo)
-            resultados.append(analizar_lanzamiento(ruta))
+    for resumen in resumenes(base):
+        analisis = formatear_lanzamiento(resumen)
+        if analisis:
+            resultados.append(analisis)
 
     if not resultados:
         return None, []
@@ -69,3 +84,42 @@ def index():
         mejor=mejor,
         resultados=resultados
     )
+
+
+def leer_rango(args, eje):
+    """Eje de la grilla desde ?<eje>_min, ?<eje>_max y ?<eje>_pasos."""
+    minimo, maximo, pasos = RANGOS_OPTIMIZACION[eje]
+    try:
+        minimo = float(args.get(f"{eje}_min", minimo))
+        maximo = float(args.get(f"{eje}_max", maximo))
+        pasos = int(args.get(f"{eje}_pasos", pasos))
+    except ValueError:
+        raise ValueError(f"Rango de '{eje}' inválido")
+    if not (np.isfinite(minimo) and np.isfinite(maximo)) or minimo < 0 or maximo < minimo or pasos < 1:
+        raise ValueError(f"Rango de '{eje}' inválido")
+    if maximo > MAXIMOS_OPTIMIZACION[eje]:
+        raise ValueError(f"'{eje}' no puede superar {MAXIMOS_OPTIMIZACION[eje]:g}")
+    return np.linspace(minimo, maximo, pasos)
+
+
+@bp.route("/optimizar")
+def optimizar():
+    """Combinación presión / agua / botella con mayor apogeo predicho.
+
+    Barre la grilla con el motor físico calibrado y devuelve el óptimo con
+    su intervalo de confianza y la región casi óptima.
+    """
+    try:
+        presiones, aguas, capacidades = (leer_rango(request.args, eje) for eje in RANGOS_OPTIMIZACION)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if presiones.size * aguas.size * capacidades.size > MAX_PUNTOS_OPTIMIZACION:
+        return jsonify({"error": f"Máximo {MAX_PUNTOS_OPTIMIZACION} combinaciones por búsqueda"}), 400
+
+    try:
+        optimo = optimizador.optimizar(presiones, aguas, capacidades)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if optimo is None:
+        return jsonify({"error": "Ninguna combinación tiene menos agua que botella"}), 400
+    return jsonify(optimo)
@@ -5,6 +5,9 @@ import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 
+from servicios.almacen_vuelos import obtener_vuelo, listar_csv
+from servicios.registro_modelos import registrar_modelo, obtener_modelo
+
 # CORREGIDO: Cambié el nombre a 'prediccion_bp' para coincidir con tu registro
 bp = Blueprint('prediccion', __name__, url_prefix='/prediccion')
 
@@ -15,21 +18,51 @@ def limpiar_valor(v):
     except:
         return np.nan
 
+# Columnas que alimentan las features del modelo (el resto del CSV no se lee)
+FEATURES_COLUMNAS = ("pressure_Pa", "temperature_C", "accelZ", "velocity_m_s", "time_s", "altitude_m")
+
+def limpiar_serie(serie):
+    """Versión vectorizada de limpiar_valor para una columna completa."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.astype(str).str.replace(",", ".", regex=False).str.strip()
+    return pd.to_numeric(texto, errors="coerce")
+
+def extraer_features(path):
+    """Lee solo las columnas de features y devuelve (features, altura_max)."""
+    df = pd.read_csv(path, usecols=lambda c: c in FEATURES_COLUMNAS, float_precision="round_trip")
+
+    # --- Limpiar solo las columnas usadas (sin apply celda por celda) ---
+    for col in df.columns:
+        df[col] = limpiar_serie(df[col])
+
+    # --- features de entrada ---
+    features = []
+
+    if "pressure_Pa" in df.columns:
+        features.append(df["pressure_Pa"].mean() / 100)  # hPa
+
+    if "temperature_C" in df.columns:
+        features.append(df["temperature_C"].mean())
+
+    if "accelZ" in df.columns:
+        features.append(df["accelZ"].max())
+
+    if "velocity_m_s" in df.columns:
+        features.append(df["velocity_m_s"].max())
+
+    if "time_s" in df.columns:
+        features.append(df["time_s"].iloc[-1])
+
+    altura = df["altitude_m"].max() if "altitude_m" in df.columns else None
+    return features, altura
+
 def analizar_csv(path):
     """Función para analizar archivos CSV - copiada desde app.py"""
-    import csv
-    
-    tiempos = []
-    alturas = []
-
-    with open(path, "r", encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                tiempos.append(float(row["time_s"]))
-                alturas.append(float(row["altitude_m"]))
-            except:
-                pass
+    vuelo = obtener_vuelo(path)
+    tiempos, alturas = vuelo.columnas_validas("time_s", "altitude_m")
+    tiempos = tiempos.tolist()
+    alturas = alturas.tolist()
 
     # Cálculo simple de altura máxima
     altura_real = max(alturas) if alturas else 0
@@ -43,63 +76,39 @@ def analizar_csv(path):
         "error_porcentual": 0  # Placeholder
     }
 
-@bp.route("/")
-def index():
-    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
-    base = os.path.abspath(base)
 
+# ============================================================================
+# ENTRENAMIENTO (una vez por huella de datos, ver servicios.registro_modelos)
+# ============================================================================
+def construir_modelo_features(base):
+    """Entrena el Random Forest con las features promedio de cada vuelo."""
     X = []  # features
     Y = []  # alturas reales
 
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            try:
-                df = pd.read_csv(os.path.join(base, archivo))
-
-                # --- Limpiar todas las columnas numéricas ---
-                for col in df.columns:
-                    df[col] = df[col].apply(limpiar_valor)
-
-                # --- features de entrada ---
-                features = []
-
-                if "pressure_Pa" in df.columns:
-                    features.append(df["pressure_Pa"].mean() / 100)  # hPa
+    for archivo in listar_csv(base):
+        try:
+            features, altura = extraer_features(os.path.join(base, archivo))
 
-                if "temperature_C" in df.columns:
-                    features.append(df["temperature_C"].mean())
-
-                if "accelZ" in df.columns:
-                    features.append(df["accelZ"].max())
-
-                if "velocity_m_s" in df.columns:
-                    features.append(df["velocity_m_s"].max())
-
-                if "time_s" in df.columns:
-                    features.append(df["time_s"].iloc[-1])
+            # Si no hay features válidas → omitir archivo
+            if len(features) == 0 or np.isnan(features).any():
+                continue
 
-                # Si no hay features válidas → omitir archivo
-                if len(features) == 0 or np.isnan(features).any():
-                    continue
+            X.append(features)
 
-                X.append(features)
-
-                # Altura real (target)
-                if "altitude_m" in df.columns:
-                    altura = df["altitude_m"].max()
-                    Y.append(limpiar_valor(altura))
-            except Exception as e:
-                print(f"Error procesando {archivo}: {e}")
-                continue
+            # Altura real (target)
+            if altura is not None:
+                Y.append(limpiar_valor(altura))
+        except Exception as e:
+            print(f"Error procesando {archivo}: {e}")
+            continue
 
     # Verificar que tenemos datos suficientes
     if len(X) < 2:
-        return render_template(
-            "prediccion.html",
-            prediccion="No se pudo entrenar el modelo. Faltan datos válidos.",
-            vuelos=len(Y) if 'Y' in locals() else 0,
-            modelo_usado="No aplicable"
-        )
+        return {
+            "modelo": None,
+            "mensaje": "No se pudo entrenar el modelo. Faltan datos válidos.",
+            "vuelos": len(Y)
+        }
 
     # Convertir a numpy y limpiar NaN
     X = np.array(X, dtype=float)
@@ -111,12 +120,11 @@ def index():
     Y = Y[mask]
 
     if len(X) < 2:
-        return render_template(
-            "prediccion.html",
-            prediccion="No se pudo entrenar el modelo. Faltan datos válidos después de limpieza.",
-            vuelos=len(Y),
-            modelo_usado="No aplicable"
-        )
+        return {
+            "modelo": None,
+            "mensaje": "No se pudo entrenar el modelo. Faltan datos válidos después de limpieza.",
+            "vuelos": len(Y)
+        }
 
     # Entrenar modelo REAL
     modelo = RandomForestRegressor(n_estimators=500, random_state=42)
@@ -126,40 +134,37 @@ def index():
     entrada = np.nanmean(X, axis=0).reshape(1, -1)
     prediccion_altura = modelo.predict(entrada)[0]
 
-    return render_template(
-        "prediccion.html",
-        prediccion=round(float(prediccion_altura), 2),
-        vuelos=len(Y),
-        modelo_usado="Random Forest Regressor (500 árboles)"
-    )
+    return {
+        "modelo": modelo,
+        "X": X,
+        "Y": Y,
+        "prediccion": round(float(prediccion_altura), 2),
+        "vuelos": len(Y)
+    }
 
-@bp.route("/resultados")
-def resultados():
-    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
-    base = os.path.abspath(base)
-    
+
+def construir_modelo_tiempo(base):
+    """Entrena el Random Forest altura ~ tiempo_total de cada vuelo."""
     vuelos = []
     X = []
     y = []
 
     # Leer CSVs y recolectar datos reales
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            info = analizar_csv(os.path.join(base, archivo))
-            vuelos.append(info)
+    for archivo in listar_csv(base):
+        info = analizar_csv(os.path.join(base, archivo))
+        vuelos.append(info)
 
-            # Entrenamiento: usamos tiempo_total como variable independiente
-            X.append([info["tiempo_total"]])
-            y.append(info["altura_real"])
+        # Entrenamiento: usamos tiempo_total como variable independiente
+        X.append([info["tiempo_total"]])
+        y.append(info["altura_real"])
 
     # Verificar que tenemos datos
     if len(X) < 2:
-        return render_template(
-            "prediccion.html",
-            prediccion="No hay suficientes datos para predicción.",
-            vuelos=len(vuelos),
-            modelo_usado="No aplicable"
-        )
+        return {
+            "modelo": None,
+            "mensaje": "No hay suficientes datos para predicción.",
+            "vuelos": len(vuelos)
+        }
 
     # Entrenar modelo ML avanzado
     modelo = RandomForestRegressor(n_estimators=500, random_state=42)
@@ -170,9 +175,50 @@ def resultados():
 
     prediccion = modelo.predict([[tiempo_prom]])[0]
 
+    return {
+        "modelo": modelo,
+        "X": np.array(X, dtype=float),
+        "Y": np.array(y, dtype=float),
+        "prediccion": round(float(prediccion), 2),
+        "vuelos": len(vuelos)
+    }
+
+
+registrar_modelo("prediccion_features", construir_modelo_features)
+registrar_modelo("prediccion_tiempo", construir_modelo_tiempo)
+
+
+# ============================================================================
+# RUTAS
+# ============================================================================
+def _ruta_datos():
+    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+    return os.path.abspath(base)
+
+
+def _renderizar(entrada):
+    if entrada["modelo"] is None:
+        return render_template(
+            "prediccion.html",
+            prediccion=entrada["mensaje"],
+            vuelos=entrada["vuelos"],
+            modelo_usado="No aplicable"
+        )
+
     return render_template(
-        "prediccion.html",  # Cambié a prediccion.html para consistencia
-        prediccion=round(prediccion, 2),
-        vuelos=len(vuelos),
+        "prediccion.html",
+        prediccion=entrada["prediccion"],
+        vuelos=entrada["vuelos"],
         modelo_usado="Random Forest Regressor (500 árboles)"
-    )
\ No newline at end of file
+    )
+
+
+@bp.route("/")
+def index():
+    # Modelo ya entrenado para estos datos (se reentrena solo si cambian)
+    return _renderizar(obtener_modelo("prediccion_features", _ruta_datos()))
+
+
+@bp.route("/resultados")
+def resultados():
+    return _renderizar(obtener_modelo("prediccion_tiempo", _ruta_datos()))
\ No newline at end of file
@@ -1,6 +1,16 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, Response, render_template, request, jsonify
+import hashlib
+import json
 import math
-import statistics
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios import calibracion
+from servicios import metadatos_vuelos
+from servicios import montecarlo
+from servicios import trayectoria
+from servicios.decimacion import decimar
 
 bp = Blueprint("simulador1", __name__, url_prefix="/simulador")
 
@@ -12,34 +22,34 @@ PSI_CALIB = 60.0  # presión real de tus vuelos
 # ===============================================
 # 🔵 CALIBRACIÓN FÍSICO–EMPÍRICA DEL MODELO
 # ===============================================
-h_mean = statistics.mean(ALTURAS_REALES)  # media de alturas reales
-
-# Littlewood invertido → tiempo de ascenso
-t_mean = math.sqrt(8 * h_mean / G)
+# Littlewood invertido → tiempo de ascenso; t = k * sqrt(PSI) → estimamos k;
+# h = (g/8) * k² * PSI → modelo lineal en PSI, con un escalado empírico.
+# Los coeficientes se ajustan con los apogeos de data/ (servicios.calibracion)
+# y se reajustan solos cuando llega un vuelo; los vuelos de arriba solo se
+# usan si data/ no tiene vuelos utilizables.
+CALIBRACION_RESPALDO = calibracion.ajustar(
+    calibracion.sumas_de(ALTURAS_REALES, [PSI_CALIB] * len(ALTURAS_REALES)), G
+)
 
-# t = k * sqrt(PSI) → estimamos k
-k_est = t_mean / math.sqrt(PSI_CALIB)
 
-# h = (g/8) * k² * PSI → modelo lineal en PSI
-A_coef = (G / 8.0) * (k_est ** 2)
-
-# escalado empírico para corregir error del modelo
-h_at_calib_model = A_coef * PSI_CALIB
-h_at_calib_real = h_mean
-scale = h_at_calib_real / h_at_calib_model
+def coeficientes():
+    """Instantánea de los coeficientes vigentes (no cambia durante la petición)."""
+    return calibracion.coeficientes(almacen_vuelos.DATA_DIR, defecto=CALIBRACION_RESPALDO)
 
 # Límites físicos reales
 PSI_MIN = 0.0
 PSI_MAX = 80.0
+MAX_VOLUMEN_L = 10.0  # agua y botella (L)
 
 # ===============================================
 # 🔵 FUNCIÓN PRINCIPAL DE PREDICCIÓN
 # ===============================================
-def predict_height_from_psi(psi):
+def predict_height_from_psi(psi, coef=None):
+    coef = coef or coeficientes()
     psi = max(PSI_MIN, min(PSI_MAX, float(psi)))
 
-    h_basic = A_coef * psi
-    h_final = h_basic * scale
+    h_basic = coef["A_coef"] * psi
+    h_final = h_basic * coef["scale"]
 
     # ±5% incertidumbre natural
     uncert_pct = 0.05
@@ -50,29 +60,111 @@ def predict_height_from_psi(psi):
         "height_m": round(h_final, 2),
         "height_min": round(max(0, h_final - uncert), 2),
         "height_max": round(h_final + uncert, 2),
-        "model_info": {
-            "A_coef": A_coef,
-            "k_est": k_est,
-            "h_mean": h_mean,
-            "h_at_calib_model": h_at_calib_model,
-            "h_at_calib_real": h_at_calib_real,
-            "scale": scale
-        }
+        "model_info": info_modelo(coef)
     }
 
+# ===============================================
+# 🔵 PREDICCIÓN POR LOTES (vectorizada)
+# ===============================================
+INCERTIDUMBRE_PCT = 0.05
+MAX_PUNTOS_LOTE = 10000
+PASO_TABLA = 0.1  # resolución de la tabla precalculada (PSI)
+
+
+def predict_heights(psis, coef=None):
+    """Versión vectorizada de predict_height_from_psi para un arreglo de PSI.
+
+    Redondea con np.round: en los empates exactos (…,xx5) puede diferir en
+    0.01 del round() de la versión escalar.
+    """
+    coef = coef or coeficientes()
+    psi = np.clip(np.asarray(psis, dtype=float), PSI_MIN, PSI_MAX)
+    h_final = coef["A_coef"] * psi * coef["scale"]
+    uncert = h_final * INCERTIDUMBRE_PCT
+    return {
+        "psi": np.round(psi, 2),
+        "height_m": np.round(h_final, 2),
+        "height_min": np.round(np.maximum(0, h_final - uncert), 2),
+        "height_max": np.round(h_final + uncert, 2)
+    }
+
+
+def leer_psis(data):
+    """PSI pedidos: lista en "psi" o rango psi_min/psi_max/step. Lanza ValueError."""
+    if "psi" in data:
+        psis = np.asarray(data["psi"], dtype=float).ravel()
+    else:
+        psi_min = float(data.get("psi_min", PSI_MIN))
+        psi_max = float(data.get("psi_max", PSI_MAX))
+        step = float(data.get("step", 1.0))
+        if step <= 0 or psi_max < psi_min:
+            raise ValueError("Rango inválido: se requiere step > 0 y psi_max >= psi_min")
+        n = int(math.floor((psi_max - psi_min) / step + 1e-9)) + 1
+        if n > MAX_PUNTOS_LOTE:
+            raise ValueError(f"El rango genera más de {MAX_PUNTOS_LOTE} puntos")
+        psis = psi_min + step * np.arange(n)
+
+    if len(psis) > MAX_PUNTOS_LOTE:
+        raise ValueError(f"Máximo {MAX_PUNTOS_LOTE} valores de PSI por petición")
+    if not np.all(np.isfinite(psis)):
+        raise ValueError("PSI no es numérico")
+    return psis
+
+
+def info_modelo(coef):
+    return {
+        "A_coef": coef["A_coef"],
+        "k_est": coef["k_est"],
+        "h_mean": coef["h_mean"],
+        "h_at_calib_model": coef["h_at_calib_model"],
+        "h_at_calib_real": coef["h_at_calib_real"],
+        "scale": coef["scale"],
+        "psi_calib": coef["psi_calib"],
+        "n_vuelos": coef["n_vuelos"]
+    }
+
+
+_tabla = {}  # versión -> JSON de la tabla
+
+
+def version_modelo(coef):
+    """Identificador de los coeficientes (cambia si se recalibra)."""
+    texto = json.dumps([coef["A_coef"], coef["scale"], PSI_MIN, PSI_MAX, PASO_TABLA, INCERTIDUMBRE_PCT])
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def tabla_prediccion(coef=None):
+    """(versión, JSON) de la tabla PSI -> altura sobre PSI_MIN..PSI_MAX."""
+    coef = coef or coeficientes()
+    version = version_modelo(coef)
+    contenido = _tabla.get(version)
+    if contenido is None:
+        n = int(round((PSI_MAX - PSI_MIN) / PASO_TABLA)) + 1
+        psis = np.linspace(PSI_MIN, PSI_MAX, n)
+        tabla = {nombre: serie.tolist() for nombre, serie in predict_heights(psis, coef).items()}
+        tabla.update(version=version, paso=PASO_TABLA, model_info=info_modelo(coef))
+        contenido = json.dumps(tabla, separators=(",", ":"))
+        _tabla.clear()
+        _tabla[version] = contenido
+    return version, contenido
+
 # ===============================================
 # 🌐 RUTAS
 # ===============================================
 
 @bp.route("/", methods=["GET"])
 def index():
+    coef = coeficientes()
     return render_template(
         "simulador1.html",   # <- NUEVA PLANTILLA 3D
         psi_min=PSI_MIN,
         psi_max=PSI_MAX,
-        psi_calib=PSI_CALIB,
-        h_mean=h_mean,
-        A_coef=A_coef
+        psi_calib=coef["psi_calib"],
+        h_mean=coef["h_mean"],
+        A_coef=coef["A_coef"] * coef["scale"],
+        version_tabla=version_modelo(coef),
+        agua_l=metadatos_vuelos.AGUA_L,
+        capacidad_l=metadatos_vuelos.CAPACIDAD_L
     )
 
 
@@ -92,12 +184,13 @@ def calcular():
 
     psi_clamped = max(PSI_MIN, min(PSI_MAX, psi_val))
 
-    result = predict_height_from_psi(psi_clamped)
+    coef = coeficientes()
+    result = predict_height_from_psi(psi_clamped, coef)
 
     explanation = (
-        f"Modelo físico Littlewood + calibración con tus vuelos reales.\n"
-        f"Fórmula aproximada: h ≈ A·PSI con A={A_coef:.4f}.\n"
-        f"Altura media real a 60 PSI: {h_mean:.2f} m.\n"
+        f"Modelo físico Littlewood + calibración con tus vuelos reales ({coef['n_vuelos']:.0f} vuelos).\n"
+        f"Fórmula aproximada: h ≈ A·PSI con A={coef['A_coef']:.4f}.\n"
+        f"Altura media real a {coef['psi_calib']:.0f} PSI: {coef['h_mean']:.2f} m.\n"
         f"PSI recibido: {psi_val} PSI (limitado a {psi_clamped} PSI).\n"
         f"Altura estimada: {result['height_m']} m "
         f"(intervalo {result['height_min']} – {result['height_max']} m)."
@@ -111,3 +204,177 @@ def calcular():
         "explanation": explanation,
         "model_info": result["model_info"]
     })
+
+
+@bp.route("/calcular_lote", methods=["POST"])
+def calcular_lote():
+    """Alturas para muchos PSI en una sola respuesta.
+
+    Cuerpo JSON: {"psi": [..]} o {"psi_min": .., "psi_max": .., "step": ..}.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        psis = leer_psis(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    coef = coeficientes()
+    resultado = predict_heights(psis, coef)
+    return jsonify({
+        **{nombre: serie.tolist() for nombre, serie in resultado.items()},
+        "model_info": info_modelo(coef)
+    })
+
+
+@bp.route("/tabla.json", methods=["GET"])
+def tabla():
+    """Tabla precalculada PSI -> altura (cacheable; la URL lleva ?v=<versión>)."""
+    version, contenido = tabla_prediccion()
+    respuesta = Response(contenido, mimetype="application/json")
+    respuesta.set_etag(version)
+    if request.args.get("v") == version:
+        # URL versionada: el contenido no cambia nunca
+        respuesta.cache_control.public = True
+        respuesta.cache_control.max_age = 31536000
+        respuesta.cache_control.immutable = True
+    else:
+        respuesta.cache_control.no_cache = True
+    return respuesta.make_conditional(request)
+
+
+# ===============================================
+# 🔵 MODO FÍSICO: MOTOR DE TRAYECTORIA
+# ===============================================
+MAX_COMBINACIONES = 200000
+PUNTOS_TRAYECTORIA = 400
+
+
+def leer_eje(data, nombre, defecto):
+    """Valor o lista de valores de un parámetro del cuerpo JSON."""
+    try:
+        valores = np.atleast_1d(np.asarray(data.get(nombre, defecto), dtype=float)).ravel()
+    except (TypeError, ValueError):
+        raise ValueError(f"'{nombre}' no es numérico")
+    if not valores.size or not np.all(np.isfinite(valores)):
+        raise ValueError(f"'{nombre}' no es numérico")
+    return valores
+
+
+def simular_trayectorias(presiones, aguas, capacidades, coef):
+    """Barrido físico presión × agua × botella, con el factor de calibración."""
+    presion_amb, densidad = trayectoria.ambiente_de_vuelos()
+    ambiente = dict(densidad_aire=densidad, presion_ambiente=presion_amb, g=G)
+
+    factor = trayectoria.factor_calibracion(coef, **ambiente)
+
+    una = presiones.size == aguas.size == capacidades.size == 1
+    resultado = trayectoria.barrido(presiones, aguas, capacidades, trayectoria=una, **ambiente)
+    resultado["apogeo_calibrado"] = resultado["apogeo"] * factor
+    resultado.update(factor_calibracion=factor, densidad_aire=densidad, presion_ambiente=presion_amb)
+    return resultado
+
+
+@bp.route("/trayectoria", methods=["POST"])
+def calcular_trayectoria():
+    """Modo físico: integra la trayectoria para una o muchas combinaciones.
+
+    Cuerpo JSON: psi, agua_l y capacidad_l como número o lista; con listas se
+    simula la grilla completa (ejes en ese orden). Con una sola combinación
+    también se devuelve la curva altura/velocidad vs tiempo. Sin psi se usa
+    la presión de los vuelos calibrados. Las combinaciones con tanta agua
+    como botella no valen: salen como null y no compiten por el mejor.
+    """
+    data = request.get_json(silent=True) or {}
+    coef = coeficientes()
+    try:
+        presiones = np.clip(leer_eje(data, "psi", coef["psi_calib"]), PSI_MIN, PSI_MAX)
+        aguas = leer_eje(data, "agua_l", metadatos_vuelos.AGUA_L)
+        capacidades = leer_eje(data, "capacidad_l", metadatos_vuelos.CAPACIDAD_L)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if np.any(capacidades <= 0) or np.any(aguas < 0) or np.any(capacidades > MAX_VOLUMEN_L):
+        return jsonify({"error": f"Volúmenes inválidos (0 <= agua, 0 < botella <= {MAX_VOLUMEN_L:g} L)"}), 400
+    if presiones.size * aguas.size * capacidades.size > MAX_COMBINACIONES:
+        return jsonify({"error": f"Máximo {MAX_COMBINACIONES} combinaciones por petición"}), 400
+    # Igual que en Monte Carlo y el optimizador: el agua tiene que caber en la botella
+    valido = np.broadcast_to(aguas[None, :, None] < capacidades[None, None, :],
+                             (presiones.size, aguas.size, capacidades.size))
+    if not valido.any():
+        return jsonify({"error": "Ninguna combinación tiene menos agua que botella"}), 400
+
+    r = simular_trayectorias(presiones, aguas, capacidades, coef)
+    mejor = np.unravel_index(int(np.argmax(np.where(valido, r["apogeo"], -np.inf))), r["apogeo"].shape)
+
+    def serie(nombre):
+        return np.where(valido, np.round(r[nombre], 3), None).tolist()
+
+    respuesta = {
+        "psi": presiones.tolist(),
+        "agua_l": aguas.tolist(),
+        "capacidad_l": capacidades.tolist(),
+        "apogeo": serie("apogeo"),
+        "apogeo_calibrado": serie("apogeo_calibrado"),
+        "tiempo_apogeo": serie("tiempo_apogeo"),
+        "velocidad_maxima": serie("velocidad_maxima"),
+        "mejor": {
+            "psi": presiones[mejor[0]],
+            "agua_l": aguas[mejor[1]],
+            "capacidad_l": capacidades[mejor[2]],
+            "apogeo": round(float(r["apogeo"][mejor]), 2),
+            "apogeo_calibrado": round(float(r["apogeo_calibrado"][mejor]), 2)
+        },
+        "factor_calibracion": r["factor_calibracion"],
+        "densidad_aire": r["densidad_aire"],
+        "presion_ambiente": r["presion_ambiente"]
+    }
+
+    if "t" in r:
+        idx = decimar(r["t"], [r["altura"], r["velocidad"]], PUNTOS_TRAYECTORIA)
+        respuesta["trayectoria"] = {
+            "t": np.round(r["t"][idx], 4).tolist(),
+            "altura": np.round(r["altura"][idx], 3).tolist(),
+            "velocidad": np.round(r["velocidad"][idx], 3).tolist()
+        }
+
+    return jsonify(respuesta)
+
+
+# ===============================================
+# 🔵 INCERTIDUMBRE POR MONTE CARLO
+# ===============================================
+@bp.route("/montecarlo", methods=["POST"])
+def calcular_montecarlo():
+    """Distribución del apogeo para una carga (percentiles e histograma).
+
+    Cuerpo JSON: psi, agua_l, capacidad_l, muestras (por defecto 100000),
+    bins y semilla opcional para repetir el sorteo. Sin psi se usa la
+    presión de los vuelos calibrados.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        psi = float(data["psi"]) if "psi" in data else coeficientes()["psi_calib"]
+        agua = float(data.get("agua_l", metadatos_vuelos.AGUA_L))
+        capacidad = float(data.get("capacidad_l", metadatos_vuelos.CAPACIDAD_L))
+        muestras = int(data.get("muestras", montecarlo.MUESTRAS_DEFECTO))
+        bins = int(data.get("bins", montecarlo.BINS_DEFECTO))
+        semilla = data.get("semilla")
+        semilla = None if semilla is None else int(semilla)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Parámetros no numéricos"}), 400
+    if not math.isfinite(psi):
+        return jsonify({"error": "PSI no es numérico"}), 400
+    psi = min(PSI_MAX, max(PSI_MIN, psi))
+    if not (0 <= agua < capacidad <= MAX_VOLUMEN_L):
+        return jsonify({"error": f"Volúmenes inválidos (0 <= agua < botella <= {MAX_VOLUMEN_L:g} L)"}), 400
+    if not 1 <= muestras <= montecarlo.MAX_MUESTRAS:
+        return jsonify({"error": f"muestras debe estar entre 1 y {montecarlo.MAX_MUESTRAS}"}), 400
+    if not 1 <= bins <= montecarlo.MAX_BINS or (semilla or 0) < 0:
+        return jsonify({"error": "bins o semilla inválidos"}), 400
+
+    r = montecarlo.simular(psi, agua, capacidad, muestras, bins, semilla)
+    return jsonify({
+        "psi": psi,
+        "agua_l": agua,
+        "capacidad_l": capacidad,
+        **r
+    })
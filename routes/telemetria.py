@@ -0,0 +1,151 @@
+from flask import Blueprint, Response, render_template, request, jsonify
+import json
+import queue
+
+from servicios import telemetria
+
+bp = Blueprint('telemetria', __name__, url_prefix='/telemetria')
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+# Bytes leídos del cuerpo por vez: algunos servidores (el de desarrollo)
+# esperan a llenar la lectura completa, así que debe ser chico para que la
+# latencia no crezca (8 KB son ~0.1 s de datos a 2 kHz)
+TAM_LECTURA = 8 * 1024
+KEEPALIVE_SEGUNDOS = 15     # comentario SSE para que los proxies no corten
+REINTENTO_LIMITE = 30       # s sugeridos al cliente cuando no hay lugar para más streams
+MAX_ULTIMAS = 5000
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def lotes_de_lineas(stream):
+    """Lotes de líneas completas a medida que llega el cuerpo (POST chunked).
+
+    Cada lote es lo que había disponible en una lectura, así las muestras se
+    ingieren apenas llegan y no al juntar un tamaño fijo.
+    """
+    # read1 devuelve lo que ya llegó sin esperar a llenar TAM_LECTURA
+    leer = getattr(stream, "read1", stream.read)
+    resto = b""
+    while True:
+        trozo = leer(TAM_LECTURA)
+        if not trozo:
+            break
+        lineas = (resto + trozo).split(b"\n")
+        resto = lineas.pop()
+        if lineas:
+            yield [linea.decode("utf-8", errors="replace") for linea in lineas]
+    if resto:
+        yield [resto.decode("utf-8", errors="replace")]
+
+
+def evento_sse(tipo, datos):
+    return f"event: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+# ============================================================================
+# RUTAS
+# ============================================================================
+
+@bp.route('/')
+def index():
+    """Panel de telemetría en vivo"""
+    return render_template('telemetria.html', cohetes=telemetria.cohetes())
+
+
+@bp.route('/cohetes')
+def listar_cohetes():
+    return jsonify([telemetria.obtener_cohete(nombre).estado() for nombre in telemetria.cohetes()])
+
+
+@bp.route('/<cohete>/muestras', methods=['POST'])
+def ingerir(cohete):
+    """Recibe muestras con el esquema de los CSV de vuelo.
+
+    El cuerpo puede ser CSV (con o sin encabezado) o NDJSON y llegar en
+    partes (Transfer-Encoding: chunked); se ingiere por lotes mientras llega.
+    Con ?reiniciar=1 se empieza un vuelo nuevo para el cohete.
+    """
+    try:
+        if request.args.get('reiniciar') == '1':
+            telemetria.reiniciar(cohete)
+        estado = telemetria.obtener_cohete(cohete)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    recibidas, descartadas, eventos = 0, 0, []
+    columnas = None
+    try:
+        for lote in lotes_de_lineas(request.stream):
+            filas, columnas, malas = telemetria.parsear_lineas(lote, columnas)
+            eventos += estado.ingerir(filas)
+            recibidas += len(filas)
+            descartadas += malas
+    finally:
+        estado.vaciar()
+
+    return jsonify({
+        "cohete": cohete,
+        "recibidas": recibidas,
+        "descartadas": descartadas,
+        "eventos": eventos,
+        "fase": estado.detector.estado
+    })
+
+
+@bp.route('/<cohete>/estado')
+def estado_cohete(cohete):
+    """Resumen del cohete y, con ?ultimas=N, sus últimas N muestras.
+
+    ?ventana=N cambia cuántas muestras recientes entran en los agregados
+    (mín/máx/media); se calculan sobre vistas del buffer, sin copiarlo.
+    """
+    try:
+        estado = telemetria.obtener_cohete(cohete, crear=False)
+        ultimas = max(0, min(MAX_ULTIMAS, int(request.args.get('ultimas', 0))))
+        ventana = max(1, int(request.args.get('ventana', telemetria.VENTANA_AGREGADOS)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if estado is None:
+        return jsonify({"error": f"El cohete {cohete} no ha transmitido"}), 404
+    return jsonify(estado.estado(ultimas, ventana))
+
+
+@bp.route('/<cohete>/stream')
+def stream(cohete):
+    """Server-Sent Events: muestras decimadas y eventos de fase del cohete.
+
+    Cada stream ocupa un hilo del servidor mientras el cliente está
+    conectado; ver telemetria.MAX_SUSCRIPTORES.
+    """
+    try:
+        cola = telemetria.suscribir(cohete)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except telemetria.LimiteSuscriptores as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(REINTENTO_LIMITE)}
+    if cola is None:
+        return jsonify({"error": f"El cohete {cohete} no ha transmitido"}), 404
+
+    def generar():
+        try:
+            yield "retry: 2000\n\n"
+            estado = telemetria.obtener_cohete(cohete, crear=False)
+            if estado is not None:
+                yield evento_sse("estado", estado.estado())
+            while True:
+                try:
+                    tipo, datos = cola.get(timeout=KEEPALIVE_SEGUNDOS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield evento_sse(tipo, datos)
+        finally:
+            telemetria.desuscribir(cohete, cola)
+
+    respuesta = Response(generar(), mimetype='text/event-stream')
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template
-import csv
 import os
 
+from servicios.indice_vuelos import resumen_vuelo, resumenes
+from servicios import calculos
+
 # Crear blueprint para validación de altitud
 bp = Blueprint(
     'validacion_altitud',
@@ -30,39 +32,23 @@ G = 9.78  # Gravedad Popayán
 # ===============================
 #   FUNCIÓN PRINCIPAL
 # ===============================
-def analizar_csv_lanzamiento(ruta_csv):
-    tiempos = []
-    alturas = []
-
-    # Leer CSV
-    with open(ruta_csv, "r") as f:
-        lector = csv.DictReader(f)
-        for fila in lector:
-            try:
-                t = float(fila["time_s"])
-                h = float(fila["altitude_m"])
-            except:
-                continue
-
-            tiempos.append(t)
-            alturas.append(h)
-
-    if len(alturas) == 0:
+def formatear_lanzamiento(resumen):
+    # Fila del índice de resúmenes (apogeo e inicio de ascenso ya calculados)
+    if resumen["filas"] == 0:
         return None
 
     # ------------------------------------------
     # 1️⃣ Detectar altura máxima
     # ------------------------------------------
-    altura_real = max(alturas)
-    idx_apogeo = alturas.index(altura_real)
+    altura_real = resumen["apogeo"]
 
     # Tiempo de ascenso hasta el apogeo
-    tiempo_ascenso = tiempos[idx_apogeo]
+    tiempo_ascenso = resumen["tiempo_apogeo"]
 
     # ------------------------------------------
     # 2️⃣ Calcular altura teórica real (Littlewood)
     # ------------------------------------------
-    altura_teorica = (G * (tiempo_ascenso ** 2)) / 8
+    altura_teorica = float(calculos.altura_littlewood(tiempo_ascenso, G))
 
     # ------------------------------------------
     # 3️⃣ Error porcentual
@@ -72,24 +58,24 @@ def analizar_csv_lanzamiento(ruta_csv):
     # ------------------------------------------
     # 4️⃣ Detectar inicio real del ascenso
     # ------------------------------------------
-    inicio_ascenso = None
-    for i in range(1, len(alturas)):
-        if alturas[i] > alturas[i - 1]:
-            inicio_ascenso = i
-            break
+    inicio_ascenso = resumen["inicio_ascenso"]
 
     return {
-        "archivo": os.path.basename(ruta_csv),
-        "tiempo_total": tiempos[-1],
+        "archivo": resumen["archivo"],
+        "tiempo_total": resumen["tiempo_final"],
         "altura_real": altura_real,
         "altura_teorica": altura_teorica,
         "error_porcentual": error,
         "tiempo_ascenso": tiempo_ascenso,     # <-- NUEVO
         "inicio_ascenso": inicio_ascenso,
-        "tiempo_inicio_ascenso": tiempos[inicio_ascenso] if inicio_ascenso else None
+        "tiempo_inicio_ascenso": resumen["tiempo_inicio_ascenso"] if inicio_ascenso else None
     }
 
 
+def analizar_csv_lanzamiento(ruta_csv):
+    return formatear_lanzamiento(resumen_vuelo(ruta_csv))
+
+
 # ===============================
 #   Cargar y procesar los 4 vuelos
 # ===============================
@@ -103,12 +89,10 @@ def procesar_vuelos():
         print("❌ Carpeta data NO encontrada:", base)
         return []
 
-    for archivo in os.listdir(base):
-        if archivo.endswith(".csv"):
-            ruta = os.path.join(base, archivo)
-            vuelo = analizar_csv_lanzamiento(ruta)
-            if vuelo:
-                resultados.append(vuelo)
+    for resumen in resumenes(base):
+        vuelo = formatear_lanzamiento(resumen)
+        if vuelo:
+            resultados.append(vuelo)
 
     return resultados
 
@@ -0,0 +1,2 @@
+# Paquete de servicios
+# Módulos compartidos por los blueprints (carga de datos, cachés, análisis)
@@ -0,0 +1,203 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from servicios import formato_columnar
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+
+# Límites de la caché LRU de vuelos parseados
+MAX_VUELOS = 256
+MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+# Guardar/leer el sidecar binario (.csv.col) junto a cada CSV
+USAR_SIDECAR = True
+
+# CSV más grandes que esto se ingieren por bloques (memoria acotada)
+LIMITE_PARSEO_COMPLETO = 32 * 1024 * 1024  # 32 MB
+TAM_BLOQUE = 65536  # filas por bloque
+
+_cache = OrderedDict()   # ruta -> Vuelo
+_bytes_en_cache = 0
+_lock = threading.Lock()
+
+
+# ============================================================================
+# REPRESENTACIÓN COLUMNAR DE UN VUELO
+# ============================================================================
+class Vuelo:
+    """Telemetría de un lanzamiento como columnas NumPy de solo lectura."""
+
+    def __init__(self, ruta, columnas, firma):
+        self.ruta = ruta
+        self.archivo = os.path.basename(ruta)
+        self.columnas = columnas
+        self.firma = firma
+
+    def __contains__(self, nombre):
+        return nombre in self.columnas
+
+    def __getitem__(self, nombre):
+        return self.columnas[nombre]
+
+    def __len__(self):
+        for col in self.columnas.values():
+            return len(col)
+        return 0
+
+    @property
+    def nbytes(self):
+        """Bytes en memoria del proceso (las columnas mapeadas del sidecar no cuentan)."""
+        return sum(col.nbytes for col in self.columnas.values() if not _es_mapeada(col))
+
+    def mascara_validas(self, *nombres):
+        """Filas donde todas las columnas indicadas tienen un valor numérico."""
+        mascara = np.ones(len(self), dtype=bool)
+        for nombre in nombres:
+            mascara &= ~np.isnan(self.columnas[nombre])
+        return mascara
+
+    def columnas_validas(self, *nombres):
+        """Devuelve las columnas pedidas filtradas a las filas válidas en todas."""
+        mascara = self.mascara_validas(*nombres)
+        return tuple(self.columnas[nombre][mascara] for nombre in nombres)
+
+    def dataframe(self):
+        """Copia del vuelo como DataFrame (los cambios no afectan a la caché)."""
+        return pd.DataFrame({k: np.array(v) for k, v in self.columnas.items()})
+
+
+def _es_mapeada(col):
+    while col is not None:
+        if isinstance(col, np.memmap):
+            return True
+        col = getattr(col, "base", None)
+    return False
+
+
+# ============================================================================
+# PARSEO
+# ============================================================================
+def firma_archivo(ruta):
+    """(mtime, tamaño) del archivo: cambia cuando el CSV se modifica."""
+    st = os.stat(ruta)
+    return st.st_mtime_ns, st.st_size
+
+
+def _a_numerico(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=np.float64)
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def parsear_csv(ruta):
+    """Lee un CSV de vuelo una sola vez y lo convierte a columnas float64."""
+    df = pd.read_csv(ruta, encoding="utf-8-sig", float_precision="round_trip")
+    columnas = {}
+    for nombre in df.columns:
+        col = _a_numerico(df[nombre])
+        col.setflags(write=False)
+        columnas[nombre.strip()] = col
+    return columnas
+
+
+def parsear_csv_por_bloques(ruta, columnas=None, tam_bloque=TAM_BLOQUE):
+    """Generador de bloques {columna: arreglo float64} de a lo sumo tam_bloque filas.
+
+    Con columnas se leen solo esas (usecols), el resto del CSV ni se tokeniza.
+    """
+    usecols = None
+    if columnas is not None:
+        pedidas = set(columnas)
+        usecols = lambda c: c.strip() in pedidas
+
+    lector = pd.read_csv(ruta, encoding="utf-8-sig", float_precision="round_trip",
+                         usecols=usecols, chunksize=tam_bloque)
+    with lector:
+        for df in lector:
+            yield {nombre.strip(): _a_numerico(df[nombre]) for nombre in df.columns}
+
+
+def cargar_columnas(ruta, firma):
+    """Columnas del vuelo: desde el sidecar con memmap si está al día, si no del CSV.
+
+    Al parsear el CSV se escribe el sidecar y se reabre mapeado, así varios
+    workers comparten las mismas páginas a través de la caché del sistema.
+    """
+    if not USAR_SIDECAR:
+        return parsear_csv(ruta)
+
+    columnas = formato_columnar.abrir_sidecar(ruta, firma)
+    if columnas is not None:
+        return columnas
+
+    if firma[1] > LIMITE_PARSEO_COMPLETO:
+        # CSV enorme: se vuelca al sidecar bloque a bloque sin cargarlo entero
+        try:
+            formato_columnar.escribir_sidecar_por_bloques(ruta, parsear_csv_por_bloques(ruta), firma)
+            columnas = formato_columnar.abrir_sidecar(ruta, firma)
+            if columnas is not None:
+                return columnas
+        except OSError as e:
+            print("No se pudo escribir el sidecar de", ruta, "-", e)
+
+    columnas = parsear_csv(ruta)
+    try:
+        formato_columnar.escribir_sidecar(ruta, columnas, firma)
+    except OSError as e:
+        print("No se pudo escribir el sidecar de", ruta, "-", e)
+        return columnas
+    return formato_columnar.abrir_sidecar(ruta, firma) or columnas
+
+
+# ============================================================================
+# CACHÉ LRU
+# ============================================================================
+def _evictar():
+    global _bytes_en_cache
+    while _cache and (len(_cache) > MAX_VUELOS or _bytes_en_cache > MAX_BYTES):
+        _, viejo = _cache.popitem(last=False)
+        _bytes_en_cache -= viejo.nbytes
+
+
+def obtener_vuelo(ruta):
+    """Devuelve el vuelo parseado, reutilizando la caché si el archivo no cambió."""
+    global _bytes_en_cache
+    ruta = os.path.abspath(ruta)
+    firma = firma_archivo(ruta)
+
+    with _lock:
+        vuelo = _cache.get(ruta)
+        if vuelo is not None and vuelo.firma == firma:
+            _cache.move_to_end(ruta)
+            return vuelo
+
+    vuelo = Vuelo(ruta, cargar_columnas(ruta, firma), firma)
+
+    with _lock:
+        anterior = _cache.pop(ruta, None)
+        if anterior is not None:
+            _bytes_en_cache -= anterior.nbytes
+        _cache[ruta] = vuelo
+        _bytes_en_cache += vuelo.nbytes
+        _evictar()
+
+    return vuelo
+
+
+def listar_csv(base=DATA_DIR):
+    """Nombres de los CSV de vuelo disponibles en la carpeta de datos."""
+    return sorted(f for f in os.listdir(base) if f.endswith(".csv"))
+
+
+def vaciar_cache():
+    global _bytes_en_cache
+    with _lock:
+        _cache.clear()
+        _bytes_en_cache = 0
@@ -0,0 +1,172 @@
+import argparse
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from servicios import almacen_vuelos
+from servicios import indice_vuelos
+from servicios import productos_vuelo
+
+# ============================================================================
+# MOTOR DE ANÁLISIS POR LOTES
+# ============================================================================
+# Reparte el pipeline completo de cada vuelo (fases, tasa de presión y
+# despliegue del paracaídas, densidad, validación Littlewood) entre procesos.
+# Se usa el contexto "spawn" porque el servidor ya tiene hilos corriendo
+# (vigilante de datos) y hacer fork con hilos activos puede bloquear locks.
+WORKERS = int(os.environ.get("ANALISIS_WORKERS", "0")) or os.cpu_count() or 1
+
+# Por debajo de este número de vuelos no compensa arrancar procesos
+MIN_VUELOS_PARALELO = 8
+
+
+def _ejecutor(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+_compartido = None
+_lock = threading.Lock()
+
+
+def ejecutor_compartido():
+    """Pool de procesos persistente para el servidor (se crea al primer uso).
+
+    Los workers conservan sus cachés entre peticiones; los lotes de consola
+    siguen usando un pool propio que se cierra al terminar.
+    """
+    global _compartido
+    with _lock:
+        if _compartido is None:
+            _compartido = _ejecutor(WORKERS)
+        return _compartido
+
+
+@atexit.register
+def _cerrar_compartido():
+    if _compartido is not None:
+        _compartido.shutdown(wait=False, cancel_futures=True)
+
+
+def mapear(funcion, rutas, workers=None):
+    """Aplica funcion(ruta) a cada vuelo, en paralelo si el lote lo justifica.
+
+    Devuelve los resultados en el mismo orden que rutas.
+    """
+    rutas = list(rutas)
+    workers = min(workers or WORKERS, len(rutas))
+    if workers <= 1 or len(rutas) < MIN_VUELOS_PARALELO:
+        return [funcion(ruta) for ruta in rutas]
+    with _ejecutor(workers) as ejecutor:
+        return list(ejecutor.map(funcion, rutas, chunksize=max(1, len(rutas) // (workers * 4))))
+
+
+# ============================================================================
+# PIPELINE POR VUELO (se ejecuta dentro de cada proceso)
+# ============================================================================
+def analizar_vuelo_completo(ruta):
+    """Corre el pipeline completo de un vuelo y devuelve resultados serializables."""
+    from routes import analisis_paracaidas, densidad_aire, fases_vuelo, validacion_altitud
+
+    ruta = os.path.abspath(ruta)
+    archivo = os.path.basename(ruta)
+    try:
+        firma = almacen_vuelos.firma_archivo(ruta)
+        resumen, por_columna = indice_vuelos.calcular_resumen(ruta)
+
+        fases = fases_vuelo.identificar_fases(fases_vuelo.leer_csv_vuelo(ruta))
+
+        vuelo = analisis_paracaidas.leer_csv_vuelo(ruta)
+        vuelo = analisis_paracaidas.calcular_tasa_cambio_presion(vuelo)
+        despliegue = analisis_paracaidas.detectar_despliegue_paracaidas(vuelo)
+
+        return {
+            "archivo": archivo,
+            "ruta": ruta,
+            "firma": firma,
+            "resumen": resumen,
+            "por_columna": por_columna,
+            "fases": fases,
+            "despliegue_paracaidas": despliegue,
+            "validacion": validacion_altitud.formatear_lanzamiento(resumen),
+            "densidad": densidad_aire.formatear_densidad(resumen),
+            "error": None,
+        }
+    except Exception as e:
+        return {"archivo": archivo, "ruta": ruta, "error": f"{type(e).__name__}: {e}"}
+
+
+def analizar_lote(rutas, workers=None):
+    """Analiza los vuelos en paralelo y publica los resultados.
+
+    Los resúmenes se guardan en el índice persistente y las fases/despliegue
+    en la caché de productos del proceso que llama.
+    """
+    resultados = mapear(analizar_vuelo_completo, rutas, workers)
+
+    por_base = {}
+    for r in resultados:
+        if r["error"] is None:
+            por_base.setdefault(os.path.dirname(r["ruta"]), []).append(r)
+
+    for base, lote in por_base.items():
+        indice_vuelos.guardar_resumenes(
+            base, [(r["resumen"], r["por_columna"], r["firma"]) for r in lote]
+        )
+        for r in lote:
+            for nombre in ("fases", "despliegue_paracaidas"):
+                productos_vuelo.publicar_producto(r["ruta"], nombre, r["firma"], r[nombre])
+
+    return resultados
+
+
+def analizar_archivo(base=almacen_vuelos.DATA_DIR, workers=None):
+    """Re-analiza todos los vuelos de la carpeta."""
+    rutas = [os.path.join(base, a) for a in almacen_vuelos.listar_csv(base)]
+    return analizar_lote(rutas, workers)
+
+
+# ============================================================================
+# MODO CONSOLA
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-analiza todo el archivo de vuelos en paralelo.")
+    parser.add_argument("base", nargs="?", default=almacen_vuelos.DATA_DIR,
+                        help="carpeta con los CSV (por defecto data/)")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS,
+                        help=f"procesos a usar (por defecto {WORKERS})")
+    args = parser.parse_args(argv)
+
+    global MIN_VUELOS_PARALELO
+    MIN_VUELOS_PARALELO = 2  # en consola siempre se paraleliza
+
+    inicio = time.perf_counter()
+    resultados = analizar_archivo(args.base, args.workers)
+    duracion = time.perf_counter() - inicio
+
+    errores = 0
+    for r in resultados:
+        if r["error"]:
+            errores += 1
+            print(f"❌ {r['archivo']}: {r['error']}")
+            continue
+        v = r["validacion"] or {}
+        print(
+            f"✓ {r['archivo']}: apogeo {r['fases']['altitud_maxima']:.2f} m "
+            f"@ {r['fases']['tiempo_apogeo']:.2f} s, "
+            f"paracaídas {r['despliegue_paracaidas']['tiempo_despliegue']:.2f} s, "
+            f"error Littlewood {v.get('error_porcentual', float('nan')):.1f} %"
+        )
+
+    print(f"\n{len(resultados)} vuelos analizados en {duracion:.2f} s "
+          f"con {args.workers} procesos ({errores} con error)")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
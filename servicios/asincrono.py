@@ -0,0 +1,74 @@
+import asyncio
+import atexit
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from servicios import analisis_lote
+
+try:
+    import asgiref  # noqa: F401  (Flask ejecuta las vistas async con asgiref)
+    FLASK_ASYNC = True
+except ImportError:
+    FLASK_ASYNC = False
+
+# ============================================================================
+# CAPA ASÍNCRONA PARA LAS APIS JSON
+# ============================================================================
+# Las vistas async reparten el trabajo de una petición: lecturas de disco y
+# llamadas de red en un pool de hilos, análisis pesado en el pool de procesos
+# del motor de lotes. Así una petición que espera al disco o a la red no
+# bloquea el cálculo de otra, y varias esperas de la misma petición corren a
+# la vez (asyncio.gather).
+HILOS_IO = int(os.environ.get("HILOS_IO", "8"))
+
+_hilos = None
+_lock = threading.Lock()
+
+
+def _pool_hilos():
+    global _hilos
+    with _lock:
+        if _hilos is None:
+            _hilos = ThreadPoolExecutor(max_workers=HILOS_IO, thread_name_prefix="io")
+        return _hilos
+
+
+@atexit.register
+def _cerrar_pool_hilos():
+    if _hilos is not None:
+        _hilos.shutdown(wait=False, cancel_futures=True)
+
+
+async def en_hilo(funcion, *args, **kwargs):
+    """Ejecuta funcion en el pool de hilos (E/S: disco, red)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool_hilos(), functools.partial(funcion, *args, **kwargs))
+
+
+async def en_proceso(funcion, *args, **kwargs):
+    """Ejecuta funcion en el pool de procesos (CPU).
+
+    funcion y sus argumentos deben poder serializarse; conviene pasar rutas y
+    no arreglos grandes. Con un solo worker se usa el pool de hilos.
+    """
+    if analisis_lote.WORKERS <= 1:
+        return await en_hilo(funcion, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(analisis_lote.ejecutor_compartido(), functools.partial(funcion, *args, **kwargs))
+
+
+def vista_asincrona(funcion):
+    """Marca una vista async de Flask.
+
+    Con Flask[async] instalado Flask la ejecuta tal cual; si falta asgiref la
+    corrutina se corre con asyncio.run dentro del hilo de la petición.
+    """
+    if FLASK_ASYNC:
+        return funcion
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        return asyncio.run(funcion(*args, **kwargs))
+    return envoltura
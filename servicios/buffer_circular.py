@@ -0,0 +1,126 @@
+import numpy as np
+
+# ============================================================================
+# BUFFER CIRCULAR DE MUESTRAS
+# ============================================================================
+# Arreglo estructurado de NumPy de capacidad fija para la telemetría de un
+# cohete: la memoria no crece con la duración del vuelo.
+#
+# Cada muestra se escribe dos veces (posición i e i + capacidad), así las
+# últimas n muestras siempre están contiguas y cualquier ventana es una
+# vista sin copia. Agregar cuesta O(1) por muestra (dos escrituras).
+DTYPE_TELEMETRIA = np.dtype([
+    ("timestamp_ms", "f8"),
+    ("pressure_pa", "f8"),
+    ("temp_c", "f8"),
+    ("altitude_m", "f8"),
+    ("servo_state", "f8"),
+    ("event", "U12"),
+    ("time_s", "f8"),
+])
+
+
+class BufferCircular:
+    """Últimas `capacidad` muestras de un arreglo estructurado."""
+
+    def __init__(self, capacidad, dtype=DTYPE_TELEMETRIA):
+        if capacidad < 1:
+            raise ValueError("La capacidad debe ser positiva")
+        self.capacidad = int(capacidad)
+        self.dtype = np.dtype(dtype)
+        self._datos = np.zeros(2 * self.capacidad, dtype=self.dtype)
+        self._cabeza = 0   # posición de la próxima escritura (mod capacidad)
+        self.total = 0     # muestras agregadas desde el inicio
+
+    def __len__(self):
+        return min(self.total, self.capacidad)
+
+    @property
+    def nbytes(self):
+        return self._datos.nbytes
+
+    # ------------------------------------------------------------------
+    def agregar(self, fila):
+        """Agrega una muestra (tupla en el orden del dtype)."""
+        self._datos[self._cabeza] = fila
+        self._datos[self._cabeza + self.capacidad] = fila
+        self._cabeza = (self._cabeza + 1) % self.capacidad
+        self.total += 1
+
+    def extender(self, filas):
+        """Agrega muchas muestras (arreglo estructurado o lista de tuplas)."""
+        filas = np.asarray(filas, dtype=self.dtype)
+        k = len(filas)
+        if k == 0:
+            return
+        if k > self.capacidad:
+            self._cabeza = (self._cabeza + k - self.capacidad) % self.capacidad
+            self.total += k - self.capacidad
+            filas = filas[k - self.capacidad:]
+            k = self.capacidad
+
+        # A lo sumo dos tramos contiguos en cada mitad
+        primero = min(k, self.capacidad - self._cabeza)
+        for inicio, tramo in ((self._cabeza, filas[:primero]), (0, filas[primero:])):
+            if len(tramo):
+                self._datos[inicio:inicio + len(tramo)] = tramo
+                self._datos[inicio + self.capacidad:inicio + self.capacidad + len(tramo)] = tramo
+        self._cabeza = (self._cabeza + k) % self.capacidad
+        self.total += k
+
+    def vaciar(self):
+        self._cabeza = 0
+        self.total = 0
+
+    # ------------------------------------------------------------------
+    def ventana(self, n=None):
+        """Vista (sin copia) de las últimas n muestras, de la más vieja a la más nueva.
+
+        La vista deja de ser válida cuando se agregan más de capacidad - n
+        muestras; quien la necesite más tiempo debe copiarla.
+        """
+        n = len(self) if n is None else max(0, min(int(n), len(self)))
+        fin = self._cabeza + self.capacidad
+        return self._datos[fin - n:fin]
+
+    def columna(self, nombre, n=None):
+        """Vista de una columna en las últimas n muestras."""
+        return self.ventana(n)[nombre]
+
+    def ventana_tiempo(self, segundos, columna_tiempo="time_s"):
+        """Vista de las muestras de los últimos `segundos` (según columna_tiempo)."""
+        tiempos = self.columna(columna_tiempo)
+        if not len(tiempos):
+            return self.ventana(0)
+        desde = np.searchsorted(tiempos, tiempos[-1] - segundos, side="left")
+        return self.ventana(len(tiempos) - desde)
+
+    # ------------------------------------------------------------------
+    def agregados(self, nombre, n=None):
+        """Mínimo, máximo y media de una columna en las últimas n muestras."""
+        valores = self.columna(nombre, n)
+        valores = valores[~np.isnan(valores)]
+        if not len(valores):
+            return {"n": 0, "min": None, "max": None, "media": None}
+        return {
+            "n": int(len(valores)),
+            "min": float(valores.min()),
+            "max": float(valores.max()),
+            "media": float(valores.mean()),
+        }
+
+    def derivada(self, nombre, n, columna_tiempo="time_s"):
+        """Pendiente de mínimos cuadrados de una columna en las últimas n muestras.
+
+        Ajustar una recta a la ventana suaviza el ruido mejor que la
+        diferencia entre dos muestras; None si no hay al menos dos puntos.
+        """
+        ventana = self.ventana(n)
+        t, y = ventana[columna_tiempo], ventana[nombre]
+        validas = ~(np.isnan(t) | np.isnan(y))
+        t, y = t[validas], y[validas]
+        if len(t) < 2:
+            return None
+        dt = t - t.mean()
+        denominador = float(np.dot(dt, dt))
+        return float(np.dot(dt, y - y.mean()) / denominador) if denominador > 0 else None
@@ -0,0 +1,147 @@
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Response
+from werkzeug.http import is_resource_modified
+
+from servicios import almacen_vuelos
+from servicios.cache_http import version_codigo
+
+# ============================================================================
+# CACHÉ DE GRÁFICOS RENDERIZADOS
+# ============================================================================
+# Construir la figura de Plotly y serializarla con to_html es lo más lento de
+# las páginas de fases y paracaídas. El HTML resultante se guarda por
+# (vuelo, tipo de gráfico, parámetros) junto con la firma del CSV, primero en
+# una LRU en memoria y opcionalmente en data/.graficos/ para que sobreviva a
+# un reinicio. La misma firma da el ETag/Last-Modified de la página, así una
+# vista repetida se responde con 304 sin tocar los datos.
+#
+# El HTML depende también del código que lo generó: la versión del código
+# (mtime de módulos y plantillas) entra en el ETag y en el nombre del archivo
+# en disco, así tras un despliegue no se sirven gráficos del análisis viejo.
+MAX_GRAFICOS = 64
+MAX_BYTES_GRAFICOS = 64 * 1024 * 1024  # 64 MB
+
+USAR_DISCO = True
+DIR_GRAFICOS = ".graficos"
+
+_cache = OrderedDict()   # (ruta, tipo, params) -> (firma, html)
+_bytes_en_cache = 0
+_lock = threading.Lock()
+
+
+def version_graficos():
+    """Versión del código que renderiza los gráficos (corta, para nombres de archivo)."""
+    return hashlib.sha1(version_codigo().encode("utf-8")).hexdigest()[:8]
+
+
+def etag_grafico(ruta, tipo, firma, *params):
+    """Identificador de la versión del gráfico (cambia si cambia el CSV o el código)."""
+    texto = "|".join([os.path.basename(ruta), tipo, str(firma[0]), str(firma[1]), version_graficos()]
+                     + [str(p) for p in params])
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:20]
+
+
+# ============================================================================
+# NIVEL EN DISCO
+# ============================================================================
+def _prefijo_disco(ruta, tipo, params):
+    sufijo = hashlib.sha1("|".join(str(p) for p in params).encode("utf-8")).hexdigest()[:8]
+    carpeta = os.path.join(os.path.dirname(ruta), DIR_GRAFICOS)
+    return os.path.join(carpeta, f"{os.path.basename(ruta)}-{tipo}-{sufijo}")
+
+
+def _ruta_disco(ruta, tipo, firma, params):
+    return f"{_prefijo_disco(ruta, tipo, params)}-{version_graficos()}-{firma[0]}-{firma[1]}.html"
+
+
+def _leer_disco(ruta, tipo, firma, params):
+    try:
+        with open(_ruta_disco(ruta, tipo, firma, params), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _guardar_disco(ruta, tipo, firma, params, html):
+    destino = _ruta_disco(ruta, tipo, firma, params)
+    try:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f"{destino}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(temporal, destino)
+        # Las versiones anteriores del mismo gráfico (otro CSV u otro código) ya no sirven
+        for viejo in glob.glob(f"{glob.escape(_prefijo_disco(ruta, tipo, params))}-*.html"):
+            if viejo != destino:
+                os.remove(viejo)
+    except OSError as e:
+        print(f"⚠ No se pudo guardar el gráfico {tipo} en disco: {e}")
+
+
+# ============================================================================
+# CONSULTA
+# ============================================================================
+def _publicar(clave, firma, html):
+    global _bytes_en_cache
+    with _lock:
+        anterior = _cache.pop(clave, None)
+        if anterior is not None:
+            _bytes_en_cache -= len(anterior[1])
+        _cache[clave] = (firma, html)
+        _bytes_en_cache += len(html)
+        while _cache and (len(_cache) > MAX_GRAFICOS or _bytes_en_cache > MAX_BYTES_GRAFICOS):
+            _, (_, viejo) = _cache.popitem(last=False)
+            _bytes_en_cache -= len(viejo)
+
+
+def obtener_grafico(ruta, tipo, generar, *params, firma=None):
+    """HTML del gráfico para el vuelo; generar() solo se llama si no está en caché."""
+    ruta = os.path.abspath(ruta)
+    firma = firma or almacen_vuelos.firma_archivo(ruta)
+    clave = (ruta, tipo, params)
+
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada is not None and entrada[0] == firma:
+            _cache.move_to_end(clave)
+            return entrada[1]
+
+    html = _leer_disco(ruta, tipo, firma, params) if USAR_DISCO else None
+    if html is None:
+        html = generar()
+        if USAR_DISCO:
+            _guardar_disco(ruta, tipo, firma, params, html)
+    _publicar(clave, firma, html)
+    return html
+
+
+def respuesta_condicional(environ, etag, firma, renderizar):
+    """Responde 304 si el navegador ya tiene esta versión; si no, renderiza.
+
+    La página se marca como no-cache: el navegador la guarda pero revalida
+    con If-None-Match / If-Modified-Since en cada visita.
+    """
+    # Un despliegue posterior al CSV también invalida If-Modified-Since
+    instante = max(firma[0], int(version_codigo()))
+    ultima_modificacion = datetime.fromtimestamp(instante // 1_000_000_000, tz=timezone.utc)
+    if is_resource_modified(environ, etag=etag, last_modified=ultima_modificacion):
+        respuesta = Response(renderizar(), mimetype="text/html")
+    else:
+        respuesta = Response(status=304)
+    respuesta.set_etag(etag)
+    respuesta.last_modified = ultima_modificacion
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+def vaciar_cache():
+    global _bytes_en_cache
+    with _lock:
+        _cache.clear()
+        _bytes_en_cache = 0
@@ -0,0 +1,190 @@
+import functools
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+from servicios import almacen_vuelos
+from servicios import meteorologia
+from servicios import metadatos_vuelos
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ============================================================================
+# CACHÉ HTTP Y COMPRESIÓN PARA TODA LA APLICACIÓN
+# ============================================================================
+# Casi todas las páginas y APIs son una función de los CSV de data/ (y de
+# vuelos.json): mientras esos archivos no cambien la respuesta es la misma.
+# Antes de la vista se calcula un ETag con la versión de los datos (mtime y
+# tamaño de cada archivo), la versión del código y lo que distingue a la
+# petición (ruta, query, Accept, codificación); si el navegador ya tiene esa
+# versión se responde 304 sin ejecutar la vista. Las respuestas se marcan
+# no-cache: el navegador las guarda pero revalida en cada visita.
+#
+# Después de la vista se comprimen (br si está el módulo brotli, opcional en
+# requirements.txt; si no gzip) las respuestas de texto grandes. Las vistas
+# que ya ponen su propio ETag (gráficos de fases/paracaídas, tabla del
+# simulador) conservan su valor.
+# Un cuerpo comprimido no es byte a byte el de la vista, así que su ETag pasa
+# a débil (W/"..."): If-None-Match compara en forma débil y sigue dando 304,
+# pero ningún caché ni petición de rango lo confunde con la variante sin
+# comprimir. Vary: Accept-Encoding separa las variantes en los cachés.
+TTL_VERSION_DATOS = 1.0   # s: la versión de data/ se recalcula a lo sumo así de seguido
+MIN_BYTES_COMPRESION = 1024
+NIVEL_GZIP = 6
+NIVEL_BROTLI = 5
+TIPOS_COMPRIMIBLES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+# Rutas que no dependen solo de los archivos: telemetría en vivo, modelos
+# que se reentrenan en segundo plano y la demo de anomalías (aleatoria)
+EXCLUIDAS = ("/telemetria", "/prediccion", "/deteccion-anomalias", "/static")
+
+# Partes que dependen de algo más que data/: función que da su versión
+VERSIONES_EXTRA = {
+    "/dashboard-ambiental/api/": meteorologia.instante_datos,
+}
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_version = (0.0, None)    # (instante del cálculo, versión)
+_lock = threading.Lock()
+
+
+# ============================================================================
+# VERSIONES
+# ============================================================================
+@functools.lru_cache(maxsize=None)
+def version_codigo(raiz=RAIZ):
+    """Último mtime de plantillas, estáticos y módulos (cambia al desplegar).
+
+    Se calcula una vez por proceso: el código no cambia sin reiniciar.
+    """
+    ultimo = 0
+    for carpeta in ("templates", "static", "routes", "servicios"):
+        for directorio, subcarpetas, archivos in os.walk(os.path.join(raiz, carpeta)):
+            subcarpetas[:] = [d for d in subcarpetas if d != "__pycache__"]
+            for archivo in archivos:
+                try:
+                    ultimo = max(ultimo, os.stat(os.path.join(directorio, archivo)).st_mtime_ns)
+                except OSError:
+                    pass
+    return str(ultimo)
+
+
+def version_datos(base=almacen_vuelos.DATA_DIR):
+    """Huella de (nombre, mtime, tamaño) de los CSV y de vuelos.json."""
+    global _version
+    ahora = time.monotonic()
+    with _lock:
+        if ahora - _version[0] < TTL_VERSION_DATOS:
+            return _version[1]
+
+    partes = []
+    for archivo in almacen_vuelos.listar_csv(base):
+        try:
+            partes.append(f"{archivo}:{almacen_vuelos.firma_archivo(os.path.join(base, archivo))}")
+        except OSError:
+            continue
+    try:
+        partes.append(f"metadatos:{metadatos_vuelos.firma_metadatos(base)}")
+    except OSError:
+        pass
+    version = hashlib.sha1("\n".join(partes).encode("utf-8")).hexdigest()[:16]
+    with _lock:
+        _version = (ahora, version)
+    return version
+
+
+# ============================================================================
+# COMPRESIÓN
+# ============================================================================
+def codificacion_aceptada(peticion):
+    """'br' o 'gzip' según Accept-Encoding (br solo si está el módulo brotli)."""
+    if brotli is not None and peticion.accept_encodings["br"]:
+        return "br"
+    if peticion.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def comprimir(cuerpo, codificacion):
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=NIVEL_BROTLI)
+    return gzip.compress(cuerpo, compresslevel=NIVEL_GZIP)
+
+
+def _comprimible(respuesta):
+    return (
+        respuesta.status_code == 200
+        and not respuesta.direct_passthrough
+        and not respuesta.is_streamed
+        and "Content-Encoding" not in respuesta.headers
+        and (respuesta.mimetype or "").startswith(TIPOS_COMPRIMIBLES)
+        and (respuesta.content_length or 0) >= MIN_BYTES_COMPRESION
+    )
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+def etag_peticion(version):
+    """ETag de la respuesta que tendría esta petición con los datos actuales."""
+    partes = [
+        version, version_datos(), request.full_path,
+        request.headers.get("Accept", ""), codificacion_aceptada(request) or "",
+    ]
+    for prefijo, extra in VERSIONES_EXTRA.items():
+        if request.path.startswith(prefijo):
+            partes.append(str(extra()))
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:20]
+
+
+def registrar(app):
+    """Conecta el middleware a la aplicación (antes y después de cada vista)."""
+    version = version_codigo(os.path.abspath(app.root_path))
+
+    @app.before_request
+    def _revalidar():
+        if request.method not in ("GET", "HEAD") or request.path.startswith(EXCLUIDAS):
+            return None
+        g.etag_datos = etag_peticion(version)
+        if request.if_none_match.contains_weak(g.etag_datos):
+            respuesta = Response(status=304)
+            _marcar(respuesta, g.etag_datos)
+            return respuesta
+        return None
+
+    @app.after_request
+    def _cachear_y_comprimir(respuesta):
+        etag = g.pop("etag_datos", None)
+        if etag is not None and respuesta.status_code == 200 and "ETag" not in respuesta.headers:
+            _marcar(respuesta, etag)
+
+        if respuesta.status_code == 304:
+            # El 304 repite el validador que tiene el cliente (débil si guardó
+            # la variante comprimida)
+            etag, debil = respuesta.get_etag()
+            if etag and not debil and not request.if_none_match.contains(etag):
+                respuesta.set_etag(etag, weak=True)
+        elif _comprimible(respuesta):
+            codificacion = codificacion_aceptada(request)
+            if codificacion:
+                respuesta.set_data(comprimir(respuesta.get_data(), codificacion))
+                respuesta.headers["Content-Encoding"] = codificacion
+                etag, debil = respuesta.get_etag()
+                if etag and not debil:
+                    respuesta.set_etag(etag, weak=True)
+            respuesta.vary.add("Accept-Encoding")
+        return respuesta
+
+
+def _marcar(respuesta, etag):
+    respuesta.set_etag(etag)
+    respuesta.cache_control.no_cache = True
+    respuesta.vary.update(("Accept", "Accept-Encoding"))
@@ -0,0 +1,52 @@
+import numpy as np
+
+# ============================================================================
+# KERNELS VECTORIZADOS (arreglo de entrada -> arreglo de salida)
+# ============================================================================
+# Versiones NumPy de los cálculos por muestra que hacían las rutas en bucles
+# de Python. Aceptan escalares o arreglos y nunca iteran fila por fila.
+
+G = 9.78        # Gravedad Popayán
+R_AIRE = 287.05  # Constante del gas ideal (aire)
+
+
+def densidad_aire(presion_pa, temp_c, R=R_AIRE):
+    """Densidad ρ = P / (R·T). Devuelve NaN donde la temperatura absoluta es <= 0."""
+    presion_pa = np.asarray(presion_pa, dtype=float)
+    temp_k = np.asarray(temp_c, dtype=float) + 273.15
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = presion_pa / (R * temp_k)
+    return np.where(temp_k > 0, rho, np.nan)
+
+
+def presion_barometrica(h, p0=101325, T=288.15, L=0.0065, R=R_AIRE, g=9.80665):
+    """Ecuación barométrica para presión teórica a cada altitud h."""
+    h = np.asarray(h, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return p0 * (1 - (L * h / T)) ** (g / (R * L))
+
+
+def altura_littlewood(t, g=G):
+    """Altura teórica de Littlewood h = g·t² / 8."""
+    t = np.asarray(t, dtype=float)
+    return (g * t ** 2) / 8
+
+
+def indice_apogeo(alturas):
+    """Índice de la primera altura máxima (equivale a alturas.index(max(alturas)))."""
+    return int(np.argmax(alturas))
+
+
+def indice_inicio_ascenso(alturas, solo_positivas=False):
+    """Primer índice i >= 1 con alturas[i] > alturas[i-1], o None si no sube nunca.
+
+    Con solo_positivas=True exige además alturas[i] > 0.
+    """
+    alturas = np.asarray(alturas, dtype=float)
+    sube = alturas[1:] > alturas[:-1]
+    if solo_positivas:
+        sube &= alturas[1:] > 0
+    candidatos = np.flatnonzero(sube)
+    if len(candidatos) == 0:
+        return None
+    return int(candidatos[0]) + 1
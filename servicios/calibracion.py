@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import threading
+
+from servicios import almacen_vuelos
+from servicios import calculos
+from servicios import indice_vuelos
+from servicios import metadatos_vuelos
+from servicios import registro_modelos
+
+# ============================================================================
+# CALIBRACIÓN DEL SIMULADOR CON EL ARCHIVO DE VUELOS
+# ============================================================================
+# El simulador predice h = A·PSI·scale (Littlewood invertido + corrección
+# empírica). Los coeficientes se ajustan con el apogeo de cada vuelo de data/
+# y su presión de lanzamiento (metadatos_vuelos). Cada vuelo aporta sumas
+# (n, Σh, Σpsi, Σpsi·h, Σpsi², Σh²); con ellas el ajuste es inmediato y
+# agregar o cambiar un vuelo solo suma/resta su aporte.
+#
+# El resultado se guarda por huella del conjunto (CSV + metadatos) en
+# data/.calibracion.json, así otros procesos lo reutilizan sin recalcular, y
+# se publica cambiando de una sola vez la referencia al dict (que nunca se
+# modifica en sitio): cada petición toma una instantánea con coeficientes()
+# y nunca ve un ajuste a medias. _lock solo cubre comparar la huella, aplicar
+# los aportes y publicar: leer el índice (que puede reindexar vuelos) y el
+# archivo en disco se hace fuera del candado.
+ARCHIVO_CALIBRACION = ".calibracion.json"
+
+SUMAS = ("n", "h", "psi", "psi_h", "psi2", "h2")
+
+_aportes = {}        # base -> {archivo: (firma, sumas)}
+_totales = {}        # base -> sumas acumuladas
+_actual = {}         # base -> (huella, coeficientes publicados)
+_lock = threading.Lock()
+
+
+# ============================================================================
+# AJUSTE
+# ============================================================================
+def ajustar(sumas, g=calculos.G):
+    """Coeficientes del modelo a partir de las sumas de los vuelos."""
+    n = sumas["n"]
+    h_mean = sumas["h"] / n
+    psi_calib = sumas["psi"] / n
+
+    # Littlewood invertido → tiempo de ascenso; t = k·sqrt(PSI)
+    t_mean = math.sqrt(8 * h_mean / g)
+    k_est = t_mean / math.sqrt(psi_calib)
+    A_coef = (g / 8.0) * (k_est ** 2)
+
+    # Escala: pendiente de mínimos cuadrados h = (A·scale)·PSI (vale 1 si
+    # todos los vuelos se lanzaron a la misma presión)
+    pendiente = sumas["psi_h"] / sumas["psi2"]
+    scale = pendiente / A_coef
+
+    residuos = sumas["h2"] - 2 * pendiente * sumas["psi_h"] + pendiente ** 2 * sumas["psi2"]
+    residuo_std = math.sqrt(max(0.0, residuos) / (n - 1)) if n > 1 else 0.0
+
+    return {
+        "h_mean": h_mean,
+        "t_mean": t_mean,
+        "k_est": k_est,
+        "A_coef": A_coef,
+        "psi_calib": psi_calib,
+        "h_at_calib_model": A_coef * psi_calib,
+        "h_at_calib_real": h_mean,
+        "scale": scale,
+        "residuo_std": residuo_std,
+        "n_vuelos": n,
+    }
+
+
+def sumas_de(alturas, presiones):
+    """Sumas de un conjunto de pares (apogeo, PSI)."""
+    sumas = dict.fromkeys(SUMAS, 0.0)
+    for h, psi in zip(alturas, presiones):
+        sumas["n"] += 1
+        sumas["h"] += h
+        sumas["psi"] += psi
+        sumas["psi_h"] += psi * h
+        sumas["psi2"] += psi * psi
+        sumas["h2"] += h * h
+    return sumas
+
+
+def _aporte(resumen, base):
+    meta = metadatos_vuelos.metadatos_vuelo(resumen["archivo"], base)
+    if not resumen["filas"] or resumen["apogeo"] is None or meta["presion_psi"] <= 0:
+        return sumas_de([], [])
+    return sumas_de([resumen["apogeo"]], [meta["presion_psi"]])
+
+
+# ============================================================================
+# ACTUALIZACIÓN INCREMENTAL
+# ============================================================================
+def _huella(base):
+    return f"{registro_modelos.huella_datos(base)}:{metadatos_vuelos.firma_metadatos(base)}"
+
+
+def _ruta_cache(base):
+    return os.path.join(base, ARCHIVO_CALIBRACION)
+
+
+def _cargar_de_disco(base, huella):
+    try:
+        with open(_ruta_cache(base), encoding="utf-8") as f:
+            guardado = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return guardado["coeficientes"] if guardado.get("huella") == huella else None
+
+
+def _guardar_en_disco(base, huella, coeficientes):
+    destino = _ruta_cache(base)
+    temporal = f"{destino}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"huella": huella, "coeficientes": coeficientes}, f)
+        os.replace(temporal, destino)
+    except OSError as e:
+        print(f"⚠ No se pudo guardar la calibración: {e}")
+
+
+def _actualizar_totales(base):
+    """Suma/resta solo los aportes de vuelos nuevos, modificados o borrados.
+
+    Devuelve una copia de los totales.
+    """
+    meta = metadatos_vuelos.firma_metadatos(base)
+    filas = indice_vuelos.resumenes(base)
+    with _lock:
+        conocidas = {archivo: firma for archivo, (firma, _) in _aportes.get(base, {}).items()}
+
+    nuevos = {}
+    for resumen in filas:
+        firma = (resumen["mtime_ns"], resumen["tamano"], meta)
+        if conocidas.get(resumen["archivo"]) != firma:
+            nuevos[resumen["archivo"]] = (firma, _aporte(resumen, base))
+    vistos = {resumen["archivo"] for resumen in filas}
+
+    with _lock:
+        aportes = _aportes.setdefault(base, {})
+        totales = _totales.setdefault(base, dict.fromkeys(SUMAS, 0.0))
+        for archivo, (firma, nuevo) in nuevos.items():
+            anterior = aportes.get(archivo)
+            if anterior is not None and anterior[0] == firma:
+                continue    # otro hilo ya lo aplicó
+            for campo in SUMAS:
+                totales[campo] += nuevo[campo] - (anterior[1][campo] if anterior else 0.0)
+            aportes[archivo] = (firma, nuevo)
+
+        for archivo in set(aportes) - vistos:
+            _, viejo = aportes.pop(archivo)
+            for campo in SUMAS:
+                totales[campo] -= viejo[campo]
+        return dict(totales)
+
+
+def recalibrar(base=almacen_vuelos.DATA_DIR):
+    """Ajusta los coeficientes si cambió el conjunto de vuelos y los publica.
+
+    Devuelve los coeficientes vigentes (None si no hay vuelos utilizables).
+    """
+    huella = _huella(base)
+    with _lock:
+        publicado = _actual.get(base)
+    if publicado is not None and publicado[0] == huella:
+        return publicado[1]
+
+    coeficientes = _cargar_de_disco(base, huella)
+    if coeficientes is None:
+        totales = _actualizar_totales(base)
+        if totales["n"] < 1:
+            return None
+        coeficientes = dict(ajustar(totales), huella=huella)
+        _guardar_en_disco(base, huella, coeficientes)
+
+    with _lock:
+        _actual[base] = (huella, coeficientes)
+    return coeficientes
+
+
+def coeficientes(base=almacen_vuelos.DATA_DIR, defecto=None):
+    """Instantánea de los coeficientes vigentes (o defecto si no hay ajuste)."""
+    try:
+        return recalibrar(base) or defecto
+    except Exception as e:
+        print(f"⚠ No se pudo calibrar el simulador: {e}")
+        publicado = _actual.get(base)
+        return publicado[1] if publicado is not None else defecto
@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios.detector_fases import UMBRAL_SUELO
+
+# ============================================================================
+# COMPARACIÓN DE VUELOS ALINEADOS
+# ============================================================================
+# Alinea N vuelos en un evento común (despegue o apogeo) y los remuestrea a
+# una misma grilla de tiempo relativo, para superponerlos o compararlos
+# punto a punto aunque cada CSV tenga su propio muestreo.
+#
+# Las series se leen de la caché columnar del almacén y la interpolación de
+# todos los vuelos es una sola operación: los tiempos de cada vuelo se
+# desplazan a un tramo propio del eje (vuelo k → k * separación + t), así un
+# único searchsorted sobre la concatenación resuelve todas las grillas.
+ALINEACIONES = ("despegue", "apogeo")
+COLUMNAS_COMPARABLES = ("altitude_m", "pressure_pa", "temp_c")
+MAX_VUELOS_COMPARACION = 64
+MAX_PUNTOS_GRILLA = 20000
+
+
+def tiempo_referencia(tiempos, alturas, alineacion):
+    """Tiempo del despegue (primera muestra sobre UMBRAL_SUELO) o del apogeo."""
+    if alineacion == "apogeo":
+        return float(tiempos[int(np.argmax(alturas))])
+    sobre = np.flatnonzero(alturas > UMBRAL_SUELO)
+    return float(tiempos[sobre[0]] if sobre.size else tiempos[0])
+
+
+def interpolar_lote(tiempos, valores, grilla):
+    """Interpola varias series (listas de arreglos) en una grilla común.
+
+    Devuelve una matriz (n_series, len(grilla)) con NaN fuera del rango de
+    cada serie. Equivale a np.interp por serie, pero en una sola pasada.
+    """
+    grilla = np.asarray(grilla, dtype=float)
+    n = len(tiempos)
+    resultado = np.full((n, len(grilla)), np.nan)
+    if n == 0 or len(grilla) == 0:
+        return resultado
+
+    longitudes = np.array([len(t) for t in tiempos])
+    if not longitudes.any():
+        return resultado
+    minimos = np.array([t[0] if len(t) else np.inf for t in tiempos])
+    maximos = np.array([t[-1] if len(t) else -np.inf for t in tiempos])
+    # Separación entre tramos: mayor que cualquier rango de tiempo en juego
+    finitos = np.concatenate([minimos[longitudes > 0], maximos[longitudes > 0], grilla[[0, -1]]])
+    separacion = 2.0 * (finitos.max() - finitos.min()) + 1.0
+
+    desplazamientos = np.repeat(np.arange(n) * separacion, longitudes)
+    claves = np.concatenate(tiempos) + desplazamientos
+    todos = np.concatenate(valores)
+
+    consultas = grilla[None, :] + (np.arange(n) * separacion)[:, None]
+    derecha = np.searchsorted(claves, consultas, side="right")
+    izquierda = np.clip(derecha - 1, 0, len(claves) - 1)
+    derecha = np.clip(derecha, 0, len(claves) - 1)
+
+    t0, t1 = claves[izquierda], claves[derecha]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peso = np.where(t1 > t0, (consultas - t0) / (t1 - t0), 0.0)
+    resultado[:] = todos[izquierda] + peso * (todos[derecha] - todos[izquierda])
+
+    dentro = (grilla[None, :] >= minimos[:, None]) & (grilla[None, :] <= maximos[:, None])
+    resultado[~dentro] = np.nan
+    return resultado
+
+
+def _series_vuelo(ruta, columna):
+    """(tiempos, alturas, valores) válidos y ordenados por tiempo."""
+    vuelo = almacen_vuelos.obtener_vuelo(ruta)
+    tiempos, alturas, valores = vuelo.columnas_validas("time_s", "altitude_m", columna)
+    if len(tiempos) > 1 and np.any(np.diff(tiempos) < 0):
+        orden = np.argsort(tiempos, kind="stable")
+        tiempos, alturas, valores = tiempos[orden], alturas[orden], valores[orden]
+    return tiempos, alturas, valores
+
+
+def comparar(rutas, alineacion="despegue", columna="altitude_m", puntos=2000,
+             desde=None, hasta=None):
+    """Series de varios vuelos alineadas y remuestreadas a una grilla común.
+
+    La grilla va de `desde` a `hasta` segundos relativos al evento (por
+    defecto, lo que cubren todos los vuelos) con `puntos` muestras.
+    """
+    if alineacion not in ALINEACIONES:
+        raise ValueError(f"Alineación desconocida: {alineacion} (usar {', '.join(ALINEACIONES)})")
+    if columna not in COLUMNAS_COMPARABLES:
+        raise ValueError(f"Columna no comparable: {columna}")
+    if not rutas:
+        raise ValueError("No se indicaron vuelos")
+    if len(rutas) > MAX_VUELOS_COMPARACION:
+        raise ValueError(f"Máximo {MAX_VUELOS_COMPARACION} vuelos por comparación")
+
+    tiempos, valores, referencias, vacios = [], [], [], []
+    for ruta in rutas:
+        t, alturas, v = _series_vuelo(ruta, columna)
+        if not len(t):
+            vacios.append(os.path.basename(ruta))
+            referencia = np.nan
+        else:
+            referencia = tiempo_referencia(t, alturas, alineacion)
+        tiempos.append(t - referencia if len(t) else t)
+        valores.append(v)
+        referencias.append(referencia)
+    if len(vacios) == len(rutas):
+        raise ValueError("Ningún vuelo tiene datos válidos")
+
+    con_datos = [t for t in tiempos if len(t)]
+    inicio = min(t[0] for t in con_datos) if desde is None else float(desde)
+    fin = max(t[-1] for t in con_datos) if hasta is None else float(hasta)
+    if not fin > inicio:
+        raise ValueError("El rango de tiempo está vacío")
+    puntos = max(2, min(MAX_PUNTOS_GRILLA, int(puntos)))
+    grilla = np.linspace(inicio, fin, puntos)
+
+    matriz = interpolar_lote(tiempos, valores, grilla)
+    # Media entre los vuelos que cubren cada instante
+    cubren = (~np.isnan(matriz)).sum(axis=0)
+    media = np.where(cubren > 0, np.nansum(matriz, axis=0) / np.maximum(cubren, 1), np.nan)
+
+    return {
+        "alineacion": alineacion,
+        "columna": columna,
+        "vuelos": [os.path.basename(r) for r in rutas],
+        "tiempo_referencia": referencias,
+        "sin_datos": vacios,
+        "tiempo": grilla,
+        "series": matriz,
+        "media": media,
+    }
@@ -0,0 +1,102 @@
+import numpy as np
+
+# ============================================================================
+# DECIMACIÓN DE SERIES PARA GRÁFICOS
+# ============================================================================
+# Un gráfico no puede mostrar más de ~2 puntos por píxel horizontal, así que
+# enviar todas las muestras de un vuelo largo solo engorda el JSON/HTML.
+# Estas funciones eligen qué índices conservar (LTTB o min/max por bucket) y
+# siempre mantienen los puntos marcados como importantes (apogeo, despliegue).
+ANCHO_GRAFICO_PX = 800
+MAX_PUNTOS_DEFECTO = 2 * ANCHO_GRAFICO_PX
+MIN_PUNTOS = 16
+LIMITE_PUNTOS = 200_000
+
+
+def leer_max_points(args, defecto=MAX_PUNTOS_DEFECTO):
+    """Lee el parámetro ?max_points= de la petición.
+
+    Devuelve None (sin decimar) con max_points=0, el valor por defecto si no
+    viene o no es numérico, y en otro caso lo limita a [MIN_PUNTOS, LIMITE_PUNTOS].
+    """
+    valor = args.get("max_points")
+    if valor is None:
+        return defecto
+    try:
+        n = int(valor)
+    except ValueError:
+        return defecto
+    if n <= 0:
+        return None
+    return max(MIN_PUNTOS, min(LIMITE_PUNTOS, n))
+
+
+def lttb(x, y, n):
+    """Índices elegidos por Largest-Triangle-Three-Buckets (n puntos)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    total = len(y)
+    if n >= total or n < 3:
+        return np.arange(total)
+
+    bordes = np.linspace(1, total - 1, n - 1).astype(int)
+    indices = np.empty(n, dtype=int)
+    indices[0] = 0
+    indices[-1] = total - 1
+
+    a = 0
+    for i in range(n - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        sig_fin = bordes[i + 2] if i + 2 < len(bordes) else total
+        prom_x = x[fin:sig_fin].mean()
+        prom_y = y[fin:sig_fin].mean()
+
+        areas = np.abs(
+            (x[a] - prom_x) * (y[ini:fin] - y[a])
+            - (x[a] - x[ini:fin]) * (prom_y - y[a])
+        )
+        a = ini + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    return indices
+
+
+def minmax(y, n):
+    """Índices del mínimo y máximo de cada bucket (n/2 buckets, n puntos)."""
+    y = np.asarray(y, dtype=float)
+    total = len(y)
+    buckets = max(1, n // 2)
+    if 2 * buckets >= total:
+        return np.arange(total)
+
+    bordes = np.linspace(0, total, buckets + 1).astype(int)
+    indices = []
+    for ini, fin in zip(bordes[:-1], bordes[1:]):
+        tramo = y[ini:fin]
+        indices.append(ini + int(np.argmin(tramo)))
+        indices.append(ini + int(np.argmax(tramo)))
+    return np.unique(np.array(indices, dtype=int))
+
+
+def decimar(x, ys, max_puntos, conservar=(), metodo="lttb"):
+    """Índices ordenados a conservar para una o varias series sobre el mismo x.
+
+    El presupuesto se reparte entre las series y se agregan siempre el primer
+    y último punto y los índices de conservar. Con max_puntos=None no se decima.
+    """
+    total = len(x)
+    if max_puntos is None or total <= max_puntos:
+        return np.arange(total)
+
+    if isinstance(ys, np.ndarray) and ys.ndim == 1:
+        ys = [ys]
+    por_serie = max(3, max_puntos // max(1, len(ys)))
+
+    elegidos = [np.array([0, total - 1]), np.asarray(list(conservar), dtype=int)]
+    for y in ys:
+        if metodo == "minmax":
+            elegidos.append(minmax(y, por_serie))
+        else:
+            elegidos.append(lttb(x, y, por_serie))
+    indices = np.unique(np.concatenate(elegidos))
+    return indices[(indices >= 0) & (indices < total)]
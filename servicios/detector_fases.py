@@ -0,0 +1,230 @@
+import math
+
+import numpy as np
+
+from servicios.filtro_tasa import TAU_TASA, TasaCausalOnline
+from servicios.lectura_streaming import TAM_BLOQUE, bloques_vuelo
+
+# ============================================================================
+# DETECTOR DE FASES EN LÍNEA
+# ============================================================================
+# Máquina de estados que recibe la telemetría muestra a muestra (o por
+# bloques) y emite los eventos despegue → apogeo → despliegue → aterrizaje
+# en cuanto se pueden confirmar, con trabajo y memoria O(1) por muestra.
+# Sirve para datos en vivo y para logs que no caben en memoria.
+#
+# Usa los mismos criterios que fases_vuelo.identificar_fases y
+# analisis_paracaidas.detectar_despliegue_paracaidas, pero solo con
+# información pasada: la altura se suaviza con un filtro exponencial (EMA),
+# la tasa de presión con el mismo filtro causal que el análisis offline
+# (servicios.filtro_tasa) y el apogeo se confirma cuando la altura filtrada
+# ya bajó DESCENSO_CONFIRMACION metros desde su máximo.
+UMBRAL_SUELO = 1.0            # m, altura que separa suelo de vuelo
+DESCENSO_CONFIRMACION = 0.5   # m bajo el máximo filtrado para confirmar el apogeo
+TAU_ALTURA = 0.1              # s, constante de tiempo del filtro de altura
+
+# El paracaídas se abre pasivamente poco después del apogeo
+VENTANA_DESPLIEGUE = (0.3, 2.0)   # s desde el apogeo
+MIN_MUESTRAS_DESPLIEGUE = 5
+
+EVENTOS = ("despegue", "apogeo", "despliegue", "aterrizaje")
+
+
+def _alfa(dt, tau):
+    """Peso de la muestra nueva en un EMA con paso de tiempo variable."""
+    return 1.0 - math.exp(-dt / tau) if dt > 0 else 0.0
+
+
+class DetectorFasesOnline:
+    """Eventos de vuelo a partir de (tiempo, altura, presión) en orden."""
+
+    def __init__(self, umbral_suelo=UMBRAL_SUELO, descenso_confirmacion=DESCENSO_CONFIRMACION,
+                 tau_altura=TAU_ALTURA, tau_tasa=TAU_TASA, ventana_despliegue=VENTANA_DESPLIEGUE):
+        self.umbral_suelo = umbral_suelo
+        self.descenso_confirmacion = descenso_confirmacion
+        self.tau_altura = tau_altura
+        self.tau_tasa = tau_tasa
+        self.ventana_despliegue = ventana_despliegue
+
+        self.n = 0                 # muestras recibidas (índice de la próxima)
+        self.eventos = []
+        self.estado = "suelo"      # suelo → ascenso → descenso → aterrizado
+        self._ultima = None        # (índice, t, altura, presión) de la última muestra
+
+        # Filtros
+        self._altura_filtrada = None
+        self._max_filtrada = -math.inf
+        self._t_anterior = None
+        self._filtro_tasa = TasaCausalOnline(tau_tasa)
+        self._tasas = ()           # últimas 3 tasas filtradas (para su desviación)
+
+        # Candidatos
+        self._apogeo = None        # (índice, t, altura, presión) de la altura máxima
+        self._despliegue = None    # mejor candidato de la ventana
+        self._var_min = math.inf
+        self._en_ventana = 0
+        self._quinta = None        # 5.ª muestra tras el apogeo (respaldo)
+        self._tras_apogeo = 0
+        self._desplegado = False
+
+    # ------------------------------------------------------------------
+    def _emitir(self, evento, muestra):
+        indice, t, altura, presion = muestra
+        registro = {
+            "evento": evento, "indice": indice, "tiempo": t, "altitud": altura,
+            "presion": None if math.isnan(presion) else presion,
+        }
+        self.eventos.append(registro)
+        return registro
+
+    def _filtrar(self, t, altura, presion):
+        dt = t - self._t_anterior if self._t_anterior is not None else 0.0
+        if self._altura_filtrada is None:
+            self._altura_filtrada = altura
+        else:
+            self._altura_filtrada += _alfa(dt, self.tau_altura) * (altura - self._altura_filtrada)
+        self._max_filtrada = max(self._max_filtrada, self._altura_filtrada)
+
+        calculadas = self._filtro_tasa.n
+        tasa = self._filtro_tasa.muestra(t, presion)
+        if self._filtro_tasa.n > calculadas:
+            self._tasas = (self._tasas + (tasa,))[-3:]
+        self._t_anterior = t
+
+    def _seguir_despliegue(self, muestra):
+        """Busca, tras el apogeo candidato, donde la tasa de presión se estabiliza."""
+        t = muestra[1]
+        self._tras_apogeo += 1
+        if self._tras_apogeo == MIN_MUESTRAS_DESPLIEGUE:
+            self._quinta = muestra
+        inicio, fin = (self._apogeo[1] + d for d in self.ventana_despliegue)
+        if inicio <= t <= fin:
+            self._en_ventana += 1
+            if self._en_ventana >= 3 and len(self._tasas) == 3:
+                variacion = float(np.std(self._tasas, ddof=1))
+                if variacion < self._var_min:
+                    self._var_min = variacion
+                    self._despliegue = muestra
+
+    def _cerrar_despliegue(self):
+        if self._en_ventana >= MIN_MUESTRAS_DESPLIEGUE and self._despliegue is not None:
+            elegido = self._despliegue
+        else:
+            elegido = self._quinta or self._ultima
+        self._desplegado = True
+        return self._emitir("despliegue", elegido)
+
+    # ------------------------------------------------------------------
+    def muestra(self, t, altura, presion=math.nan):
+        """Procesa una muestra; devuelve los eventos que quedaron confirmados."""
+        nuevos = []
+        actual = (self.n, float(t), float(altura), float(presion))
+        self.n += 1
+        self._ultima = actual
+        if self.estado == "aterrizado":
+            return nuevos
+
+        t, altura, presion = actual[1:]
+        self._filtrar(t, altura, presion)
+
+        if self.estado == "suelo":
+            if altura > self.umbral_suelo:
+                self.estado = "ascenso"
+                self._apogeo = actual
+                nuevos.append(self._emitir("despegue", actual))
+            return nuevos
+
+        if self.estado == "ascenso":
+            if altura > self._apogeo[2]:
+                # Nuevo máximo: la búsqueda del despliegue vuelve a empezar
+                self._apogeo = actual
+                self._despliegue, self._var_min, self._en_ventana = None, math.inf, 0
+                self._quinta, self._tras_apogeo = None, 0
+            else:
+                self._seguir_despliegue(actual)
+            if self._altura_filtrada < self._max_filtrada - self.descenso_confirmacion:
+                self.estado = "descenso"
+                nuevos.append(self._emitir("apogeo", self._apogeo))
+            return nuevos
+
+        # Descenso: despliegue al cerrar su ventana, aterrizaje al tocar suelo
+        if not self._desplegado:
+            self._seguir_despliegue(actual)
+            if t > self._apogeo[1] + self.ventana_despliegue[1] or altura < self.umbral_suelo:
+                nuevos.append(self._cerrar_despliegue())
+        if altura < self.umbral_suelo:
+            self.estado = "aterrizado"
+            nuevos.append(self._emitir("aterrizaje", actual))
+        return nuevos
+
+    def actualizar(self, tiempos, alturas, presiones=None):
+        """Procesa un bloque de muestras; devuelve los eventos nuevos.
+
+        Las filas con tiempo o altura NaN se cuentan (el índice sigue la
+        posición en el archivo) pero no se procesan. Mientras el cohete está
+        en la base el bloque se recorre de forma vectorizada.
+        """
+        tiempos = np.asarray(tiempos, dtype=float)
+        alturas = np.asarray(alturas, dtype=float)
+        presiones = np.full(len(tiempos), np.nan) if presiones is None else np.asarray(presiones, dtype=float)
+        validas = ~(np.isnan(tiempos) | np.isnan(alturas))
+
+        nuevos = []
+        i = 0
+        if self.estado in ("suelo", "aterrizado"):
+            # Saltar de una vez las muestras que no pueden cambiar el estado
+            if self.estado == "aterrizado":
+                i = len(tiempos)
+            else:
+                despega = np.flatnonzero(validas & (alturas > self.umbral_suelo))
+                i = int(despega[0]) if despega.size else len(tiempos)
+            previas = np.flatnonzero(validas[:i])
+            if previas.size:
+                j = int(previas[-1])
+                self._ultima = (self.n + j, float(tiempos[j]), float(alturas[j]), float(presiones[j]))
+                if self.estado == "suelo":
+                    self._t_anterior = float(tiempos[j])
+                    self._altura_filtrada = float(alturas[j])
+                    self._filtro_tasa.muestra(float(tiempos[j]), float(presiones[j]))
+            self.n += i
+
+        for k in range(i, len(tiempos)):
+            if validas[k]:
+                nuevos.extend(self.muestra(tiempos[k], alturas[k], presiones[k]))
+            else:
+                self.n += 1
+        return nuevos
+
+    def finalizar(self):
+        """Cierra el vuelo al terminar los datos (eventos aún sin confirmar)."""
+        nuevos = []
+        if self._ultima is None or self.estado in ("suelo", "aterrizado"):
+            return nuevos
+        if self.estado == "ascenso":
+            nuevos.append(self._emitir("apogeo", self._apogeo))
+        if not self._desplegado:
+            nuevos.append(self._cerrar_despliegue())
+        self.estado = "aterrizado"
+        nuevos.append(self._emitir("aterrizaje", self._ultima))
+        return nuevos
+
+    def fases(self):
+        """Eventos emitidos con las claves de fases_vuelo.identificar_fases."""
+        por_evento = {e["evento"]: e for e in self.eventos}
+        resultado = {}
+        for evento in EVENTOS:
+            if evento in por_evento:
+                resultado[f"idx_{evento}"] = por_evento[evento]["indice"]
+                resultado[f"tiempo_{evento}"] = por_evento[evento]["tiempo"]
+        if "apogeo" in por_evento:
+            resultado["altitud_maxima"] = por_evento["apogeo"]["altitud"]
+        return resultado
+
+
+def detectar_fases_archivo(ruta, tam_bloque=TAM_BLOQUE, **opciones):
+    """Corre el detector sobre un CSV bloque a bloque (sin cargarlo entero)."""
+    detector = DetectorFasesOnline(**opciones)
+    for bloque in bloques_vuelo(ruta, ("time_s", "altitude_m", "pressure_pa"), tam_bloque):
+        detector.actualizar(bloque["time_s"], bloque["altitude_m"], bloque["pressure_pa"])
+    detector.finalizar()
+    return detector
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+# ============================================================================
+# TASA DE CAMBIO CAUSAL (EMA CON PASO VARIABLE)
+# ============================================================================
+# La tasa de cambio de una serie (p. ej. la presión) es la diferencia entre
+# muestras dividida por el paso de tiempo, suavizada con un filtro
+# exponencial de constante de tiempo TAU_TASA. El peso de cada muestra
+# depende de su dt, así que sirve con pasos irregulares, y solo usa
+# información pasada.
+#
+# tasa_causal lo calcula para toda la serie de una vez (el resultado es un
+# solo arreglo, sin columnas intermedias) y TasaCausalOnline da los mismos
+# valores muestra a muestra con estado constante; el detector de fases en
+# línea usa esta última.
+TAU_TASA = 0.1        # s
+# El filtro se resuelve en forma cerrada con exp(t / tau); se parte en tramos
+# para que el exponente no desborde
+MAX_EXPONENTE = 500.0
+
+
+def tasa_causal(tiempos, valores, tau=TAU_TASA):
+    """Tasa de cambio suavizada de `valores` en cada muestra.
+
+    NaN en la primera muestra válida y en las filas con tiempo o valor NaN
+    (que no cuentan para las siguientes). Muestras con dt <= 0 repiten la
+    tasa anterior.
+    """
+    t = np.asarray(tiempos, dtype=float)
+    y = np.asarray(valores, dtype=float)
+    salida = np.full(len(t), np.nan)
+    validas = np.flatnonzero(~(np.isnan(t) | np.isnan(y)))
+    if len(validas) < 2:
+        return salida
+    if len(validas) < len(salida):
+        t, y = t[validas], y[validas]
+        tasa = np.full(len(t), np.nan)
+    else:
+        tasa = salida   # sin NaN se escribe directo en el resultado
+
+    # s_i = e^-(dt_i/tau) s_(i-1) + a_i r_i, con a_i = 1 - e^-(dt_i/tau) y
+    # r_i = dy_i / dt_i. Desenrollado desde el inicio de cada tramo:
+    # s_i = e^-u_i (s_inicial + sum_j a_j r_j e^u_j), con u el tiempo / tau
+    dt = np.diff(t)
+    positivos = dt > 0
+    if not positivos.any():
+        return salida
+    aportes = np.zeros(len(dt))
+    np.divide(np.diff(y), dt, out=aportes, where=positivos)
+    aportes *= -np.expm1(-np.where(positivos, dt, 0.0) / tau)
+    u = np.concatenate(([0.0], np.cumsum(np.where(positivos, dt, 0.0)))) / tau
+
+    primera = int(np.argmax(positivos))   # la tasa arranca en la primera diferencia válida
+    estado = tasa[primera + 1] = (y[primera + 1] - y[primera]) / dt[primera]
+    inicio = primera + 2
+    while inicio < len(t):
+        base = u[inicio - 1]
+        fin = int(np.searchsorted(u, base + MAX_EXPONENTE, side="right"))
+        if fin <= inicio:
+            # Un solo paso más largo que MAX_EXPONENTE * tau: el estado ya no pesa
+            tasa[inicio] = estado * math.exp(base - u[inicio]) + aportes[inicio - 1]
+            fin = inicio + 1
+        else:
+            exponente = u[inicio:fin] - base
+            tramo = tasa[inicio:fin]
+            np.cumsum(aportes[inicio - 1:fin - 1] * np.exp(exponente), out=tramo)
+            tramo += estado
+            tramo *= np.exp(-exponente)
+        estado = tasa[fin - 1]
+        inicio = fin
+    if tasa is not salida:
+        salida[validas] = tasa
+    return salida
+
+
+class TasaCausalOnline:
+    """Versión en línea de tasa_causal: guarda la última muestra y la tasa."""
+
+    def __init__(self, tau=TAU_TASA):
+        self.tau = tau
+        self.tasa = math.nan
+        self.n = 0            # tasas calculadas
+        self._t = None
+        self._valor = None
+
+    def muestra(self, t, valor):
+        """Agrega una muestra y devuelve la tasa actual (NaN hasta tener dos)."""
+        if math.isnan(t) or math.isnan(valor):
+            return self.tasa
+        if self._t is not None:
+            dt = t - self._t
+            if dt > 0:
+                tasa = (valor - self._valor) / dt
+                if math.isnan(self.tasa):
+                    self.tasa = tasa
+                else:
+                    self.tasa += -math.expm1(-dt / self.tau) * (tasa - self.tasa)
+                self.n += 1
+        self._t, self._valor = t, valor
+        return self.tasa
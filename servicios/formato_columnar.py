@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import struct
+import sys
+import threading
+
+import numpy as np
+
+# ============================================================================
+# FORMATO DEL SIDECAR BINARIO
+# ============================================================================
+# Junto a cada CSV se guarda "<archivo>.csv.col" con esta estructura:
+#
+#   MAGIC (8 bytes) | largo del header (uint32 LE) | header JSON | relleno
+#   | columna 0 (float64 LE) | columna 1 | ... | columna N-1
+#
+# El header guarda los nombres de columna, el número de filas y la firma
+# (mtime, tamaño) del CSV de origen: si el CSV cambia, el sidecar se ignora.
+# Los datos empiezan alineados a 64 bytes para poder abrirlos con memmap.
+MAGIC = b"VUELOCOL"
+VERSION = 1
+EXTENSION = ".col"
+DTYPE = np.dtype("<f8")
+ALINEACION = 64
+
+
+def ruta_sidecar(ruta_csv):
+    return ruta_csv + EXTENSION
+
+
+def _alinear(n):
+    return (n + ALINEACION - 1) // ALINEACION * ALINEACION
+
+
+def _escribir_header(f, nombres, filas, firma):
+    header = json.dumps({
+        "version": VERSION,
+        "columnas": nombres,
+        "filas": filas,
+        "firma": list(firma),
+    }).encode("utf-8")
+    inicio_datos = _alinear(len(MAGIC) + 4 + len(header))
+    f.write(MAGIC)
+    f.write(struct.pack("<I", len(header)))
+    f.write(header)
+    f.write(b"\0" * (inicio_datos - f.tell()))
+
+
+def escribir_sidecar(ruta_csv, columnas, firma):
+    """Escribe las columnas del vuelo en el sidecar binario (escritura atómica)."""
+    nombres = list(columnas)
+    filas = len(columnas[nombres[0]]) if nombres else 0
+
+    destino = ruta_sidecar(ruta_csv)
+    temporal = f"{destino}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as f:
+        _escribir_header(f, nombres, filas, firma)
+        for nombre in nombres:
+            f.write(np.ascontiguousarray(columnas[nombre], dtype=DTYPE).tobytes())
+    os.replace(temporal, destino)
+    return destino
+
+
+def escribir_sidecar_por_bloques(ruta_csv, bloques, firma):
+    """Igual que escribir_sidecar pero consumiendo un generador de bloques.
+
+    Cada columna se vuelca a su propio archivo temporal a medida que llegan
+    los bloques y al final se concatenan detrás del header, así la memoria
+    usada es la de un bloque sin importar el tamaño del CSV.
+    """
+    destino = ruta_sidecar(ruta_csv)
+    prefijo = f"{destino}.{os.getpid()}-{threading.get_ident()}"
+    nombres = None
+    filas = 0
+    partes = {}
+
+    try:
+        for bloque in bloques:
+            if nombres is None:
+                nombres = list(bloque)
+                partes = {n: open(f"{prefijo}.{i}.tmp", "wb") for i, n in enumerate(nombres)}
+            for nombre in nombres:
+                partes[nombre].write(np.ascontiguousarray(bloque[nombre], dtype=DTYPE).tobytes())
+            filas += len(bloque[nombres[0]]) if nombres else 0
+
+        nombres = nombres or []
+        temporal = f"{prefijo}.tmp"
+        with open(temporal, "wb") as f:
+            _escribir_header(f, nombres, filas, firma)
+            for nombre in nombres:
+                partes[nombre].close()
+                with open(partes[nombre].name, "rb") as parte:
+                    shutil.copyfileobj(parte, f)
+        os.replace(temporal, destino)
+    finally:
+        for parte in partes.values():
+            parte.close()
+            if os.path.exists(parte.name):
+                os.remove(parte.name)
+    return destino
+
+
+def abrir_sidecar(ruta_csv, firma):
+    """Abre el sidecar con memmap si existe y corresponde a la firma del CSV.
+
+    Devuelve un dict nombre -> columna de solo lectura, o None si no hay
+    sidecar válido (no existe, está corrupto o es de otra versión del CSV).
+    """
+    destino = ruta_sidecar(ruta_csv)
+    try:
+        with open(destino, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (largo,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(largo).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return None
+
+    if header.get("version") != VERSION or tuple(header.get("firma", ())) != tuple(firma):
+        return None
+
+    nombres = header["columnas"]
+    filas = header["filas"]
+    inicio_datos = _alinear(len(MAGIC) + 4 + largo)
+
+    if filas == 0 or not nombres:
+        vacias = {}
+        for nombre in nombres:
+            col = np.empty(0, dtype=DTYPE)
+            col.setflags(write=False)
+            vacias[nombre] = col
+        return vacias
+
+    if os.path.getsize(destino) < inicio_datos + len(nombres) * filas * DTYPE.itemsize:
+        return None
+
+    datos = np.memmap(destino, dtype=DTYPE, mode="r", offset=inicio_datos,
+                      shape=(len(nombres), filas))
+    return {nombre: datos[i].view(np.ndarray) for i, nombre in enumerate(nombres)}
+
+
+# ============================================================================
+# INGESTA (modo consola)
+# ============================================================================
+def ingestar_directorio(base):
+    """Genera o actualiza el sidecar de todos los CSV de la carpeta."""
+    from servicios.almacen_vuelos import firma_archivo, listar_csv, parsear_csv
+
+    generados = []
+    for archivo in listar_csv(base):
+        ruta = os.path.join(base, archivo)
+        firma = firma_archivo(ruta)
+        if abrir_sidecar(ruta, firma) is None:
+            generados.append(escribir_sidecar(ruta, parsear_csv(ruta), firma))
+    return generados
+
+
+if __name__ == "__main__":
+    from servicios.almacen_vuelos import DATA_DIR
+
+    base = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    for destino in ingestar_directorio(base):
+        print("✓ Sidecar generado:", destino)
@@ -0,0 +1,108 @@
+import json
+import struct
+
+import numpy as np
+from flask import Response, current_app
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# ============================================================================
+# FORMATOS DE RESPUESTA PARA LAS APIS DE SERIES
+# ============================================================================
+# Las APIs que devuelven columnas numéricas negocian el formato (?formato= o
+# la cabecera Accept):
+#
+#   json      el de siempre (la compresión br/gzip la aplica servicios.cache_http)
+#   f32, f64  binario: [uint32 LE n][encabezado JSON de n bytes][columnas
+#             float32/float64 little-endian contiguas]
+#   arrow     Arrow IPC (stream), solo si pyarrow está instalado
+#
+# pyarrow es opcional (ver requirements.txt): sin él, pedir arrow de forma
+# explícita (?formato=arrow o un Accept que solo admite Arrow) responde 406
+# en vez de cambiar de formato sin avisar.
+# En el binario el encabezado lleva {"columnas", "longitudes", "dtype",
+# "metadatos"} y está rellenado con espacios hasta múltiplo de 8 bytes, así
+# el cliente arma un Float32Array/Float64Array por columna sin copiar. Las
+# columnas salen directo de los arreglos NumPy, sin pasar por listas.
+MIME_JSON = "application/json"
+MIME_BINARIO = "application/octet-stream"
+MIME_ARROW = "application/vnd.apache.arrow.stream"
+
+TIPOS_BINARIOS = {"f32": "<f4", "f64": "<f8"}
+
+
+def formatos_disponibles():
+    return ("json", "f32", "f64") + (("arrow",) if pa is not None else ())
+
+
+def negociar_formato(request):
+    """Formato pedido con ?formato= o, si no viene, según la cabecera Accept."""
+    formato = request.args.get("formato")
+    if formato is None:
+        ofrecidos = [MIME_JSON, MIME_BINARIO] + ([MIME_ARROW] if pa is not None else [])
+        mejor = request.accept_mimetypes.best_match(ofrecidos)
+        if mejor is None and request.accept_mimetypes[MIME_ARROW]:
+            formato = "arrow"   # solo admite Arrow y no está disponible: 406
+        else:
+            formato = {MIME_BINARIO: "f64", MIME_ARROW: "arrow"}.get(mejor, "json")
+    if formato not in formatos_disponibles():
+        falta = " (requiere pyarrow)" if formato == "arrow" else ""
+        raise ValueError(
+            f"Formato no disponible: {formato}{falta} (usar {', '.join(formatos_disponibles())})"
+        )
+    return formato
+
+
+def empaquetar_binario(columnas, metadatos=None, tipo="<f8"):
+    """Bytes del formato binario (encabezado JSON + columnas contiguas)."""
+    tipo = np.dtype(tipo)
+    encabezado = json.dumps({
+        "columnas": list(columnas),
+        "longitudes": [int(len(c)) for c in columnas.values()],
+        "dtype": tipo.name,
+        "metadatos": metadatos or {},
+    }, separators=(",", ":")).encode()
+    encabezado += b" " * (-(4 + len(encabezado)) % 8)
+    partes = [struct.pack("<I", len(encabezado)), encabezado]
+    partes += [np.ascontiguousarray(c, dtype=tipo).data for c in columnas.values()]
+    return b"".join(partes)
+
+
+def empaquetar_arrow(columnas, metadatos=None):
+    """Bytes de un stream Arrow IPC con un lote (metadatos en el esquema)."""
+    lote = pa.RecordBatch.from_arrays(
+        [pa.array(np.asarray(c)) for c in columnas.values()], names=list(columnas)
+    )
+    lote = lote.replace_schema_metadata({"metadatos": json.dumps(metadatos or {})})
+    salida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(salida, lote.schema) as escritor:
+        escritor.write_batch(lote)
+    return salida.getvalue().to_pybytes()
+
+
+def responder_columnas(request, columnas, metadatos=None, armar_json=None):
+    """Respuesta con las columnas (dict nombre → arreglo) en el formato negociado.
+
+    armar_json(listas) arma el cuerpo JSON a partir de las columnas como
+    listas; por defecto es {**listas, **metadatos}.
+    """
+    try:
+        formato = negociar_formato(request)
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=406, mimetype=MIME_JSON)
+
+    if formato == "arrow":
+        respuesta = Response(empaquetar_arrow(columnas, metadatos), mimetype=MIME_ARROW)
+    elif formato in TIPOS_BINARIOS:
+        respuesta = Response(
+            empaquetar_binario(columnas, metadatos, TIPOS_BINARIOS[formato]), mimetype=MIME_BINARIO
+        )
+    else:
+        listas = {nombre: np.asarray(c).tolist() for nombre, c in columnas.items()}
+        cuerpo = armar_json(listas) if armar_json else {**listas, **(metadatos or {})}
+        respuesta = Response(current_app.json.dumps(cuerpo), mimetype=MIME_JSON)
+    respuesta.vary.add("Accept")
+    return respuesta
@@ -0,0 +1,291 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios import calculos
+from servicios.lectura_streaming import (
+    ApogeoOnline,
+    EstadisticaOnline,
+    InicioAscensoOnline,
+    bloques_validos,
+    bloques_vuelo,
+    resumen_densidad,
+)
+
+# ============================================================================
+# ÍNDICE PERSISTENTE DE RESÚMENES POR VUELO
+# ============================================================================
+# Cada CSV de data/ tiene una fila en "vuelos" con los resultados por vuelo
+# que usan las páginas de listado (apogeo, duración, Littlewood, densidad,
+# inicio del ascenso) y una fila por columna en "columnas" con n/suma/mín/máx.
+# Las filas guardan la firma (mtime, tamaño) del CSV: solo se recalculan los
+# archivos nuevos o modificados, el resto se responde desde SQLite.
+#
+# El análisis corre fuera del candado: _lock solo protege las escrituras y
+# el registro de recálculos en curso. Un CSV que ya recalcula otro hilo no se
+# vuelve a analizar; se espera a que ese hilo lo guarde.
+NOMBRE_INDICE = ".indice_vuelos.sqlite"
+VERSION_ESQUEMA = 1
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS vuelos (
+    archivo TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    tamano INTEGER NOT NULL,
+    filas INTEGER NOT NULL,
+    apogeo REAL,
+    tiempo_apogeo REAL,
+    indice_apogeo INTEGER,
+    tiempo_final REAL,
+    littlewood_final REAL,
+    littlewood_apogeo REAL,
+    inicio_ascenso INTEGER,
+    tiempo_inicio_ascenso REAL,
+    inicio_ascenso_positivo INTEGER,
+    tiempo_inicio_ascenso_positivo REAL,
+    dens_n INTEGER NOT NULL,
+    dens_promedio REAL,
+    dens_min REAL,
+    dens_max REAL
+);
+CREATE TABLE IF NOT EXISTS columnas (
+    archivo TEXT NOT NULL REFERENCES vuelos(archivo) ON DELETE CASCADE,
+    columna TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    suma REAL NOT NULL,
+    minimo REAL,
+    maximo REAL,
+    PRIMARY KEY (archivo, columna)
+);
+"""
+
+_lock = threading.Lock()
+_en_curso = {}            # ruta -> Event del hilo que la está recalculando
+
+
+def ruta_indice(base=almacen_vuelos.DATA_DIR):
+    return os.path.join(base, NOMBRE_INDICE)
+
+
+def _conectar(base):
+    conn = sqlite3.connect(ruta_indice(base), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS columnas")
+            conn.execute("DROP TABLE IF EXISTS vuelos")
+            conn.executescript(_ESQUEMA)
+            conn.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    return conn
+
+
+# ============================================================================
+# CÁLCULO DE UN RESUMEN (una pasada por bloques, memoria constante)
+# ============================================================================
+def calcular_resumen(ruta):
+    """Calcula el resumen de un vuelo y las estadísticas de cada columna."""
+    apogeo = ApogeoOnline()
+    inicio = InicioAscensoOnline()
+    inicio_positivo = InicioAscensoOnline(solo_positivas=True)
+    for tiempos, alturas in bloques_validos(ruta, ("time_s", "altitude_m")):
+        apogeo.actualizar(tiempos, alturas)
+        inicio.actualizar(tiempos, alturas)
+        inicio_positivo.actualizar(tiempos, alturas)
+
+    densidad = resumen_densidad(ruta)
+
+    nombres = list(almacen_vuelos.obtener_vuelo(ruta).columnas)
+    por_columna = {nombre: EstadisticaOnline() for nombre in nombres}
+    for bloque in bloques_vuelo(ruta, nombres):
+        for nombre, valores in bloque.items():
+            por_columna[nombre].actualizar(valores[~np.isnan(valores)])
+
+    hay_datos = apogeo.n > 0
+    resumen = {
+        "archivo": os.path.basename(ruta),
+        "filas": apogeo.n,
+        "apogeo": apogeo.altura if hay_datos else None,
+        "tiempo_apogeo": apogeo.tiempo,
+        "indice_apogeo": apogeo.indice,
+        "tiempo_final": apogeo.tiempo_final,
+        "littlewood_final": float(calculos.altura_littlewood(apogeo.tiempo_final)) if hay_datos else None,
+        "littlewood_apogeo": float(calculos.altura_littlewood(apogeo.tiempo)) if hay_datos else None,
+        "inicio_ascenso": inicio.indice,
+        "tiempo_inicio_ascenso": inicio.tiempo,
+        "inicio_ascenso_positivo": inicio_positivo.indice,
+        "tiempo_inicio_ascenso_positivo": inicio_positivo.tiempo,
+        "dens_n": densidad.n,
+        "dens_promedio": densidad.media,
+        "dens_min": densidad.minimo if densidad.n else None,
+        "dens_max": densidad.maximo if densidad.n else None,
+    }
+    return resumen, por_columna
+
+
+def _guardar(conn, resumen, por_columna, firma):
+    fila = dict(resumen, mtime_ns=firma[0], tamano=firma[1])
+    campos = ", ".join(fila)
+    marcas = ", ".join(f":{c}" for c in fila)
+    conn.execute("DELETE FROM vuelos WHERE archivo = ?", (resumen["archivo"],))
+    conn.execute(f"INSERT INTO vuelos ({campos}) VALUES ({marcas})", fila)
+    conn.executemany(
+        "INSERT INTO columnas (archivo, columna, n, suma, minimo, maximo) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (resumen["archivo"], nombre, est.n, est.suma,
+             est.minimo if est.n else None, est.maximo if est.n else None)
+            for nombre, est in por_columna.items()
+        ],
+    )
+
+
+# ============================================================================
+# ACTUALIZACIÓN INCREMENTAL Y CONSULTAS
+# ============================================================================
+def guardar_resumenes(base, lote, borrados=()):
+    """Guarda resúmenes ya calculados: lista de (resumen, por_columna, firma).
+
+    `borrados` son archivos que ya no están en la carpeta.
+    """
+    with _lock:
+        conn = _conectar(base)
+        try:
+            with conn:
+                for resumen, por_columna, firma in lote:
+                    _guardar(conn, resumen, por_columna, firma)
+                conn.executemany("DELETE FROM vuelos WHERE archivo = ?", [(a,) for a in borrados])
+        finally:
+            conn.close()
+
+
+def _reclamar(rutas):
+    """Separa las rutas que recalcula este hilo de las que ya recalcula otro.
+
+    Devuelve (propias, eventos de las ajenas); las propias se liberan con _liberar.
+    """
+    propias, ajenas = [], []
+    with _lock:
+        for ruta in rutas:
+            evento = _en_curso.get(ruta)
+            if evento is None:
+                _en_curso[ruta] = threading.Event()
+                propias.append(ruta)
+            else:
+                ajenas.append(evento)
+    return propias, ajenas
+
+
+def _liberar(rutas):
+    with _lock:
+        for ruta in rutas:
+            _en_curso.pop(ruta).set()
+
+
+def _calcular_con_firma(ruta):
+    firma = almacen_vuelos.firma_archivo(ruta)
+    resumen, por_columna = calcular_resumen(ruta)
+    return resumen, por_columna, firma
+
+
+def actualizar_indice(base=almacen_vuelos.DATA_DIR):
+    """Sincroniza el índice con la carpeta: un stat() por archivo y solo
+    recalcula los CSV nuevos o modificados. Devuelve los archivos recalculados.
+
+    Si hay muchos archivos pendientes se reparten con el motor de lotes.
+    """
+    from servicios.analisis_lote import mapear
+
+    archivos = almacen_vuelos.listar_csv(base)
+
+    conn = _conectar(base)
+    try:
+        conocidas = {
+            fila["archivo"]: (fila["mtime_ns"], fila["tamano"])
+            for fila in conn.execute("SELECT archivo, mtime_ns, tamano FROM vuelos")
+        }
+    finally:
+        conn.close()
+    pendientes = [
+        archivo for archivo in archivos
+        if conocidas.get(archivo) != almacen_vuelos.firma_archivo(os.path.join(base, archivo))
+    ]
+    borrados = set(conocidas) - set(archivos)
+    if not pendientes and not borrados:
+        return []
+
+    propias, ajenas = _reclamar([os.path.join(base, a) for a in pendientes])
+    try:
+        guardar_resumenes(base, mapear(_calcular_con_firma, propias), borrados)
+    finally:
+        _liberar(propias)
+    for evento in ajenas:
+        evento.wait()
+    return pendientes
+
+
+def resumenes(base=almacen_vuelos.DATA_DIR):
+    """Resúmenes de todos los vuelos de la carpeta, ordenados por archivo."""
+    actualizar_indice(base)
+    conn = _conectar(base)
+    try:
+        return [dict(fila) for fila in conn.execute("SELECT * FROM vuelos ORDER BY archivo")]
+    finally:
+        conn.close()
+
+
+def resumen_vuelo(ruta):
+    """Resumen de un solo vuelo (se recalcula si el CSV cambió)."""
+    ruta = os.path.abspath(ruta)
+    base = os.path.dirname(ruta)
+    archivo = os.path.basename(ruta)
+    firma = almacen_vuelos.firma_archivo(ruta)
+
+    fila = _fila_vuelo(base, archivo)
+    if fila is not None and (fila["mtime_ns"], fila["tamano"]) == firma:
+        return dict(fila)
+
+    propias, ajenas = _reclamar([ruta])
+    try:
+        if propias:
+            resumen, por_columna = calcular_resumen(ruta)
+            guardar_resumenes(base, [(resumen, por_columna, firma)])
+    finally:
+        _liberar(propias)
+    for evento in ajenas:
+        evento.wait()
+
+    fila = _fila_vuelo(base, archivo)
+    if fila is None:
+        # El hilo que lo recalculaba falló: se reintenta en este
+        return resumen_vuelo(ruta)
+    return dict(fila)
+
+
+def _fila_vuelo(base, archivo):
+    conn = _conectar(base)
+    try:
+        return conn.execute("SELECT * FROM vuelos WHERE archivo = ?", (archivo,)).fetchone()
+    finally:
+        conn.close()
+
+
+def estadistica_columna(columna, base=almacen_vuelos.DATA_DIR):
+    """Estadística combinada de una columna sobre todos los vuelos que la tienen."""
+    actualizar_indice(base)
+    conn = _conectar(base)
+    try:
+        n, suma, minimo, maximo = conn.execute(
+            "SELECT COALESCE(SUM(n), 0), COALESCE(SUM(suma), 0), MIN(minimo), MAX(maximo) "
+            "FROM columnas WHERE columna = ?",
+            (columna,),
+        ).fetchone()
+    finally:
+        conn.close()
+
+    est = EstadisticaOnline()
+    if n:
+        est.n, est.suma, est.minimo, est.maximo = n, suma, minimo, maximo
+    return est
@@ -0,0 +1,143 @@
+import math
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios import calculos
+
+# ============================================================================
+# LECTURA POR BLOQUES
+# ============================================================================
+TAM_BLOQUE = almacen_vuelos.TAM_BLOQUE
+
+
+def bloques_vuelo(ruta, columnas, tam_bloque=TAM_BLOQUE):
+    """Generador de bloques {columna: arreglo} con a lo sumo tam_bloque filas.
+
+    Si el almacén puede servir el vuelo sin cargar el CSV entero en memoria
+    (ya está en caché, cabe completo o hay sidecar mapeado) los bloques son
+    vistas sin copia; si no, el CSV se tokeniza bloque a bloque.
+    """
+    firma = almacen_vuelos.firma_archivo(ruta)
+    if almacen_vuelos.USAR_SIDECAR or firma[1] <= almacen_vuelos.LIMITE_PARSEO_COMPLETO:
+        vuelo = almacen_vuelos.obtener_vuelo(ruta)
+        series = {nombre: vuelo[nombre] for nombre in columnas}
+        for inicio in range(0, len(vuelo), tam_bloque):
+            yield {nombre: serie[inicio:inicio + tam_bloque] for nombre, serie in series.items()}
+    else:
+        yield from almacen_vuelos.parsear_csv_por_bloques(ruta, columnas, tam_bloque)
+
+
+def bloques_validos(ruta, columnas, tam_bloque=TAM_BLOQUE):
+    """Como bloques_vuelo pero descartando filas con algún valor no numérico."""
+    for bloque in bloques_vuelo(ruta, columnas, tam_bloque):
+        mascara = np.ones(len(bloque[columnas[0]]), dtype=bool)
+        for nombre in columnas:
+            mascara &= ~np.isnan(bloque[nombre])
+        yield tuple(bloque[nombre][mascara] for nombre in columnas)
+
+
+# ============================================================================
+# ACUMULADORES ONLINE (memoria O(1))
+# ============================================================================
+class EstadisticaOnline:
+    """Mínimo, máximo y media de una serie que llega por bloques."""
+
+    def __init__(self):
+        self.n = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def actualizar(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        if len(valores) == 0:
+            return
+        self.n += len(valores)
+        self.suma += float(valores.sum())
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+
+    @property
+    def media(self):
+        return self.suma / self.n if self.n else None
+
+
+class ApogeoOnline:
+    """Altura máxima (primera ocurrencia), su tiempo e índice, y el último tiempo."""
+
+    def __init__(self):
+        self.n = 0
+        self.altura = -math.inf
+        self.tiempo = None
+        self.indice = None
+        self.tiempo_final = None
+
+    def actualizar(self, tiempos, alturas):
+        if len(alturas) == 0:
+            return
+        i = calculos.indice_apogeo(alturas)
+        if alturas[i] > self.altura:
+            self.altura = float(alturas[i])
+            self.tiempo = float(tiempos[i])
+            self.indice = self.n + i
+        self.n += len(alturas)
+        self.tiempo_final = float(tiempos[-1])
+
+
+class InicioAscensoOnline:
+    """Primer índice donde la altura sube respecto a la muestra anterior."""
+
+    def __init__(self, solo_positivas=False):
+        self.solo_positivas = solo_positivas
+        self.n = 0
+        self.indice = None
+        self.tiempo = None
+        self._ultima = None
+
+    def actualizar(self, tiempos, alturas):
+        if len(alturas) == 0:
+            return
+        if self.indice is None:
+            # Se antepone la última muestra del bloque anterior para no perder
+            # una subida justo en la frontera entre bloques
+            desplazamiento = 0 if self._ultima is None else 1
+            serie = alturas if self._ultima is None else np.concatenate(([self._ultima], alturas))
+            j = calculos.indice_inicio_ascenso(serie, self.solo_positivas)
+            if j is not None:
+                self.indice = self.n + j - desplazamiento
+                self.tiempo = float(tiempos[j - desplazamiento])
+        self._ultima = float(alturas[-1])
+        self.n += len(alturas)
+
+
+# ============================================================================
+# RESÚMENES POR VUELO
+# ============================================================================
+def resumen_ambiental(ruta, tam_bloque=TAM_BLOQUE):
+    """Estadísticas de temperatura, presión, altitud y duración del vuelo."""
+    columnas = ("time_s", "temp_c", "pressure_pa", "altitude_m")
+    est = {nombre: EstadisticaOnline() for nombre in columnas}
+    for bloque in bloques_validos(ruta, columnas, tam_bloque):
+        for nombre, valores in zip(columnas, bloque):
+            est[nombre].actualizar(valores)
+    return est
+
+
+def resumen_densidad(ruta, R=calculos.R_AIRE, tam_bloque=TAM_BLOQUE):
+    """Estadística de la densidad del aire calculada bloque a bloque."""
+    est = EstadisticaOnline()
+    for presiones, temperaturas, _ in bloques_validos(ruta, ("pressure_pa", "temp_c", "time_s"), tam_bloque):
+        densidades = calculos.densidad_aire(presiones, temperaturas, R)
+        est.actualizar(densidades[~np.isnan(densidades)])
+    return est
+
+
+def resumen_apogeo(ruta, solo_positivas=False, tam_bloque=TAM_BLOQUE):
+    """Apogeo, tiempo de apogeo, último tiempo e inicio del ascenso del vuelo."""
+    apogeo = ApogeoOnline()
+    inicio = InicioAscensoOnline(solo_positivas)
+    for tiempos, alturas in bloques_validos(ruta, ("time_s", "altitude_m"), tam_bloque):
+        apogeo.actualizar(tiempos, alturas)
+        inicio.actualizar(tiempos, alturas)
+    return apogeo, inicio
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+
+from servicios import almacen_vuelos
+
+# ============================================================================
+# METADATOS DE LANZAMIENTO POR VUELO
+# ============================================================================
+# Los CSV solo traen telemetría; las condiciones del lanzamiento (presión de
+# la botella, agua cargada, capacidad) se leen de data/vuelos.json:
+#
+#   {"lanzamiento_1.csv": {"presion_psi": 60, "agua_l": 1.0, "capacidad_l": 3.0}}
+#
+# Los vuelos o campos que no aparecen usan los parámetros del laboratorio.
+ARCHIVO_METADATOS = "vuelos.json"
+
+PRESION_PSI = 60        # PSI
+AGUA_L = 1.0            # Litros
+CAPACIDAD_L = 3.0       # Litros
+
+DEFECTO = {"presion_psi": PRESION_PSI, "agua_l": AGUA_L, "capacidad_l": CAPACIDAD_L}
+
+_cache = {}  # base -> (firma, metadatos)
+_lock = threading.Lock()
+
+
+def ruta_metadatos(base=almacen_vuelos.DATA_DIR):
+    return os.path.join(base, ARCHIVO_METADATOS)
+
+
+def firma_metadatos(base=almacen_vuelos.DATA_DIR):
+    """Firma del archivo de metadatos (None si no existe)."""
+    try:
+        return almacen_vuelos.firma_archivo(ruta_metadatos(base))
+    except OSError:
+        return None
+
+
+def _leer(base):
+    firma = firma_metadatos(base)
+    with _lock:
+        guardado = _cache.get(base)
+        if guardado is not None and guardado[0] == firma:
+            return guardado[1]
+
+    datos = {}
+    if firma is not None:
+        try:
+            with open(ruta_metadatos(base), encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Metadatos de vuelos inválidos ({ruta_metadatos(base)}): {e}")
+
+    with _lock:
+        _cache[base] = (firma, datos)
+    return datos
+
+
+def metadatos_vuelo(archivo, base=almacen_vuelos.DATA_DIR):
+    """Condiciones de lanzamiento de un vuelo (con los valores por defecto)."""
+    propios = _leer(base).get(os.path.basename(archivo), {})
+    return {campo: propios.get(campo, valor) for campo, valor in DEFECTO.items()}
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ============================================================================
+# CLIMA DE REFERENCIA (OPEN-METEO) CON CACHÉ
+# ============================================================================
+# El dashboard ambiental compara el vuelo contra el clima actual. La consulta
+# HTTP nunca se hace dentro de la petición: el resultado se guarda con un TTL
+# por (lat, lon, ventana de tiempo) y un hilo en segundo plano lo refresca
+# al vencer. Mientras llega el primer dato, o si la red falla, se
+# responde con el último valor conocido o con exito=False.
+#
+# El proveedor es configurable (METEO_PROVEEDOR): "open-meteo" (por defecto)
+# o "fijo", que lee un JSON local (METEO_FIXTURE) para trabajar sin red.
+WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
+TIMEOUT_SEGUNDOS = 5
+TTL_SEGUNDOS = 600
+DECIMALES_COORDENADAS = 2
+
+# Tiempo máximo que una petición espera el primer dato de unas coordenadas
+ESPERA_PRIMERA_CONSULTA = 0.5
+
+# Tras un fallo no se vuelve a consultar antes de este tiempo
+REINTENTO_SEGUNDOS = 30
+
+# Coordenadas sin consultas en este tiempo dejan de refrescarse
+OLVIDAR_SEGUNDOS = 3600
+
+LAT_DEFECTO = 2.4448
+LON_DEFECTO = -76.6147
+
+SIN_DATOS = {"temperatura": None, "presion": None, "timestamp": None, "exito": False}
+
+PROVEEDORES = {}       # nombre -> función(lat, lon) -> dict como SIN_DATOS
+_cache = {}            # (lat, lon) -> (ventana, instante, datos)
+_ultimo_uso = {}       # (lat, lon) -> instante de la última consulta
+_en_curso = {}         # (lat, lon) -> threading.Event de la consulta en curso
+_fallos = {}           # (lat, lon) -> instante del último fallo
+_lock = threading.Lock()
+_refrescador = None
+
+
+def registrar_proveedor(nombre, consultar):
+    """Registra una fuente de clima: consultar(lat, lon) -> dict."""
+    PROVEEDORES[nombre] = consultar
+    return consultar
+
+
+# ============================================================================
+# PROVEEDORES
+# ============================================================================
+_sesion = None
+
+
+def _obtener_sesion():
+    """Sesión HTTP compartida (conexiones keep-alive reutilizadas)."""
+    global _sesion
+    if _sesion is None:
+        sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=1)
+        sesion.mount("https://", adaptador)
+        sesion.mount("http://", adaptador)
+        _sesion = sesion
+    return _sesion
+
+
+def consultar_open_meteo(lat, lon):
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "current": "temperature_2m,surface_pressure",
+        "timezone": "America/Bogota"
+    }
+    r = _obtener_sesion().get(WEATHER_API_URL, params=params, timeout=TIMEOUT_SEGUNDOS)
+    r.raise_for_status()
+    data = r.json().get("current", {})
+
+    return {
+        "temperatura": data.get("temperature_2m"),
+        "presion": data.get("surface_pressure", 0) * 100,
+        "timestamp": data.get("time"),
+        "exito": True
+    }
+
+
+def consultar_fijo(lat, lon):
+    """Clima desde un JSON local (METEO_FIXTURE) o valores típicos de Popayán."""
+    ruta = os.environ.get("METEO_FIXTURE")
+    if ruta:
+        with open(ruta, encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = {"temperatura": 19.0, "presion": 80000.0}
+
+    return {
+        "temperatura": data.get("temperatura"),
+        "presion": data.get("presion"),
+        "timestamp": data.get("timestamp") or time.strftime("%Y-%m-%dT%H:%M"),
+        "exito": True
+    }
+
+
+registrar_proveedor("open-meteo", consultar_open_meteo)
+registrar_proveedor("fijo", consultar_fijo)
+
+
+def proveedor_actual():
+    return os.environ.get("METEO_PROVEEDOR", "open-meteo")
+
+
+# ============================================================================
+# CACHÉ CON TTL
+# ============================================================================
+def _clave(lat, lon):
+    return (round(lat, DECIMALES_COORDENADAS), round(lon, DECIMALES_COORDENADAS))
+
+
+def _ventana(instante=None):
+    return int((instante or time.time()) // TTL_SEGUNDOS)
+
+
+def _actualizar(clave):
+    """Consulta al proveedor y guarda el resultado (corre en un hilo aparte)."""
+    try:
+        datos = PROVEEDORES[proveedor_actual()](*clave)
+    except Exception as e:
+        print(f"⚠ Consulta de clima falló ({proveedor_actual()}): {e}")
+        datos = None
+
+    with _lock:
+        ahora = time.time()
+        if datos is not None:
+            _cache[clave] = (_ventana(ahora), ahora, datos)
+            _fallos.pop(clave, None)
+        else:
+            _fallos[clave] = ahora
+        evento = _en_curso.pop(clave, None)
+    if evento is not None:
+        evento.set()
+
+
+def _solicitar(clave):
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada is not None and entrada[0] == _ventana():
+            return None
+        if time.time() - _fallos.get(clave, 0) < REINTENTO_SEGUNDOS:
+            return None
+        evento = _en_curso.get(clave)
+        if evento is not None:
+            return evento
+        evento = _en_curso[clave] = threading.Event()
+
+    threading.Thread(target=_actualizar, args=(clave,), name="clima", daemon=True).start()
+    return evento
+
+
+def solicitar(lat=LAT_DEFECTO, lon=LON_DEFECTO):
+    """Lanza en segundo plano la consulta si el dato no está vigente.
+
+    Devuelve el evento de la consulta en curso, o None si no hace falta.
+    """
+    clave = _clave(lat, lon)
+    with _lock:
+        _ultimo_uso[clave] = time.time()
+    iniciar_refrescador()
+    return _solicitar(clave)
+
+
+def obtener_datos_meteorologicos(lat=LAT_DEFECTO, lon=LON_DEFECTO, espera=ESPERA_PRIMERA_CONSULTA):
+    """Clima vigente para las coordenadas, sin esperar a la red.
+
+    Si el dato venció se devuelve el anterior mientras se refresca; solo la
+    primera vez (sin ningún dato) se espera a lo sumo `espera` segundos.
+    """
+    clave = _clave(lat, lon)
+    evento = solicitar(lat, lon)
+    with _lock:
+        entrada = _cache.get(clave)
+    if entrada is None and evento is not None and espera:
+        evento.wait(espera)
+        with _lock:
+            entrada = _cache.get(clave)
+    return dict(entrada[2]) if entrada is not None else dict(SIN_DATOS)
+
+
+def instante_datos(lat=LAT_DEFECTO, lon=LON_DEFECTO):
+    """Instante del clima guardado para las coordenadas (None si no hay)."""
+    with _lock:
+        entrada = _cache.get(_clave(lat, lon))
+    return entrada[1] if entrada is not None else None
+
+
+# ============================================================================
+# REFRESCO EN SEGUNDO PLANO
+# ============================================================================
+def _refrescar():
+    while True:
+        time.sleep(TTL_SEGUNDOS / 10)
+        ahora = time.time()
+        with _lock:
+            for clave, instante in list(_ultimo_uso.items()):
+                if ahora - instante > OLVIDAR_SEGUNDOS:
+                    _ultimo_uso.pop(clave)
+                    _cache.pop(clave, None)
+            claves = list(_ultimo_uso)
+        for clave in claves:
+            _solicitar(clave)
+
+
+def iniciar_refrescador():
+    """Arranca (una sola vez por proceso) el hilo que mantiene el clima al día."""
+    global _refrescador
+    with _lock:
+        if _refrescador is None or not _refrescador.is_alive():
+            _refrescador = threading.Thread(target=_refrescar, name="refresco-clima", daemon=True)
+            _refrescador.start()
+        return _refrescador
+
+
+def vaciar_cache():
+    with _lock:
+        _cache.clear()
+        _fallos.clear()
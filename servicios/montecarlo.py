@@ -0,0 +1,169 @@
+import math
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios import analisis_lote
+from servicios import calculos
+from servicios import calibracion
+from servicios import indice_vuelos
+from servicios import optimizador
+from servicios import trayectoria
+
+# ============================================================================
+# INCERTIDUMBRE POR MONTE CARLO
+# ============================================================================
+# En vez de una banda fija de ±5 %, se sortean muchas repeticiones del
+# lanzamiento: presión cargada, agua cargada, densidad del aire y el residuo
+# del modelo, con dispersiones estimadas del archivo de vuelos. El apogeo
+# de cada muestra sale del motor físico calibrado.
+#
+# Simular 10^5 trayectorias por petición no cabe en un tiempo interactivo,
+# así que el motor se evalúa en una grilla presión × agua × densidad que
+# cubre ±4σ (memorizada por el optimizador) y cada muestra se interpola
+# trilinealmente. Las muestras se procesan por bloques (memoria acotada) y,
+# con varios workers, los bloques se reparten en el pool de procesos.
+MUESTRAS_DEFECTO = 100000
+MAX_MUESTRAS = 1000000
+TAMANO_BLOQUE = 65536
+BINS_DEFECTO = 40
+MAX_BINS = 1000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Dispersión de la carga (resolución del manómetro y de la probeta)
+SIGMA_PSI = 1.0         # PSI
+SIGMA_AGUA_L = 0.02     # Litros
+SIGMA_DENSIDAD = 0.005  # kg/m³
+
+# Puntos de la grilla del motor físico por eje
+PUNTOS_PSI = 25
+PUNTOS_AGUA = 17
+PUNTOS_DENSIDAD = 9
+ANCHO_SIGMAS = 4.0
+
+
+def distribuciones(base=almacen_vuelos.DATA_DIR):
+    """Dispersión de la carga, la densidad del aire y el residuo del modelo.
+
+    data/vuelos.json solo guarda la carga nominal, así que presión y agua
+    usan la resolución de los instrumentos; la densidad combina la variación
+    entre vuelos y dentro de cada vuelo, y el residuo sale de la calibración.
+    """
+    filas = [r for r in indice_vuelos.resumenes(base) if r["filas"]]
+
+    presion_amb, densidad = trayectoria.ambiente_de_vuelos(base)
+    con_densidad = [r for r in filas if r["dens_n"]]
+    varianza = 0.0
+    if len(con_densidad) > 1:
+        varianza += float(np.var([r["dens_promedio"] for r in con_densidad], ddof=1))
+    if con_densidad:
+        # El rango dentro de un vuelo cubre ~±2σ
+        varianza += float(np.mean([((r["dens_max"] - r["dens_min"]) / 4) ** 2 for r in con_densidad]))
+
+    coef = calibracion.coeficientes(base)
+    return {
+        "sigma_psi": SIGMA_PSI,
+        "sigma_agua_l": SIGMA_AGUA_L,
+        "densidad_aire": float(densidad),
+        "sigma_densidad": max(SIGMA_DENSIDAD, math.sqrt(varianza)),
+        "presion_ambiente": float(presion_amb),
+        "residuo_relativo": coef["residuo_std"] / coef["h_mean"] if coef and coef["h_mean"] > 0 else 0.0,
+        "coef": coef,
+    }
+
+
+# ============================================================================
+# SUPERFICIE DEL MOTOR FÍSICO
+# ============================================================================
+def _eje(centro, sigma, puntos, minimo):
+    return np.linspace(max(minimo, centro - ANCHO_SIGMAS * sigma), centro + ANCHO_SIGMAS * sigma, puntos)
+
+
+def superficie(psi, agua_l, capacidad_l, dist, g=calculos.G):
+    """Apogeo físico en la grilla presión × agua × densidad alrededor de la carga."""
+    ejes = (
+        _eje(psi, dist["sigma_psi"], PUNTOS_PSI, 0.0),
+        np.minimum(_eje(agua_l, dist["sigma_agua_l"], PUNTOS_AGUA, 0.0), capacidad_l * 0.999),
+        _eje(dist["densidad_aire"], dist["sigma_densidad"], PUNTOS_DENSIDAD, 0.01),
+    )
+    ejes = (ejes[0], np.unique(ejes[1]), ejes[2])
+    presiones, aguas = (m.ravel() for m in np.meshgrid(ejes[0], ejes[1], indexing="ij"))
+    capacidades = np.full(presiones.size, float(capacidad_l))
+
+    valores = np.empty((ejes[0].size, ejes[1].size, ejes[2].size))
+    for k, densidad in enumerate(ejes[2]):
+        apogeos, _ = optimizador.evaluar_puntos(
+            presiones, aguas, capacidades, float(densidad), dist["presion_ambiente"], g
+        )
+        valores[:, :, k] = apogeos.reshape(ejes[0].size, ejes[1].size)
+    return ejes, valores
+
+
+def interpolar(ejes, valores, puntos):
+    """Interpolación trilineal de valores (grilla regular) en los puntos dados."""
+    indices, pesos = [], []
+    for eje, x in zip(ejes, puntos):
+        if eje.size == 1:
+            indices.append(np.zeros(x.size, dtype=np.intp))
+            pesos.append(np.zeros(x.size))
+            continue
+        x = np.clip(x, eje[0], eje[-1])
+        i = np.clip(np.searchsorted(eje, x) - 1, 0, eje.size - 2)
+        indices.append(i)
+        pesos.append((x - eje[i]) / (eje[i + 1] - eje[i]))
+
+    paso = [1 if eje.size > 1 else 0 for eje in ejes]
+    resultado = np.zeros(puntos[0].size)
+    for di in (0, 1):
+        for dj in (0, 1):
+            for dk in (0, 1):
+                w = ((pesos[0] if di else 1 - pesos[0])
+                     * (pesos[1] if dj else 1 - pesos[1])
+                     * (pesos[2] if dk else 1 - pesos[2]))
+                resultado += w * valores[indices[0] + di * paso[0], indices[1] + dj * paso[1], indices[2] + dk * paso[2]]
+    return resultado
+
+
+# ============================================================================
+# MUESTREO POR BLOQUES
+# ============================================================================
+def muestrear_bloque(semilla, n, psi, agua_l, capacidad_l, dist, ejes, valores, factor):
+    """Apogeos calibrados de n lanzamientos sorteados (corre en cada proceso)."""
+    rng = np.random.default_rng(semilla)
+    presiones = np.maximum(rng.normal(psi, dist["sigma_psi"], n), 0.0)
+    aguas = np.clip(rng.normal(agua_l, dist["sigma_agua_l"], n), 0.0, capacidad_l * 0.999)
+    densidades = np.maximum(rng.normal(dist["densidad_aire"], dist["sigma_densidad"], n), 0.01)
+    residuos = rng.normal(1.0, dist["residuo_relativo"], n)
+
+    apogeos = interpolar(ejes, valores, (presiones, aguas, densidades)) * factor * residuos
+    return np.maximum(apogeos, 0.0)
+
+
+def simular(psi, agua_l, capacidad_l, muestras=MUESTRAS_DEFECTO, bins=BINS_DEFECTO,
+            semilla=None, base=almacen_vuelos.DATA_DIR):
+    """Distribución del apogeo para una carga: percentiles e histograma."""
+    dist = distribuciones(base)
+    coef = dist.pop("coef")
+    ambiente = dict(densidad_aire=dist["densidad_aire"], presion_ambiente=dist["presion_ambiente"])
+    factor = trayectoria.factor_calibracion(coef, **ambiente) if coef else 1.0
+    ejes, valores = superficie(psi, agua_l, capacidad_l, dist)
+
+    tamanos = [min(TAMANO_BLOQUE, muestras - i) for i in range(0, muestras, TAMANO_BLOQUE)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    args = [(s, n, psi, agua_l, capacidad_l, dist, ejes, valores, factor) for s, n in zip(semillas, tamanos)]
+    if analisis_lote.WORKERS <= 1 or len(args) < 2:
+        bloques = [muestrear_bloque(*a) for a in args]
+    else:
+        bloques = list(analisis_lote.ejecutor_compartido().map(muestrear_bloque, *zip(*args)))
+    apogeos = np.concatenate(bloques)
+
+    conteos, bordes = np.histogram(apogeos, bins=bins)
+    return {
+        "muestras": int(apogeos.size),
+        "media": float(apogeos.mean()),
+        "desviacion": float(apogeos.std()),
+        "percentiles": dict(zip((f"p{p}" for p in PERCENTILES), np.percentile(apogeos, PERCENTILES).tolist())),
+        "histograma": {"bordes": bordes.tolist(), "conteos": conteos.tolist()},
+        "distribuciones": dist,
+        "factor_calibracion": factor,
+    }
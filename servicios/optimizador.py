@@ -0,0 +1,180 @@
+import threading
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios import analisis_lote
+from servicios import calculos
+from servicios import calibracion
+from servicios import trayectoria
+
+# ============================================================================
+# OPTIMIZADOR DE LA FÓRMULA DEL ÉXITO
+# ============================================================================
+# Busca la combinación presión × agua × botella con mayor apogeo usando el
+# motor físico (servicios.trayectoria) escalado con la calibración del
+# archivo de vuelos. La grilla se parte en bloques que se evalúan en el pool
+# de procesos compartido; cada punto ya evaluado queda memorizado (por
+# ambiente) y una nueva búsqueda solo simula los puntos que faltan.
+#
+# La memoria guarda claves enteras ordenadas (el punto cuantizado a 0.01 PSI
+# y a mililitros) con su apogeo físico, así la búsqueda de 10^5 puntos es un
+# searchsorted y no un bucle de Python.
+TAMANO_BLOQUE = 16384
+MAX_MEMORIA = 2_000_000   # puntos memorizados por ambiente antes de vaciar
+
+# Intervalo de confianza del 95 % con el residuo de la calibración
+Z_CONFIANZA = 1.96
+
+# Cuantización de las claves: 0.01 PSI y 1 mL (hasta 9999 L por eje)
+_ESCALA_PSI = 100
+_ESCALA_L = 1000
+_BASE_L = 10 ** 7
+# La clave psi·_BASE_L² + agua·_BASE_L + capacidad tiene que entrar en int64
+_MAX_PSI_CLAVE = np.iinfo(np.int64).max // _BASE_L ** 2 - 1
+
+_memoria = {}   # ambiente -> (claves ordenadas, apogeos)
+_lock = threading.Lock()
+
+
+def _claves(presiones, aguas, capacidades):
+    psi = np.rint(presiones * _ESCALA_PSI).astype(np.int64)
+    agua = np.rint(aguas * _ESCALA_L).astype(np.int64)
+    capacidad = np.rint(capacidades * _ESCALA_L).astype(np.int64)
+    if psi.size and (psi.min() < 0 or psi.max() > _MAX_PSI_CLAVE
+                     or min(agua.min(), capacidad.min()) < 0 or max(agua.max(), capacidad.max()) >= _BASE_L):
+        raise ValueError("Punto fuera del rango que se puede memorizar")
+    return (psi * _BASE_L + agua) * _BASE_L + capacidad
+
+
+def _buscar(ambiente, claves):
+    """Apogeos memorizados (NaN donde falta el punto)."""
+    with _lock:
+        guardado = _memoria.get(ambiente)
+    apogeos = np.full(claves.size, np.nan)
+    if guardado is None or not guardado[0].size:
+        return apogeos
+    conocidas, valores = guardado
+    pos = np.minimum(np.searchsorted(conocidas, claves), conocidas.size - 1)
+    encontrado = conocidas[pos] == claves
+    apogeos[encontrado] = valores[pos[encontrado]]
+    return apogeos
+
+
+def _memorizar(ambiente, claves, apogeos):
+    with _lock:
+        conocidas, valores = _memoria.get(ambiente, (np.empty(0, np.int64), np.empty(0)))
+        if conocidas.size + claves.size > MAX_MEMORIA:
+            conocidas, valores = np.empty(0, np.int64), np.empty(0)
+        todas = np.concatenate([conocidas, claves])
+        todas, unicos = np.unique(todas, return_index=True)
+        _memoria[ambiente] = (todas, np.concatenate([valores, apogeos])[unicos])
+
+
+def vaciar_memoria():
+    with _lock:
+        _memoria.clear()
+
+
+# ============================================================================
+# EVALUACIÓN EN PARALELO
+# ============================================================================
+def evaluar_bloque(presiones, aguas, capacidades, densidad_aire, presion_ambiente, g):
+    """Apogeo físico de un bloque de puntos (se ejecuta dentro de cada proceso)."""
+    return trayectoria.simular(
+        presiones, aguas, capacidades,
+        densidad_aire=densidad_aire, presion_ambiente=presion_ambiente, g=g,
+    )["apogeo"]
+
+
+def evaluar_puntos(presiones, aguas, capacidades, densidad_aire, presion_ambiente, g=calculos.G):
+    """Apogeo físico de cada punto, simulando solo los que no están memorizados.
+
+    Devuelve (apogeos, puntos simulados en esta llamada).
+    """
+    ambiente = (round(densidad_aire, 4), round(presion_ambiente, 1), g)
+    claves = _claves(presiones, aguas, capacidades)
+    apogeos = _buscar(ambiente, claves)
+
+    faltan = np.flatnonzero(np.isnan(apogeos))
+    if not faltan.size:
+        return apogeos, 0
+    # Puntos repetidos dentro de la misma grilla se simulan una sola vez
+    nuevas, primera, inversa = np.unique(claves[faltan], return_index=True, return_inverse=True)
+    indices = faltan[primera]
+
+    bloques = [indices[i:i + TAMANO_BLOQUE] for i in range(0, indices.size, TAMANO_BLOQUE)]
+    args = [(presiones[b], aguas[b], capacidades[b], densidad_aire, presion_ambiente, g) for b in bloques]
+    if analisis_lote.WORKERS <= 1 or len(bloques) < 2:
+        resultados = [evaluar_bloque(*a) for a in args]
+    else:
+        resultados = list(analisis_lote.ejecutor_compartido().map(evaluar_bloque, *zip(*args)))
+
+    calculados = np.concatenate(resultados)
+    apogeos[faltan] = calculados[inversa]
+    _memorizar(ambiente, nuevas, calculados)
+    return apogeos, indices.size
+
+
+# ============================================================================
+# BÚSQUEDA DEL ÓPTIMO
+# ============================================================================
+def _rango(valores):
+    return [round(float(valores.min()), 3), round(float(valores.max()), 3)]
+
+
+def optimizar(presiones, aguas, capacidades, base=almacen_vuelos.DATA_DIR):
+    """Mejor combinación de la grilla presión × agua × botella.
+
+    Devuelve el óptimo con su apogeo calibrado, el intervalo de confianza del
+    95 % (residuo de la calibración escalado con el apogeo) y la región de
+    combinaciones que quedan a menos de una desviación del óptimo.
+    """
+    presion_amb, densidad = trayectoria.ambiente_de_vuelos(base)
+    coef = calibracion.coeficientes(base)
+    ambiente = dict(densidad_aire=densidad, presion_ambiente=presion_amb, g=calculos.G)
+    factor = trayectoria.factor_calibracion(coef, **ambiente) if coef else 1.0
+
+    malla = np.meshgrid(presiones, aguas, capacidades, indexing="ij")
+    psi, agua, capacidad = (eje.ravel() for eje in malla)
+    valido = agua < capacidad
+    if not valido.any():
+        return None
+    apogeos = np.full(psi.size, -np.inf)
+    evaluados, simulados = evaluar_puntos(psi[valido], agua[valido], capacidad[valido], **ambiente)
+    apogeos[valido] = evaluados * factor
+
+    mejor = int(np.argmax(apogeos))
+    apogeo = float(apogeos[mejor])
+
+    # Incertidumbre relativa de la calibración (residuo / apogeo medio)
+    relativa = coef["residuo_std"] / coef["h_mean"] if coef and coef["h_mean"] > 0 else 0.0
+    sigma = apogeo * relativa
+    cerca = apogeos >= apogeo - sigma
+
+    return {
+        "psi": round(float(psi[mejor]), 3),
+        "agua_l": round(float(agua[mejor]), 3),
+        "capacidad_l": round(float(capacidad[mejor]), 3),
+        "apogeo": round(apogeo, 2),
+        "confianza": {
+            "nivel": 0.95,
+            "sigma": round(sigma, 2),
+            "intervalo": [round(apogeo - Z_CONFIANZA * sigma, 2), round(apogeo + Z_CONFIANZA * sigma, 2)],
+            "n_vuelos": int(coef["n_vuelos"]) if coef else 0,
+            # Los vuelos del archivo solo cubren sus condiciones de
+            # lanzamiento; lejos de ellas el intervalo es optimista
+            "extrapolado": bool(coef) and bool(abs(psi[mejor] - coef["psi_calib"]) > 0.25 * coef["psi_calib"]),
+        },
+        "region_casi_optima": {
+            "puntos": int(cerca.sum()),
+            "psi": _rango(psi[cerca]),
+            "agua_l": _rango(agua[cerca]),
+            "capacidad_l": _rango(capacidad[cerca]),
+        },
+        "factor_calibracion": factor,
+        "calibrado": bool(coef),
+        "puntos_grilla": int(psi.size),
+        "puntos_validos": int(valido.sum()),
+        "puntos_simulados": int(simulados),
+    }
@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import OrderedDict
+
+from servicios import almacen_vuelos
+
+# ============================================================================
+# CACHÉ DE PRODUCTOS DERIVADOS POR VUELO
+# ============================================================================
+# Cada blueprint registra aquí sus cálculos por vuelo (fases, despliegue del
+# paracaídas, curva barométrica...). El resultado se guarda junto con la firma
+# del CSV, así el vigilante de data/ puede precalcularlos en segundo plano y
+# la primera petición del usuario ya los encuentra listos.
+MAX_PRODUCTOS = 1024
+
+PRODUCTOS = {}            # nombre -> función(ruta) -> valor
+_cache = OrderedDict()    # (ruta, nombre) -> (firma, valor)
+_lock = threading.Lock()
+
+
+def registrar_producto(nombre, calcular):
+    """Registra un cálculo por vuelo para que el vigilante lo precalcule."""
+    PRODUCTOS[nombre] = calcular
+    return calcular
+
+
+def obtener_producto(ruta, nombre):
+    """Valor del producto para el vuelo, calculándolo solo si el CSV cambió."""
+    ruta = os.path.abspath(ruta)
+    firma = almacen_vuelos.firma_archivo(ruta)
+    clave = (ruta, nombre)
+
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada is not None and entrada[0] == firma:
+            _cache.move_to_end(clave)
+            return entrada[1]
+
+    valor = PRODUCTOS[nombre](ruta)
+    publicar_producto(ruta, nombre, firma, valor)
+    return valor
+
+
+def publicar_producto(ruta, nombre, firma, valor):
+    """Guarda un producto ya calculado (p. ej. por el motor de lotes)."""
+    clave = (os.path.abspath(ruta), nombre)
+    with _lock:
+        _cache[clave] = (firma, valor)
+        _cache.move_to_end(clave)
+        while len(_cache) > MAX_PRODUCTOS:
+            _cache.popitem(last=False)
+
+
+def calentar(ruta):
+    """Calcula todos los productos registrados para un vuelo."""
+    errores = {}
+    for nombre in list(PRODUCTOS):
+        try:
+            obtener_producto(ruta, nombre)
+        except Exception as e:
+            errores[nombre] = e
+    return errores
+
+
+def vaciar_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,166 @@
+import glob
+import hashlib
+import os
+import threading
+
+import joblib
+
+from servicios import almacen_vuelos
+
+# ============================================================================
+# REGISTRO DE MODELOS ENTRENADOS
+# ============================================================================
+# Cada modelo se entrena una sola vez por "huella" del conjunto de datos (hash
+# del contenido de cada CSV) y se guarda en data/.modelos/ junto con su matriz
+# de features. Al arrancar se carga perezosamente desde disco; si los datos
+# cambian, se sigue sirviendo el modelo anterior mientras uno nuevo se entrena
+# en segundo plano.
+DIR_MODELOS = ".modelos"
+
+CONSTRUCTORES = {}   # nombre -> función(base) -> dict con "modelo", "X", "Y"...
+_modelos = {}        # (nombre, base) -> entrada cargada
+_entrenando = set()  # (nombre, base) con un entrenamiento en curso
+_hashes = {}         # ruta -> (firma, sha256)
+_lock = threading.Lock()
+
+
+def registrar_modelo(nombre, construir):
+    """Registra la función que entrena el modelo a partir de la carpeta de datos."""
+    CONSTRUCTORES[nombre] = construir
+    return construir
+
+
+# ============================================================================
+# HUELLA DEL CONJUNTO DE DATOS
+# ============================================================================
+def hash_archivo(ruta):
+    """SHA-256 del contenido del CSV (se recalcula solo si cambió su firma)."""
+    firma = almacen_vuelos.firma_archivo(ruta)
+    guardado = _hashes.get(ruta)
+    if guardado is not None and guardado[0] == firma:
+        return guardado[1]
+
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+    _hashes[ruta] = (firma, h.hexdigest())
+    return h.hexdigest()
+
+
+def huella_datos(base=almacen_vuelos.DATA_DIR):
+    """Huella del conjunto de CSV: cambia si se agrega, borra o modifica alguno."""
+    h = hashlib.sha256()
+    for archivo in almacen_vuelos.listar_csv(base):
+        h.update(f"{archivo}:{hash_archivo(os.path.join(base, archivo))}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# ============================================================================
+# PERSISTENCIA
+# ============================================================================
+def _ruta_modelo(nombre, base, huella):
+    return os.path.join(base, DIR_MODELOS, f"{nombre}-{huella}.joblib")
+
+
+def _cargar_de_disco(nombre, base, huella):
+    ruta = _ruta_modelo(nombre, base, huella)
+    try:
+        return joblib.load(ruta)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠ Modelo en disco inválido ({ruta}): {e}")
+        return None
+
+
+def _guardar_en_disco(nombre, base, entrada):
+    ruta = _ruta_modelo(nombre, base, entrada["huella"])
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        joblib.dump(entrada, temporal)
+        os.replace(temporal, ruta)
+        # Solo se conserva el modelo de la huella actual
+        for viejo in glob.glob(_ruta_modelo(nombre, base, "*")):
+            if viejo != ruta:
+                os.remove(viejo)
+    except OSError as e:
+        print(f"⚠ No se pudo guardar el modelo {nombre}: {e}")
+
+
+# ============================================================================
+# ENTRENAMIENTO Y CONSULTA
+# ============================================================================
+def entrenar(nombre, base=almacen_vuelos.DATA_DIR, huella=None):
+    """Entrena el modelo para la huella dada, lo guarda y lo deja en memoria."""
+    huella = huella or huella_datos(base)
+    entrada = dict(CONSTRUCTORES[nombre](base), huella=huella)
+    _guardar_en_disco(nombre, base, entrada)
+    with _lock:
+        _modelos[(nombre, base)] = entrada
+    return entrada
+
+
+def _entrenar_en_segundo_plano(nombre, base, huella):
+    clave = (nombre, base)
+
+    def tarea():
+        try:
+            entrenar(nombre, base, huella)
+        except Exception as e:
+            print(f"⚠ Falló el reentrenamiento de {nombre}: {e}")
+        finally:
+            with _lock:
+                _entrenando.discard(clave)
+
+    with _lock:
+        if clave in _entrenando:
+            return
+        _entrenando.add(clave)
+    threading.Thread(target=tarea, name=f"entrenar-{nombre}", daemon=True).start()
+
+
+def obtener_modelo(nombre, base=almacen_vuelos.DATA_DIR):
+    """Entrada del modelo (dict con "modelo", "X", "Y", "huella"...).
+
+    - Si la huella coincide con el modelo en memoria o en disco, se devuelve.
+    - Si los datos cambiaron y hay un modelo anterior, se devuelve ese y se
+      reentrena en segundo plano.
+    - Solo la primera vez (sin ningún modelo) se entrena dentro de la petición.
+    """
+    huella = huella_datos(base)
+    clave = (nombre, base)
+
+    with _lock:
+        entrada = _modelos.get(clave)
+    if entrada is not None and entrada["huella"] == huella:
+        return entrada
+
+    en_disco = _cargar_de_disco(nombre, base, huella)
+    if en_disco is not None:
+        with _lock:
+            _modelos[clave] = en_disco
+        return en_disco
+
+    if entrada is not None:
+        _entrenar_en_segundo_plano(nombre, base, huella)
+        return entrada
+
+    return entrenar(nombre, base, huella)
+
+
+def reentrenar_todos(base=almacen_vuelos.DATA_DIR):
+    """Lanza en segundo plano el entrenamiento de los modelos desactualizados."""
+    huella = huella_datos(base)
+    for nombre in list(CONSTRUCTORES):
+        with _lock:
+            entrada = _modelos.get((nombre, base))
+        if entrada is not None and entrada["huella"] == huella:
+            continue
+        en_disco = _cargar_de_disco(nombre, base, huella)
+        if en_disco is not None:
+            with _lock:
+                _modelos[(nombre, base)] = en_disco
+            continue
+        _entrenar_en_segundo_plano(nombre, base, huella)
@@ -0,0 +1,109 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+import requests
+
+from servicios import almacen_vuelos
+from servicios import calculos
+from servicios import metadatos_vuelos
+from servicios import trayectoria
+
+# ============================================================================
+# SIMULADOR LOCAL DE TELEMETRÍA
+# ============================================================================
+# Genera vuelos sintéticos (motor de trayectoria + descenso en paracaídas) o
+# reproduce un CSV de data/ remuestreado a la frecuencia pedida, y los envía
+# en tiempo real a /telemetria/<cohete>/muestras con un POST chunked, uno
+# por cohete en hilos separados. Pensado para probar la ingesta y el panel:
+#
+#   python -m servicios.simulador_telemetria --cohetes 3 --hz 2000
+PRESION_BASE_PA = 83300.0
+TEMPERATURA_C = 24.0
+VELOCIDAD_PARACAIDAS = 4.0   # m/s de descenso
+ESPERA_EN_BASE = 1.0         # s de datos antes del despegue
+MUESTRAS_POR_ENVIO = 200
+
+
+def vuelo_sintetico(hz, psi=metadatos_vuelos.PRESION_PSI, agua_l=metadatos_vuelos.AGUA_L,
+                    capacidad_l=metadatos_vuelos.CAPACIDAD_L, ruido=0.05, semilla=None):
+    """(tiempos, alturas) de un vuelo completo muestreado a hz."""
+    r = trayectoria.simular(psi, agua_l, capacidad_l, trayectoria=True)
+    t_apogeo, apogeo = float(r["t"][-1]), float(r["altura"][-1])
+    t_final = ESPERA_EN_BASE + t_apogeo + apogeo / VELOCIDAD_PARACAIDAS + ESPERA_EN_BASE
+
+    tiempos = np.arange(0.0, t_final, 1.0 / hz)
+    vuelo = tiempos - ESPERA_EN_BASE
+    alturas = np.where(
+        vuelo <= t_apogeo,
+        np.interp(vuelo, r["t"], r["altura"], left=0.0),
+        np.maximum(apogeo - VELOCIDAD_PARACAIDAS * (vuelo - t_apogeo), 0.0),
+    )
+    rng = np.random.default_rng(semilla)
+    return tiempos, alturas + rng.normal(0.0, ruido, tiempos.size) * (alturas > 0)
+
+
+def vuelo_archivado(ruta, hz):
+    """(tiempos, alturas) de un CSV de data/ remuestreado a hz."""
+    tiempos, alturas = almacen_vuelos.obtener_vuelo(ruta).columnas_validas("time_s", "altitude_m")
+    nuevos = np.arange(tiempos[0], tiempos[-1], 1.0 / hz)
+    return nuevos, np.interp(nuevos, tiempos, alturas)
+
+
+def filas_csv(tiempos, alturas):
+    """Líneas CSV con el esquema de los vuelos (presión derivada de la altura)."""
+    presiones = calculos.presion_barometrica(alturas, p0=PRESION_BASE_PA)
+    for t, h, p in zip(tiempos, alturas, presiones):
+        yield f"{int(t * 1000)},{p:.2f},{TEMPERATURA_C},{h:.3f},0,flight,{t:.4f}\n"
+
+
+def transmitir(url, cohete, tiempos, alturas, velocidad=1.0):
+    """Envía el vuelo en tiempo real (escalado por velocidad) con un POST chunked."""
+    def cuerpo():
+        inicio = time.monotonic()
+        lineas = filas_csv(tiempos, alturas)
+        for i in range(0, len(tiempos), MUESTRAS_POR_ENVIO):
+            espera = tiempos[i] / velocidad - (time.monotonic() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+            yield "".join(next(lineas) for _ in range(min(MUESTRAS_POR_ENVIO, len(tiempos) - i))).encode()
+
+    r = requests.post(
+        f"{url}/telemetria/{cohete}/muestras?reiniciar=1",
+        data=cuerpo(),
+        headers={"Content-Type": "text/csv"},
+    )
+    r.raise_for_status()
+    return r.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador local de telemetría en vivo")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--cohetes", type=int, default=1)
+    parser.add_argument("--hz", type=float, default=1000.0, help="muestras por segundo por cohete")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="factor de tiempo real")
+    parser.add_argument("--archivo", help="reproducir un CSV de data/ en vez de un vuelo sintético")
+    args = parser.parse_args()
+
+    def lanzar(i):
+        nombre = f"cohete-{i + 1}"
+        if args.archivo:
+            tiempos, alturas = vuelo_archivado(args.archivo, args.hz)
+        else:
+            tiempos, alturas = vuelo_sintetico(args.hz, psi=40 + 10 * i, semilla=i)
+        inicio = time.time()
+        resultado = transmitir(args.url, nombre, tiempos, alturas, args.velocidad)
+        eventos = ", ".join(f"{e['evento']}@{e['tiempo']:.2f}s" for e in resultado["eventos"])
+        print(f"✓ {nombre}: {resultado['recibidas']} muestras en {time.time() - inicio:.1f} s ({eventos})")
+
+    hilos = [threading.Thread(target=lanzar, args=(i,)) for i in range(args.cohetes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import json
+import math
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios.buffer_circular import DTYPE_TELEMETRIA, BufferCircular
+from servicios.decimacion import decimar
+from servicios.detector_fases import DetectorFasesOnline
+
+# ============================================================================
+# TELEMETRÍA EN VIVO
+# ============================================================================
+# Cada cohete que transmite tiene un estado en memoria: un buffer circular
+# de tamaño fijo con las últimas muestras (servicios.buffer_circular), un
+# archivo CSV rotativo en data/vivo/<cohete>/ (mismo esquema que los CSV de
+# vuelo; la carpeta no la ve el vigilante), el detector de fases en línea y
+# los suscriptores SSE.
+#
+# La ingesta nunca espera a los clientes: cada suscriptor tiene una cola
+# acotada y si se llena se descartan sus actualizaciones. Las muestras se
+# publican decimadas a lo sumo cada INTERVALO_PUBLICACION segundos; los
+# eventos de fase se publican en cuanto el detector los confirma. Lo que se
+# publica y el estado se leen como vistas del buffer, sin copias.
+#
+# Solo la ingesta crea cohetes; suscribirse a uno que no transmitió no
+# reserva nada. Cada cliente SSE ocupa un hilo del servidor mientras está
+# conectado (el generador espera en su cola), por eso los suscriptores
+# simultáneos se limitan a MAX_SUSCRIPTORES entre todos los cohetes: así
+# quedan hilos libres para la ingesta y el resto de la aplicación.
+COLUMNAS = DTYPE_TELEMETRIA.names
+
+CARPETA_VIVO = os.path.join(almacen_vuelos.DATA_DIR, "vivo")
+CAPACIDAD_BUFFER = 32768             # muestras por cohete (~6 MB)
+MAX_BYTES_ARCHIVO = 16 * 1024 * 1024 # se rota al superar este tamaño
+MAX_ARCHIVOS = 8                     # archivos rotados que se conservan por cohete
+MAX_COHETES = 32
+
+INTERVALO_PUBLICACION = 0.1   # s entre actualizaciones SSE por cohete
+MAX_PUNTOS_PUBLICACION = 64   # muestras por actualización (decimadas)
+MAX_COLA_SUSCRIPTOR = 256
+MAX_SUSCRIPTORES = 64         # clientes SSE simultáneos en total
+
+# Ventanas de los agregados del estado (en muestras)
+VENTANA_AGREGADOS = 2048
+VENTANA_DERIVADA = 32
+
+NOMBRE_VALIDO = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+_cohetes = {}
+_colas = set()           # colas de todos los suscriptores conectados
+_lock = threading.Lock()
+
+
+class LimiteSuscriptores(Exception):
+    """Se alcanzó MAX_SUSCRIPTORES clientes SSE conectados."""
+
+
+# ============================================================================
+# PARSEO DE MUESTRAS
+# ============================================================================
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parsear_lineas(lineas, columnas=None):
+    """Filas (tuplas en el orden de COLUMNAS) a partir de líneas CSV o NDJSON.
+
+    Una línea de encabezado CSV cambia el orden de columnas de las siguientes;
+    devuelve (filas, columnas vigentes, líneas descartadas).
+    """
+    columnas = columnas or COLUMNAS
+    filas, descartadas = [], 0
+    for linea in lineas:
+        linea = linea.strip()
+        if not linea:
+            continue
+        if linea.startswith("{"):
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                descartadas += 1
+                continue
+        else:
+            valores = linea.split(",")
+            if "time_s" in linea and math.isnan(_numero(valores[0])):
+                columnas = tuple(v.strip() for v in valores)
+                continue
+            if len(valores) != len(columnas):
+                descartadas += 1
+                continue
+            registro = dict(zip(columnas, valores))
+
+        fila = tuple(
+            str(registro.get(c, "")).strip() if c == "event" else _numero(registro.get(c))
+            for c in COLUMNAS
+        )
+        if math.isnan(fila[COLUMNAS.index("time_s")]):
+            descartadas += 1
+            continue
+        filas.append(fila)
+    return filas, columnas, descartadas
+
+
+def _valor_csv(valor):
+    if isinstance(valor, str):
+        return valor
+    return "" if math.isnan(valor) else repr(valor)
+
+
+def _formatear(fila):
+    return ",".join(_valor_csv(v) for v in fila)
+
+
+def _valor_json(valor):
+    return None if isinstance(valor, float) and math.isnan(valor) else valor
+
+
+# ============================================================================
+# ESTADO POR COHETE
+# ============================================================================
+class Cohete:
+    """Buffer, archivo rotativo, detector de fases y suscriptores de un cohete."""
+
+    def __init__(self, nombre, carpeta=CARPETA_VIVO):
+        self.nombre = nombre
+        self.carpeta = os.path.join(carpeta, nombre)
+        self.buffer = BufferCircular(CAPACIDAD_BUFFER)
+        self.detector = DetectorFasesOnline()
+        self.recibidas = 0
+        self.ultima_muestra = None
+        self.suscriptores = set()
+        self.descartes_sse = 0
+        self._publicadas = 0   # buffer.total en la última publicación
+        self._ultimo_envio = 0.0
+        self._archivo = None
+        self._bytes = 0
+        self.lock = threading.Lock()
+
+    # ---- Archivo rotativo
+    def _abrir(self):
+        os.makedirs(self.carpeta, exist_ok=True)
+        ruta = os.path.join(self.carpeta, f"{self.nombre}-{time.strftime('%Y%m%d-%H%M%S')}-{self.recibidas:012d}.csv")
+        self._archivo = open(ruta, "w", encoding="utf-8", newline="")
+        self._archivo.write(",".join(COLUMNAS) + "\n")
+        self._bytes = 0
+        rotados = sorted(f for f in os.listdir(self.carpeta) if f.endswith(".csv"))
+        for viejo in rotados[:-MAX_ARCHIVOS]:
+            try:
+                os.remove(os.path.join(self.carpeta, viejo))
+            except OSError:
+                pass
+
+    def _escribir(self, filas):
+        if self._archivo is None or self._bytes > MAX_BYTES_ARCHIVO:
+            self.cerrar_archivo()
+            self._abrir()
+        texto = "\n".join(_formatear(f) for f in filas) + "\n"
+        self._archivo.write(texto)
+        self._bytes += len(texto)
+
+    def cerrar_archivo(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    # ---- Ingesta
+    def ingerir(self, filas):
+        """Agrega filas (tuplas de COLUMNAS); devuelve los eventos de fase nuevos."""
+        if not filas:
+            return []
+        bloque = np.array(filas, dtype=DTYPE_TELEMETRIA)
+        with self.lock:
+            self._escribir(filas)
+            self.buffer.extender(bloque)
+            self.recibidas += len(filas)
+            self.ultima_muestra = time.time()
+            eventos = self.detector.actualizar(bloque["time_s"], bloque["altitude_m"], bloque["pressure_pa"])
+            for evento in eventos:
+                self._enviar("fase", evento)
+            if time.monotonic() - self._ultimo_envio >= INTERVALO_PUBLICACION:
+                self._publicar()
+        return eventos
+
+    def vaciar(self):
+        """Publica lo pendiente y baja el archivo a disco (fin de una conexión)."""
+        with self.lock:
+            self._publicar()
+            if self._archivo is not None:
+                self._archivo.flush()
+
+    # ---- Publicación
+    def _enviar(self, tipo, datos):
+        for cola in list(self.suscriptores):
+            try:
+                cola.put_nowait((tipo, datos))
+            except queue.Full:
+                self.descartes_sse += 1
+
+    def _publicar(self):
+        self._ultimo_envio = time.monotonic()
+        nuevas = self.buffer.total - self._publicadas
+        self._publicadas = self.buffer.total
+        if not nuevas or not self.suscriptores:
+            return
+        # Si entre publicaciones llegó más que la capacidad, se publica lo que queda
+        ventana = self.buffer.ventana(nuevas)
+        idx = decimar(
+            ventana["time_s"],
+            [np.nan_to_num(ventana["altitude_m"]), np.nan_to_num(ventana["pressure_pa"])],
+            MAX_PUNTOS_PUBLICACION,
+        )
+        elegidas = ventana[idx]
+        datos = {
+            clave: np.where(np.isnan(elegidas[columna]), None, np.round(elegidas[columna], 3)).tolist()
+            for clave, columna in (("t", "time_s"), ("altitud", "altitude_m"),
+                                   ("presion", "pressure_pa"), ("temperatura", "temp_c"))
+        }
+        datos["recibidas"] = self.recibidas
+        self._enviar("muestras", datos)
+
+    def estado(self, ultimas=0, ventana=VENTANA_AGREGADOS):
+        """Resumen del cohete con agregados de las últimas `ventana` muestras."""
+        with self.lock:
+            filas = self.buffer.ventana(ultimas).tolist()
+            return {
+                "cohete": self.nombre,
+                "recibidas": self.recibidas,
+                "en_buffer": len(self.buffer),
+                "agregados": {
+                    "ventana": min(ventana, len(self.buffer)),
+                    "altitude_m": self.buffer.agregados("altitude_m", ventana),
+                    "pressure_pa": self.buffer.agregados("pressure_pa", ventana),
+                    "temp_c": self.buffer.agregados("temp_c", ventana),
+                    "velocidad_vertical": self.buffer.derivada("altitude_m", VENTANA_DERIVADA),
+                },
+                "ultima_muestra": self.ultima_muestra,
+                "fase": self.detector.estado,
+                "eventos": list(self.detector.eventos),
+                "suscriptores": len(self.suscriptores),
+                "descartes_sse": self.descartes_sse,
+                "columnas": COLUMNAS,
+                "ultimas": [[_valor_json(v) for v in f] for f in filas],
+            }
+
+
+# ============================================================================
+# REGISTRO DE COHETES Y SUSCRIPCIONES
+# ============================================================================
+def obtener_cohete(nombre, crear=True):
+    """Estado del cohete (se crea al recibir su primera muestra)."""
+    if not NOMBRE_VALIDO.match(nombre):
+        raise ValueError(f"Nombre de cohete inválido: {nombre!r}")
+    with _lock:
+        cohete = _cohetes.get(nombre)
+        if cohete is None and crear:
+            if len(_cohetes) >= MAX_COHETES:
+                raise ValueError(f"Máximo {MAX_COHETES} cohetes en vivo")
+            cohete = _cohetes[nombre] = Cohete(nombre)
+        return cohete
+
+
+def cohetes():
+    with _lock:
+        return sorted(_cohetes)
+
+
+def suscribir(nombre):
+    """Cola de actualizaciones (tipo, datos) para un cliente SSE.
+
+    Devuelve None si el cohete no ha transmitido; lanza LimiteSuscriptores
+    si ya hay MAX_SUSCRIPTORES clientes conectados.
+    """
+    cohete = obtener_cohete(nombre, crear=False)
+    if cohete is None:
+        return None
+    cola = queue.Queue(maxsize=MAX_COLA_SUSCRIPTOR)
+    with _lock:
+        if len(_colas) >= MAX_SUSCRIPTORES:
+            raise LimiteSuscriptores(f"Máximo {MAX_SUSCRIPTORES} clientes en vivo")
+        _colas.add(cola)
+    with cohete.lock:
+        cohete.suscriptores.add(cola)
+    return cola
+
+
+def desuscribir(nombre, cola):
+    with _lock:
+        _colas.discard(cola)
+    cohete = obtener_cohete(nombre, crear=False)
+    if cohete is not None:
+        with cohete.lock:
+            cohete.suscriptores.discard(cola)
+
+
+def reiniciar(nombre):
+    """Olvida el vuelo en curso (nuevo lanzamiento del mismo cohete)."""
+    with _lock:
+        cohete = _cohetes.pop(nombre, None)
+    if cohete is not None:
+        with cohete.lock:
+            cohete.cerrar_archivo()
+            suscriptores = set(cohete.suscriptores)
+        nuevo = obtener_cohete(nombre)
+        with nuevo.lock:
+            nuevo.suscriptores |= suscriptores
+            nuevo._enviar("reinicio", {"cohete": nombre})
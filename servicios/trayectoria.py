@@ -0,0 +1,176 @@
+import math
+
+import numpy as np
+
+from servicios import almacen_vuelos
+from servicios import calculos
+from servicios import metadatos_vuelos
+
+# ============================================================================
+# MOTOR FÍSICO DE TRAYECTORIA DEL COHETE DE AGUA
+# ============================================================================
+# Integra la subida vertical de muchos cohetes a la vez (una posición de los
+# arreglos por combinación de presión / agua / botella):
+#
+#   - Empuje del agua: el aire de la botella se expande adiabáticamente,
+#     P = P0·(Va0/Va)^γ; el agua sale a u = sqrt(2·Pg/ρw) por la tobera y el
+#     empuje es ρw·Ae·u² = 2·Pg·Ae. El empuje del aire remanente se desprecia.
+#   - Arrastre: ½·ρ_aire·Cd·A·v|v|, con la densidad del aire de los vuelos.
+#   - Gravedad G = 9.78 (Popayán) y masa variable (botella + agua restante).
+#
+# La fase de empuje (~0.1 s) se integra con paso fijo fino, solo sobre los
+# cohetes que todavía empujan. Después la masa es constante y la subida con
+# arrastre cuadrático tiene solución cerrada (apogeo y tiempo exactos), así
+# que el vuelo balístico no necesita pasos.
+PSI_A_PA = 6894.757
+RHO_AGUA = 1000.0       # kg/m³
+GAMMA_AIRE = 1.4
+
+# Valores típicos para una botella de gaseosa con tobera estándar
+PARAMETROS = {
+    "masa_seca_kg": 0.20,
+    "diametro_tobera_m": 0.0215,
+    "diametro_cuerpo_m": 0.105,
+    "cd": 0.5,
+}
+
+# Ambiente por defecto si el archivo de vuelos no tiene datos
+PRESION_AMBIENTE_PA = 83300.0
+DENSIDAD_AIRE = 0.99
+
+DT_EMPUJE = 1e-3   # s, paso de integración mientras sale agua
+T_MAX_EMPUJE = 2.0 # s
+DT_SERIE = 0.02    # s, muestreo de la trayectoria balística
+
+
+def ambiente_de_vuelos(base=almacen_vuelos.DATA_DIR):
+    """(presión ambiente, densidad del aire) promedio de los vuelos de data/."""
+    from servicios.indice_vuelos import estadistica_columna, resumenes
+
+    filas = [r for r in resumenes(base) if r["dens_n"]]
+    if not filas:
+        return PRESION_AMBIENTE_PA, DENSIDAD_AIRE
+    densidad = sum(r["dens_promedio"] * r["dens_n"] for r in filas) / sum(r["dens_n"] for r in filas)
+    presion = estadistica_columna("pressure_pa", base).media or PRESION_AMBIENTE_PA
+    return presion, densidad
+
+
+def _subida_balistica(v0, masa, k_arrastre, g):
+    """Altura ganada y tiempo hasta el apogeo desde v0 con arrastre cuadrático."""
+    v0 = np.maximum(v0, 0.0)
+    if k_arrastre <= 0:
+        return v0 ** 2 / (2 * g), v0 / g
+    v_terminal = np.sqrt(masa * g / k_arrastre)
+    altura = masa / (2 * k_arrastre) * np.log1p((v0 / v_terminal) ** 2)
+    tiempo = v_terminal / g * np.arctan(v0 / v_terminal)
+    return altura, tiempo
+
+
+def simular(presion_psi, agua_l, capacidad_l, densidad_aire=DENSIDAD_AIRE,
+            presion_ambiente=PRESION_AMBIENTE_PA, g=calculos.G, trayectoria=False, **parametros):
+    """Simula la subida de todas las combinaciones (se aplica broadcasting).
+
+    Devuelve un dict de arreglos con la forma de las entradas: apogeo,
+    tiempo_apogeo, velocidad_maxima y tiempo_empuje. Con trayectoria=True
+    (pensado para un solo cohete) agrega las series "t", "altura" y "velocidad".
+    """
+    p = dict(PARAMETROS, **parametros)
+    presion_psi, agua_l, capacidad_l = np.broadcast_arrays(
+        np.asarray(presion_psi, dtype=float),
+        np.asarray(agua_l, dtype=float),
+        np.asarray(capacidad_l, dtype=float),
+    )
+    forma = presion_psi.shape
+
+    v_botella = capacidad_l.ravel() / 1000.0
+    v_agua0 = np.clip(agua_l.ravel() / 1000.0, 0.0, v_botella * 0.999)
+    v_aire0 = v_botella - v_agua0
+    p0 = np.maximum(presion_psi.ravel(), 0.0) * PSI_A_PA + presion_ambiente  # absoluta
+    # El empuje termina al vaciarse la botella o al igualar la presión ambiente
+    v_aire_fin = np.minimum(v_botella, v_aire0 * (p0 / presion_ambiente) ** (1 / GAMMA_AIRE))
+
+    area_tobera = math.pi * p["diametro_tobera_m"] ** 2 / 4
+    k_arrastre = 0.5 * densidad_aire * p["cd"] * math.pi * p["diametro_cuerpo_m"] ** 2 / 4
+
+    n = v_botella.size
+    y = np.zeros(n)
+    v = np.zeros(n)
+    v_aire = v_aire0.copy()
+    tiempo_empuje = np.zeros(n)
+    serie = [(0.0, 0.0, 0.0)] if trayectoria else None
+
+    # ---- Fase de empuje: RK2 (punto medio) solo sobre los cohetes que aún
+    # expulsan agua; el último paso de cada uno se acorta para terminar justo
+    # cuando se vacía la botella o se agota la presión
+    def derivadas(i, yi, vi, va):
+        pg = np.maximum(p0[i] * (v_aire0[i] / va) ** GAMMA_AIRE - presion_ambiente, 0.0)
+        masa = p["masa_seca_kg"] + RHO_AGUA * (v_botella[i] - va)
+        a = (2 * pg * area_tobera - k_arrastre * vi * np.abs(vi)) / masa - g
+        a = np.where((yi <= 0) & (vi <= 0) & (a < 0), 0.0, a)  # apoyado en la base
+        return a, area_tobera * np.sqrt(2 * pg / RHO_AGUA)
+
+    idx = np.arange(n)
+    while idx.size:
+        yi, vi, va = y[idx], v[idx], v_aire[idx]
+        a1, q1 = derivadas(idx, yi, vi, va)
+        empuja = (q1 > 0) & (va < v_aire_fin[idx]) & (tiempo_empuje[idx] < T_MAX_EMPUJE)
+        if not empuja.all():
+            idx, yi, vi, va, a1, q1 = (x[empuja] for x in (idx, yi, vi, va, a1, q1))
+            if not idx.size:
+                break
+
+        dt = np.minimum(DT_EMPUJE, (v_aire_fin[idx] - va) / q1)
+        a2, q2 = derivadas(idx, yi + 0.5 * dt * vi, vi + 0.5 * dt * a1, va + 0.5 * dt * q1)
+        y[idx] = np.maximum(yi + dt * (vi + 0.5 * dt * a1), 0.0)
+        v[idx] = vi + dt * a2
+        v_aire[idx] = np.where(dt < DT_EMPUJE, v_aire_fin[idx], np.minimum(va + dt * q2, v_aire_fin[idx]))
+        tiempo_empuje[idx] += dt
+
+        if serie is not None and idx[0] == 0:
+            serie.append((tiempo_empuje[0], y[0], v[0]))
+
+    # ---- Vuelo balístico: masa constante, solución cerrada
+    masa = p["masa_seca_kg"] + RHO_AGUA * (v_botella - v_aire)
+    subida, t_subida = _subida_balistica(v, masa, k_arrastre, g)
+    apogeo = y + subida
+    tiempo_apogeo = tiempo_empuje + t_subida
+
+    resultado = {
+        "apogeo": apogeo.reshape(forma),
+        "tiempo_apogeo": tiempo_apogeo.reshape(forma),
+        "velocidad_maxima": np.maximum(v, 0.0).reshape(forma),
+        "tiempo_empuje": tiempo_empuje.reshape(forma),
+    }
+
+    if serie is not None:
+        t0, y0, v0 = serie[-1]
+        v_terminal = math.sqrt(masa[0] * g / k_arrastre)
+        fase0 = math.atan(max(v0, 0.0) / v_terminal)
+        ts = np.append(np.arange(0.0, t_subida[0], DT_SERIE), t_subida[0])
+        fase = fase0 - g * ts / v_terminal
+        tiempos, alturas, velocidades = (np.array(c) for c in zip(*serie))
+        resultado.update(
+            t=np.concatenate([tiempos, t0 + ts[1:]]),
+            altura=np.concatenate([alturas, y0 + masa[0] / k_arrastre * np.log(np.cos(fase[1:]) / math.cos(fase0))]),
+            velocidad=np.concatenate([velocidades, v_terminal * np.tan(fase[1:])]),
+        )
+    return resultado
+
+
+def factor_calibracion(coef, **ambiente):
+    """Factor que lleva el apogeo físico al real en las condiciones de laboratorio."""
+    referencia = float(simular(
+        coef["psi_calib"], metadatos_vuelos.AGUA_L, metadatos_vuelos.CAPACIDAD_L, **ambiente
+    )["apogeo"])
+    return coef["h_mean"] / referencia if referencia > 0 else 1.0
+
+
+def barrido(presiones_psi, aguas_l, capacidades_l, **kwargs):
+    """Simula la grilla completa presión × agua × botella (ejes en ese orden)."""
+    malla = np.meshgrid(
+        np.asarray(presiones_psi, dtype=float),
+        np.asarray(aguas_l, dtype=float),
+        np.asarray(capacidades_l, dtype=float),
+        indexing="ij",
+    )
+    return simular(*malla, **kwargs)
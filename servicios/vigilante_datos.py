@@ -0,0 +1,98 @@
+import os
+import threading
+
+from servicios import almacen_vuelos
+from servicios import analisis_lote
+from servicios import calibracion
+from servicios import indice_vuelos
+from servicios import productos_vuelo
+from servicios import registro_modelos
+
+# ============================================================================
+# VIGILANTE DE LA CARPETA data/
+# ============================================================================
+# Hilo en segundo plano que revisa la carpeta cada INTERVALO_SEGUNDOS (un
+# stat() por archivo) y, cuando aparece un CSV nuevo o cambia uno existente,
+# lo parsea una vez, actualiza el índice de resúmenes, precalcula todos los
+# productos registrados y pone al día los modelos de predicción, para que la
+# primera petición ya encuentre todo en caché.
+INTERVALO_SEGUNDOS = 2.0
+
+_vigilante = None
+_lock = threading.Lock()
+
+
+def ingestar_vuelo(ruta):
+    """Parsea el vuelo y precalcula sus productos derivados."""
+    almacen_vuelos.obtener_vuelo(ruta)
+    for nombre, error in productos_vuelo.calentar(ruta).items():
+        print(f"⚠ Producto '{nombre}' falló para {os.path.basename(ruta)}: {error}")
+
+
+class VigilanteDatos(threading.Thread):
+    """Hilo daemon que ingiere los CSV nuevos o modificados de una carpeta."""
+
+    def __init__(self, base=almacen_vuelos.DATA_DIR, intervalo=INTERVALO_SEGUNDOS):
+        super().__init__(name="vigilante-datos", daemon=True)
+        self.base = base
+        self.intervalo = intervalo
+        self._firmas = {}
+        self._detener = threading.Event()
+
+    def revisar(self):
+        """Una pasada: devuelve los archivos ingeridos en esta revisión."""
+        firmas = {}
+        for archivo in almacen_vuelos.listar_csv(self.base):
+            try:
+                firmas[archivo] = almacen_vuelos.firma_archivo(os.path.join(self.base, archivo))
+            except OSError:
+                continue  # borrado entre el listado y el stat
+
+        cambiados = [a for a, firma in firmas.items() if self._firmas.get(a) != firma]
+
+        # Muchos vuelos nuevos a la vez (p. ej. al arrancar): el pipeline pesado
+        # se reparte entre procesos y aquí solo quedan los productos restantes
+        if len(cambiados) >= analisis_lote.MIN_VUELOS_PARALELO:
+            analisis_lote.analizar_lote([os.path.join(self.base, a) for a in cambiados])
+
+        if cambiados or set(self._firmas) != set(firmas):
+            indice_vuelos.actualizar_indice(self.base)
+            # Carga desde disco o reentrena en segundo plano los modelos afectados
+            registro_modelos.reentrenar_todos(self.base)
+            calibracion.recalibrar(self.base)
+
+        ingeridos = []
+        for archivo in cambiados:
+            try:
+                ingestar_vuelo(os.path.join(self.base, archivo))
+                ingeridos.append(archivo)
+            except Exception as e:
+                print(f"⚠ No se pudo ingerir {archivo}: {e}")
+                firmas.pop(archivo, None)  # se reintenta en la próxima revisión
+
+        self._firmas = firmas
+        return ingeridos
+
+    def run(self):
+        while True:
+            try:
+                ingeridos = self.revisar()
+                if ingeridos:
+                    print("✓ Vuelos ingeridos:", ", ".join(ingeridos))
+            except Exception as e:
+                print("⚠ Error en el vigilante de datos:", e)
+            if self._detener.wait(self.intervalo):
+                break
+
+    def detener(self):
+        self._detener.set()
+
+
+def iniciar_vigilante(base=almacen_vuelos.DATA_DIR, intervalo=INTERVALO_SEGUNDOS):
+    """Arranca (una sola vez por proceso) el vigilante de la carpeta de datos."""
+    global _vigilante
+    with _lock:
+        if _vigilante is None or not _vigilante.is_alive():
+            _vigilante = VigilanteDatos(base, intervalo)
+            _vigilante.start()
+        return _vigilante
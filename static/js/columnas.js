@@ -0,0 +1,23 @@
+// Lectura de las respuestas de las APIs de series (servicios/formato_respuesta.py).
+// Con ?formato=f32|f64 el cuerpo es [uint32 LE n][encabezado JSON][columnas]:
+// cada columna se devuelve como Float32Array/Float64Array sobre el mismo
+// buffer, sin copiar (los navegadores son little-endian, igual que el servidor).
+async function leerColumnas(respuesta) {
+  const tipo = respuesta.headers.get('Content-Type') || '';
+  if (!tipo.startsWith('application/octet-stream')) {
+    return { columnas: null, metadatos: await respuesta.json() };
+  }
+  const buffer = await respuesta.arrayBuffer();
+  const largo = new DataView(buffer).getUint32(0, true);
+  const encabezado = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, largo)));
+  const Arreglo = encabezado.dtype === 'float32' ? Float32Array : Float64Array;
+
+  const columnas = {};
+  let posicion = 4 + largo;
+  encabezado.columnas.forEach((nombre, i) => {
+    const n = encabezado.longitudes[i];
+    columnas[nombre] = new Arreglo(buffer, posicion, n);
+    posicion += n * Arreglo.BYTES_PER_ELEMENT;
+  });
+  return { columnas, metadatos: encabezado.metadatos };
+}